@@ -0,0 +1,37 @@
+import random
+import igraph as ig
+from kpp import KPP, KPPExtension
+
+# Compare branch-and-bound node counts for each symmetry breaking option
+
+random.seed(1)
+methods = [None, 'basic', 'representative']
+k, k2 = 3, 2
+
+
+def node_counts(make_kpp, instances):
+  counts = []
+  for G in instances:
+    row = []
+    for method in methods:
+      kpp = make_kpp(G)
+      if method is not None:
+        kpp.break_symmetry(method)
+      kpp.solve()
+      row.append((kpp.model.objVal, int(kpp.model.NodeCount), kpp.model.Runtime))
+    counts.append(row)
+  return counts
+
+
+benchmarks = [('KPP', lambda G: KPP(G, k, verbosity=0), [(20, 0.4), (25, 0.35), (30, 0.3)]),
+              ('KPPExtension', lambda G: KPPExtension(G, k, k2, verbosity=0),
+               [(10, 0.6), (12, 0.55), (14, 0.5)])]
+
+for name, make_kpp, sizes in benchmarks:
+  instances = [ig.Graph.GRG(n, R) for n, R in sizes]
+  print(name)
+  print('%8s %8s' % ('nodes', 'edges') + ''.join('%18s' % str(m) for m in methods))
+  for G, row in zip(instances, node_counts(make_kpp, instances)):
+    print('%8d %8d' % (G.vcount(), G.ecount()) +
+          ''.join('%10d %6.2fs ' % (nodes, runtime) for _, nodes, runtime in row))
+    assert all(abs(obj - row[0][0]) < 1e-6 for obj, _, _ in row)
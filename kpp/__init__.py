@@ -1,5 +1,33 @@
-from .separation import CliqueSeparator, Constraint, YCliqueSeparator, YZCliqueSeparator, ZCliqueSeparator, ProjectedCliqueSeparator
-from .kpp import KPP, KPPExtension
-from .heuristic import two_stage_kpp_heuristic
-from .kpp_algorithm import KPPAlgorithm, KPPBasicAlgorithm
-from . import graph
+'''Public names of the package, imported from their submodules on first
+use so that importing kpp does not load Gurobi, igraph or SciPy'''
+from importlib import import_module
+
+_submodules = {
+    'CliqueSeparator': 'separation', 'Constraint': 'separation',
+    'YCliqueSeparator': 'separation', 'YZCliqueSeparator': 'separation',
+    'ZCliqueSeparator': 'separation', 'ProjectedCliqueSeparator': 'separation',
+    'CliqueIndex': 'separation', 'MultiProjectedCliqueSeparator': 'separation',
+    'TriangleSeparator': 'separation', 'YTriangleSeparator': 'separation',
+    'ZTriangleSeparator': 'separation', 'YZTriangleSeparator': 'separation',
+    'KPP': 'kpp', 'KPPExtension': 'kpp', 'KPPEdge': 'kpp',
+    'SeparatorScheduler': 'scheduler',
+    'two_stage_kpp_heuristic': 'heuristic', 'local_search_colouring': 'heuristic',
+    'KPPAlgorithm': 'kpp_algorithm', 'KPPBasicAlgorithm': 'kpp_algorithm',
+}
+
+__all__ = list(_submodules) + ['graph']
+
+
+def __getattr__(name):
+  if name == 'graph':
+    value = import_module('.graph', __name__)
+  elif name in _submodules:
+    value = getattr(import_module('.' + _submodules[name], __name__), name)
+  else:
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,110 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .heuristic import two_stage_kpp_heuristic
+
+
+class AsyncSolver:
+  '''Runs KPP solves from asyncio code without blocking the event loop
+
+  Solves run in a pool of at most max_workers threads (Gurobi releases the
+  GIL while optimizing), so further requests wait for a free thread. If the
+  awaiting task is cancelled, or a request runs grace seconds beyond its
+  time limit, the model being solved is terminated and the thread is freed
+  as soon as Gurobi returns.'''
+
+  def __init__(self, max_workers=4, grace=5.0):
+    self.executor = ThreadPoolExecutor(max_workers)
+    self.grace = grace
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *args):
+    self.close()
+
+  def close(self):
+    self.executor.shutdown(wait=False)
+
+  def deadline(self, time_limit):
+    if time_limit is None:
+      return None
+    return asyncio.get_running_loop().time() + time_limit + self.grace
+
+  async def call(self, fn, stop, time_limit=None):
+    '''Result of fn() run in the pool, calling stop() if the request is
+    cancelled or times out'''
+    future = asyncio.get_running_loop().run_in_executor(self.executor, fn)
+    timeout = None if time_limit is None else time_limit + self.grace
+    try:
+      return await asyncio.wait_for(future, timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+      stop()
+      raise
+
+  async def components(self, alg, time_limit=None):
+    '''Asynchronous iterator over the records of alg.iter_components
+
+    time_limit sets the algorithm's time limit; the iterator raises
+    asyncio.TimeoutError if the run has not finished grace seconds later.'''
+    if time_limit is not None:
+      alg.params['time limit'] = time_limit
+    loop = asyncio.get_running_loop()
+    records = asyncio.Queue()
+    done = object()
+
+    def produce():
+      try:
+        for record in alg.iter_components():
+          loop.call_soon_threadsafe(records.put_nowait, record)
+      except BaseException as e:
+        loop.call_soon_threadsafe(records.put_nowait, e)
+      else:
+        loop.call_soon_threadsafe(records.put_nowait, done)
+
+    future = loop.run_in_executor(self.executor, produce)
+    deadline = self.deadline(time_limit)
+    try:
+      while True:
+        timeout = None if deadline is None else max(deadline - loop.time(), 0.0)
+        item = await asyncio.wait_for(records.get(), timeout)
+        if item is done:
+          break
+        if isinstance(item, BaseException):
+          raise item
+        yield item
+    finally:
+      if not future.done():
+        alg.terminate()
+
+  async def run(self, alg, time_limit=None):
+    '''KPPAlgorithmResults of alg, as returned by alg.run'''
+    records = [record async for record in self.components(alg, time_limit)]
+    return alg.collect_results(records)
+
+  async def solve(self, kpp, time_limit=None):
+    '''Run kpp.solve, with Gurobi's time limit set to time_limit'''
+    if time_limit is not None:
+      kpp.model.setParam('TimeLimit', time_limit)
+    return await self.call(kpp.solve, kpp.terminate, time_limit)
+
+  async def two_stage_heuristic(self, G, k1, k2, time_limit=None):
+    '''Result of two_stage_kpp_heuristic'''
+    models = _TerminatingList()
+    return await self.call(lambda: two_stage_kpp_heuristic(G, k1, k2, models=models),
+                           models.terminate, time_limit)
+
+
+class _TerminatingList(list):
+  '''List of models which terminates models added after terminate'''
+
+  terminated = False
+
+  def append(self, kpp):
+    list.append(self, kpp)
+    if self.terminated:
+      kpp.terminate()
+
+  def terminate(self):
+    self.terminated = True
+    for kpp in list(self):
+      kpp.terminate()
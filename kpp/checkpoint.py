@@ -0,0 +1,73 @@
+import json
+import os
+import numpy as np
+from .kpp import KPP, KPPExtension, KPPEdge
+from .graph import graph_fingerprint
+from .cut_store import cut_arrays, cuts_from_arrays, cut_pool_path
+from .result_table import to_json
+
+MODEL_CLASSES = {cls.__name__: cls for cls in [KPP, KPPExtension, KPPEdge]}
+
+
+def checkpoint_path(directory, G, params):
+  '''File in directory holding the checkpoint of G for the given parameters'''
+  return cut_pool_path(directory, G, params)[:-len('.npz')] + '.ckpt.npz'
+
+
+def save_checkpoint(path, kpp, state, bounds=None):
+  '''Write the cuts, fractional y-cut, variable bounds and incumbent of kpp
+  together with state, a dict of JSON values such as the completed phases, to path
+
+  bounds defaults to the current bounds of kpp; pass bounds read earlier
+  when saving from a Gurobi callback, where they cannot be queried. The
+  file is written under a temporary name and renamed, so a crash leaves
+  the previous checkpoint intact.'''
+  arrays = cut_arrays(kpp)
+  arrays.update(kpp.variable_bounds() if bounds is None else bounds)
+  if kpp.incumbent is not None:
+    arrays['incumbent'] = np.asarray(kpp.incumbent, dtype=np.int64)
+  header = {'model': type(kpp).__name__, 'k': kpp.k, 'k2': getattr(kpp, 'k2', None),
+            'fingerprint': graph_fingerprint(kpp.G), 'x': bool(kpp.x), 'z': bool(kpp.z),
+            'y bound': kpp.y_bound, 'state': state}
+  arrays['header'] = np.array(to_json(header))
+  tmp_path = path + '.tmp'
+  with open(tmp_path, 'wb') as f:
+    np.savez_compressed(f, **arrays)
+  os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, G, verbosity=0, **kwargs):
+  '''Rebuild the model saved in the checkpoint at path for the graph G
+
+  Returns the model, with its variables, bounds and cuts restored and the
+  incumbent set as MIP start, and the saved state. kwargs are passed to the
+  model's constructor. Raises ValueError if the checkpoint was written for
+  a different graph.'''
+  with np.load(path) as data:
+    arrays = {name: data[name] for name in data.files}
+  header = json.loads(str(arrays['header']))
+  if header['fingerprint'] != graph_fingerprint(G):
+    raise ValueError('Checkpoint %s was saved for a different graph' % path)
+  cls = MODEL_CLASSES[header['model']]
+  if cls is KPPExtension:
+    kpp = cls(G, header['k'], header['k2'], verbosity=verbosity, **kwargs)
+  else:
+    kpp = cls(G, header['k'], verbosity=verbosity, **kwargs)
+  if header['z']:
+    kpp.add_z_variables()
+  if header['x']:
+    kpp.add_node_variables()
+  kpp.model.update()
+  for name in ['x', 'y', 'z']:
+    if name + '_lb' in arrays:
+      variables = getattr(kpp, name + '_vars')
+      kpp.model.setAttr('LB', variables, arrays[name + '_lb'].tolist())
+      kpp.model.setAttr('UB', variables, arrays[name + '_ub'].tolist())
+  kpp.add_constraints(cuts_from_arrays(arrays, kpp))
+  if header.get('y bound') is not None:
+    kpp.add_y_bound(header['y bound'])
+  if 'incumbent' in arrays:
+    kpp.incumbent = arrays['incumbent']
+    kpp.set_start(kpp.incumbent)
+  kpp.model.update()
+  return kpp, header['state']
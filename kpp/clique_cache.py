@@ -0,0 +1,121 @@
+import os
+from collections import OrderedDict
+from itertools import combinations
+from time import time
+import numpy as np
+from .graph import graph_fingerprint
+
+
+class CliqueCache:
+  '''Maximal cliques of graphs keyed by graph fingerprint
+
+  Clique lists are kept in memory for the max_entries most recently used
+  graphs and, if a directory is passed to maximal_cliques, stored there as
+  compressed arrays so later runs on the same graph can reuse them.'''
+
+  def __init__(self, max_entries=64):
+    self.max_entries = max_entries
+    self.memory = OrderedDict()
+
+  def maximal_cliques(self, G, directory=None, max_size=None, time_limit=None):
+    '''Cliques of G as a list of tuples of nodes
+
+    Without limits these are the maximal cliques of G. With max_size,
+    cliques are not extended beyond max_size nodes and with time_limit
+    enumeration stops after time_limit seconds, returning the cliques found
+    so far. Both yield valid (if fewer) cuts for the clique separators.'''
+    key = '%s-%s-%s' % (graph_fingerprint(G)[:16], max_size, time_limit)
+    if key in self.memory:
+      self.memory.move_to_end(key)
+      return self.memory[key]
+    path = os.path.join(directory, key + '.npz') if directory else None
+    if path and os.path.exists(path):
+      cliques = load_cliques(path)
+    else:
+      cliques = enumerate_cliques(G, max_size, time_limit)
+      if path:
+        os.makedirs(directory, exist_ok=True)
+        save_cliques(path, cliques)
+    self.memory[key] = cliques
+    if len(self.memory) > self.max_entries:
+      self.memory.popitem(last=False)
+    return cliques
+
+  def clear(self):
+    self.memory.clear()
+
+
+shared_cache = CliqueCache()
+
+
+def enumerate_cliques(G, max_size=None, time_limit=None):
+  '''Maximal cliques of G, optionally capped in size or enumeration time
+
+  If enumeration runs out of time, the edges outside the cliques found so
+  far are returned as cliques of two nodes.'''
+  if max_size is None and time_limit is None:
+    return G.maximal_cliques()
+  adj = [set(nbrs) for nbrs in G.get_adjlist()]
+  deadline = None if time_limit is None else time() + time_limit
+  cliques = []
+  # Bron-Kerbosch with pivoting, using an explicit stack
+  stack = [((), set(range(G.vcount())), set())]
+  while stack:
+    if deadline is not None and time() > deadline:
+      break
+    R, P, X = stack.pop()
+    if not P and not X or (max_size is not None and len(R) == max_size):
+      if R:
+        cliques.append(R)
+      continue
+    if not P:
+      continue
+    pivot = max(P | X, key=lambda u: len(adj[u] & P))
+    for v in list(P - adj[pivot]):
+      stack.append((R + (v,), P & adj[v], X & adj[v]))
+      P = P - {v}
+      X = X | {v}
+  if stack:
+    # Enumeration stopped early, so add the edges not in any clique found
+    covered = {(u, v) for clq in cliques for u, v in combinations(sorted(clq), 2)}
+    cliques.extend(e for e in map(tuple, map(sorted, G.get_edgelist())) if e not in covered)
+  return cliques
+
+
+def induced_cliques(cliques, vertices):
+  '''Maximal cliques of an induced subgraph, given those of the graph
+
+  vertices lists the vertex of the graph corresponding to each vertex of
+  the subgraph and the cliques are returned in the subgraph's numbering.
+  Every maximal clique of the subgraph is the intersection of a maximal
+  clique of the graph with its vertices, so it suffices to drop the
+  intersections contained in others.'''
+  position = {v: i for i, v in enumerate(vertices)}
+  restricted = {tuple(sorted(position[v] for v in clq if v in position)) for clq in cliques}
+  restricted.discard(())
+  maximal = []
+  containing = [[] for _ in vertices]
+  for clq in sorted(restricted, key=len, reverse=True):
+    nodes = set(clq)
+    if any(nodes <= maximal[i] for i in containing[clq[0]]):
+      continue
+    for v in clq:
+      containing[v].append(len(maximal))
+    maximal.append(nodes)
+  return [tuple(sorted(clq)) for clq in maximal]
+
+
+def save_cliques(path, cliques):
+  sizes = np.array([len(clq) for clq in cliques], dtype=np.int64)
+  ptr = np.concatenate(([0], np.cumsum(sizes)))
+  nodes = np.array([v for clq in cliques for v in clq], dtype=np.int64)
+  tmp_path = path + '.tmp'
+  with open(tmp_path, 'wb') as f:
+    np.savez_compressed(f, ptr=ptr, nodes=nodes)
+  os.replace(tmp_path, path)
+
+
+def load_cliques(path):
+  with np.load(path) as data:
+    ptr, nodes = data['ptr'].tolist(), data['nodes'].tolist()
+  return [tuple(nodes[ptr[i]:ptr[i + 1]]) for i in range(len(ptr) - 1)]
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+class CutPool:
+  '''Constraints added to a model by the cutting plane loop
+
+  Alongside the Gurobi constraint handles, the pool keeps the Constraint
+  each was built from, the slack and dual values from the last LP solve and
+  the number of consecutive solves in which each cut has been inactive
+  (non-binding or with zero dual).'''
+
+  def __init__(self, model):
+    self.model = model
+    self.constrs = []
+    self.cuts = []
+    self.ages = np.zeros(0, dtype=np.int64)
+    self.active_rounds = np.zeros(0, dtype=np.int64)
+    self.slack = np.zeros(0)
+    self.dual = np.zeros(0)
+
+  def __len__(self):
+    return len(self.constrs)
+
+  def __iter__(self):
+    return iter(self.constrs)
+
+  def append(self, constr, cut=None):
+    self.constrs.append(constr)
+    self.cuts.append(cut)
+
+  def extend(self, constrs, cuts=None):
+    if cuts is None:
+      cuts = [None] * len(constrs)
+    self.constrs.extend(constrs)
+    self.cuts.extend(cuts)
+
+  def _sync(self):
+    '''Extend the per-cut arrays with entries for newly added cuts'''
+    num = len(self.constrs) - len(self.ages)
+    if num > 0:
+      self.ages = np.concatenate((self.ages, np.zeros(num, dtype=np.int64)))
+      self.active_rounds = np.concatenate((self.active_rounds, np.zeros(num, dtype=np.int64)))
+      self.slack = np.concatenate((self.slack, np.zeros(num)))
+      self.dual = np.concatenate((self.dual, np.zeros(num)))
+
+  def refresh(self):
+    '''Read slacks and duals of the cuts from the last LP solve'''
+    self._sync()
+    if self.constrs:
+      self.slack = np.abs(np.array(self.model.getAttr('Slack', self.constrs)))
+      self.dual = np.array(self.model.getAttr('Pi', self.constrs))
+
+  def update(self, slack_tol=1e-6):
+    '''Record slacks and duals of the last LP solve and age inactive cuts'''
+    if not self.constrs:
+      return
+    self.refresh()
+    inactive = (self.slack > slack_tol) | (self.dual == 0.0)
+    self.ages = np.where(inactive, self.ages + 1, 0)
+    self.active_rounds += ~inactive
+
+  def remove(self, mask):
+    '''Remove the cuts selected by a boolean mask from the model and the pool'''
+    self._sync()
+    mask = np.asarray(mask, dtype=bool)
+    idx = np.flatnonzero(mask)
+    if len(idx) == 0:
+      return 0
+    self.model.remove([self.constrs[i] for i in idx])
+    self.model.update()
+    keep = np.flatnonzero(~mask)
+    self.constrs = [self.constrs[i] for i in keep]
+    self.cuts = [self.cuts[i] for i in keep]
+    self.ages = self.ages[keep]
+    self.active_rounds = self.active_rounds[keep]
+    self.slack = self.slack[keep]
+    self.dual = self.dual[keep]
+    return len(idx)
+
+  def remove_aged(self, max_age):
+    '''Remove cuts which have been inactive for at least max_age solves'''
+    self._sync()
+    return self.remove(self.ages >= max_age)
+
+  def clear(self):
+    return self.remove(np.ones(len(self), dtype=bool))
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import numpy as np
+from .separation import Constraint
+from .graph import graph_fingerprint
+
+
+def cut_pool_key(params):
+  '''Canonical string for the parameters a cut pool was generated with'''
+  return json.dumps({k: list(v) if isinstance(v, (range, tuple)) else v
+                     for k, v in params.items()}, sort_keys=True, default=list)
+
+
+def cut_pool_path(directory, G, params):
+  '''File in directory holding the cut pool of G for the given parameters'''
+  key = hashlib.sha1(cut_pool_key(params).encode()).hexdigest()[:16]
+  return os.path.join(directory, '%s-%s.npz' % (graph_fingerprint(G)[:16], key))
+
+
+def save_cut_pool(path, kpp, params):
+  '''Write the cuts in kpp.constraints to a compressed .npz file
+
+  Edges are stored by their position in kpp.edge_index, so the file is only
+  meaningful for the graph with the recorded fingerprint.'''
+  arrays = cut_arrays(kpp)
+  arrays['fingerprint'] = np.array(graph_fingerprint(kpp.G))
+  arrays['key'] = np.array(cut_pool_key(params))
+
+  tmp_path = path + '.tmp'
+  with open(tmp_path, 'wb') as f:
+    np.savez_compressed(f, **arrays)
+  os.replace(tmp_path, path)
+  return len(arrays['rhs'])
+
+
+def cut_arrays(kpp):
+  '''Cuts in kpp.constraints as a dict of arrays'''
+  cuts = [cut for cut in kpp.constraints.cuts if cut is not None]
+  position = kpp.edge_index.position
+  arrays = dict()
+  for name in ['y', 'z']:
+    ptr, pos, val = [0], [], []
+    for cut in cuts:
+      coefs = getattr(cut, name + '_coefs')
+      pos.extend(position[e] for e in coefs)
+      val.extend(coefs.values())
+      ptr.append(len(pos))
+    arrays[name + '_ptr'] = np.array(ptr, dtype=np.int64)
+    arrays[name + '_pos'] = np.array(pos, dtype=np.int64)
+    arrays[name + '_val'] = np.array(val, dtype=float)
+  ptr, nodes, cols, val = [0], [], [], []
+  for cut in cuts:
+    for (v, c), coef in cut.x_coefs.items():
+      nodes.append(v)
+      cols.append(c)
+      val.append(coef)
+    ptr.append(len(nodes))
+  arrays['x_ptr'] = np.array(ptr, dtype=np.int64)
+  arrays['x_node'] = np.array(nodes, dtype=np.int64)
+  arrays['x_col'] = np.array(cols, dtype=np.int64)
+  arrays['x_val'] = np.array(val, dtype=float)
+  arrays['rhs'] = np.array([cut.rhs for cut in cuts], dtype=float)
+  arrays['op'] = np.array([cut.op for cut in cuts], dtype='<U2')
+  return arrays
+
+
+def load_cut_pool(path, kpp, params):
+  '''Read the cuts saved for kpp.G and params as a list of Constraints
+
+  Raises ValueError if the file was written for a different graph or
+  different parameters. Cuts refering to edges or colours which do not
+  exist in kpp are skipped.'''
+  with np.load(path) as data:
+    if str(data['fingerprint']) != graph_fingerprint(kpp.G):
+      raise ValueError('Cut pool %s was saved for a different graph' % path)
+    if str(data['key']) != cut_pool_key(params):
+      raise ValueError('Cut pool %s was saved with different parameters' % path)
+    arrays = {name: data[name] for name in data.files}
+  return cuts_from_arrays(arrays, kpp)
+
+
+def cuts_from_arrays(arrays, kpp):
+  '''Constraints stored by cut_arrays, skipping those refering to edges or
+  colours which do not exist in kpp'''
+  keys = kpp.edge_index.keys
+  m = len(keys)
+  n = kpp.G.vcount()
+  K = kpp.num_colours()
+  cuts = []
+  for i in range(len(arrays['rhs'])):
+    coefs = dict()
+    for name in ['y', 'z']:
+      ptr = arrays[name + '_ptr']
+      pos = arrays[name + '_pos'][ptr[i]:ptr[i + 1]]
+      val = arrays[name + '_val'][ptr[i]:ptr[i + 1]]
+      if np.any(pos >= m):
+        break
+      coefs[name] = {keys[p]: v for p, v in zip(pos.tolist(), val.tolist())}
+    else:
+      ptr = arrays['x_ptr']
+      nodes = arrays['x_node'][ptr[i]:ptr[i + 1]]
+      cols = arrays['x_col'][ptr[i]:ptr[i + 1]]
+      if np.any(nodes >= n) or np.any(cols >= K):
+        continue
+      val = arrays['x_val'][ptr[i]:ptr[i + 1]]
+      x_coefs = {(v, c): coef for v, c, coef in zip(nodes.tolist(), cols.tolist(), val.tolist())}
+      cuts.append(Constraint(x_coefs, coefs['y'], coefs['z'],
+                             float(arrays['rhs'][i]), str(arrays['op'][i])))
+  return cuts
+
+
+def apply_cuts(kpp, cuts):
+  '''Add the cuts whose variables are present in kpp and return the others'''
+  ready, pending = [], []
+  for cut in cuts:
+    if (cut.x_coefs and not kpp.x) or (cut.z_coefs and not kpp.z):
+      pending.append(cut)
+    else:
+      ready.append(cut)
+  kpp.add_constraints(ready)
+  return pending
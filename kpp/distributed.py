@@ -0,0 +1,309 @@
+from abc import ABCMeta, abstractmethod
+import hashlib
+from importlib import import_module
+import json
+import multiprocessing
+import os
+from time import sleep, time
+import igraph as ig
+import numpy as np
+from .graph import edge_arrays, graph_fingerprint
+from .kpp_algorithm import KPPAlgorithm, KPPBasicAlgorithm
+from .cut_store import cut_pool_key
+from .result_table import to_json
+from .gurobi import shared_env
+
+
+def algorithm_spec(alg):
+  '''Serialisable description of the algorithm alg: its class, k, k2 and
+  all algorithm and Gurobi parameters'''
+  if getattr(alg, 'x_coefs', None):
+    raise ValueError('Cannot distribute a problem with x coefficients')
+  spec = {'algorithm': type(alg).__name__, 'k': alg.k,
+          'k2': getattr(alg, 'k2', None),
+          'params': dict(alg.params, **alg.gurobi_params)}
+  spec['params']['preprocess'] = False
+  spec['params']['verbosity'] = alg.verbosity
+  return spec
+
+
+def component_jobs(alg):
+  '''Serialisable jobs, one for each component of the algorithm's graph
+
+  A job holds the edges and weights of the component as lists, the
+  vertices of the input graph it contains, its maximal cliques if these
+  have been computed and the algorithm spec. Job ids are derived from the
+  graph fingerprint and parameters, so the same run gives the same ids.'''
+  spec = algorithm_spec(alg)
+  run = hashlib.sha1((graph_fingerprint(alg.G) + cut_pool_key(spec['params'])
+                      + str((spec['k'], spec['k2']))).encode()).hexdigest()[:16]
+  jobs = []
+  for i, g in enumerate(alg.components()):
+    edges, weights, _ = edge_arrays(g)
+    if 'original vertex' in g.vs.attributes():
+      vertices = g.vs['original vertex']
+    else:
+      vertices = list(range(g.vcount()))
+    job = {'job': '%s-%d' % (run, i), 'component': i, 'vertices': vertices,
+           'edges': edges.tolist(), 'weights': weights.tolist()}
+    if 'maximal cliques' in g.attributes():
+      job['cliques'] = [list(clq) for clq in g['maximal cliques']]
+    if alg.warm_start is not None:
+      job['warm start'] = np.asarray(alg.warm_start)[vertices].tolist()
+    job.update(spec)
+    jobs.append(job)
+  return jobs
+
+
+def job_graph(job):
+  '''Component graph of a job'''
+  g = ig.Graph(n=len(job['vertices']), edges=job['edges'])
+  g.es['weight'] = job['weights']
+  if 'cliques' in job:
+    g['maximal cliques'] = [tuple(clq) for clq in job['cliques']]
+  return g
+
+
+def solve_job(job):
+  '''Solve the component of a job, returning its record as yielded by
+  iter_components'''
+  g = job_graph(job)
+  params = dict(job['params'])
+  params['warm_start'] = job.get('warm start')
+  if job['algorithm'] == 'KPPAlgorithm':
+    alg = KPPAlgorithm(g, job['k'], job['k2'], **params)
+  elif job['algorithm'] == 'KPPBasicAlgorithm':
+    alg = KPPBasicAlgorithm(g, job['k'], **params)
+  else:
+    raise ValueError('Unknown algorithm %s' % job['algorithm'])
+  record = next(alg.iter_components())
+  record['component'] = job['component']
+  record['vertices'] = job['vertices']
+  return record
+
+
+class JobQueue(metaclass=ABCMeta):
+  '''Queue of jobs shared by a coordinator and its workers
+
+  Jobs and results are dicts which can be written as JSON; jobs are
+  identified by their 'job' field.'''
+
+  @abstractmethod
+  def put(self, job):
+    '''Add a job, discarding any earlier result of it'''
+    pass
+
+  @abstractmethod
+  def claim(self):
+    '''Remove a job from the queue and return it, or None if there is none'''
+    pass
+
+  @abstractmethod
+  def complete(self, job, result):
+    '''Store the result of a claimed job'''
+    pass
+
+  @abstractmethod
+  def result(self, job_id):
+    '''Result of a job, or None if it has not been completed'''
+    pass
+
+
+class FileQueue(JobQueue):
+  '''JobQueue held in a directory, shared by processes on one machine or
+  on a shared file system
+
+  Each job is a JSON file in the jobs subdirectory. A worker claims a job
+  by renaming it into the claimed subdirectory, which only one worker can
+  do, and results are written to the results subdirectory. Files are
+  written under a temporary name and renamed, so readers never see
+  partial files.'''
+
+  def __init__(self, directory):
+    self.directory = directory
+    for name in ['jobs', 'claimed', 'results']:
+      os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+  def path(self, name, job_id):
+    return os.path.join(self.directory, name, job_id + '.json')
+
+  def _write(self, path, obj):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+      f.write(to_json(obj))
+    os.replace(tmp_path, path)
+
+  def put(self, job):
+    if os.path.exists(self.path('results', job['job'])):
+      os.remove(self.path('results', job['job']))
+    self._write(self.path('jobs', job['job']), job)
+
+  def claim(self):
+    for name in sorted(os.listdir(os.path.join(self.directory, 'jobs'))):
+      if not name.endswith('.json'):
+        continue
+      claimed = os.path.join(self.directory, 'claimed', name)
+      try:
+        os.rename(os.path.join(self.directory, 'jobs', name), claimed)
+      except FileNotFoundError:
+        continue  # Claimed by another worker
+      with open(claimed) as f:
+        return json.load(f)
+    return None
+
+  def complete(self, job, result):
+    self._write(self.path('results', job['job']), result)
+    os.remove(self.path('claimed', job['job']))
+
+  def result(self, job_id):
+    path = self.path('results', job_id)
+    if not os.path.exists(path):
+      return None
+    with open(path) as f:
+      return json.load(f)
+
+
+def run_worker(queue, poll_interval=None, stop=None):
+  '''Claim and solve jobs from queue until it is empty
+
+  With poll_interval, an empty queue is checked again after that many
+  seconds instead, so the worker runs until stop (an Event) is set or it is
+  killed. A job whose solve raises an exception is completed with a result
+  holding the error, and the worker moves on. Returns the number of jobs
+  solved.'''
+  count = 0
+  while stop is None or not stop.is_set():
+    job = queue.claim()
+    if job is None:
+      if poll_interval is None:
+        return count
+      sleep(poll_interval)
+      continue
+    try:
+      result = solve_job(job)
+    except Exception as err:
+      queue.complete(job, {'job': job['job'], 'component': job['component'],
+                           'error': repr(err)})
+      continue
+    queue.complete(job, result)
+    count += 1
+  return count
+
+
+def _file_worker(directory, poll_interval=None, stop=None):
+  if stop is not None:
+    shared_env()  # Started once, before the first job
+  run_worker(FileQueue(directory), poll_interval, stop)
+
+
+def warm_up():
+  '''Import the modules used to solve jobs, so that processes forked
+  afterwards start with them loaded'''
+  for name in ['gurobipy', 'scipy.sparse', 'igraph']:
+    import_module(name)
+
+
+class WorkerPool:
+  '''Worker processes which serve a FileQueue until the pool is closed
+
+  The processes are forked from an interpreter which has already imported
+  gurobipy and the other modules used by solve_job, and each keeps its
+  Gurobi environment for all the jobs it solves, so a job only pays for
+  building and solving its model. Pass the pool to solve_distributed to
+  reuse its workers across runs. Idle workers check the queue every
+  poll_interval seconds; close lets them finish their current job.'''
+
+  def __init__(self, directory, processes=2, poll_interval=0.1):
+    warm_up()
+    context = multiprocessing.get_context('fork')
+    self.stop = context.Event()
+    self.workers = [context.Process(target=_file_worker, daemon=True,
+                                    args=(directory, poll_interval, self.stop))
+                    for _ in range(processes)]
+    for worker in self.workers:
+      worker.start()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def alive(self):
+    return any(worker.is_alive() for worker in self.workers)
+
+  def close(self, timeout=None):
+    '''Stop the workers once their current jobs are done, killing those
+    still running after timeout seconds'''
+    self.stop.set()
+    for worker in self.workers:
+      worker.join(timeout)
+      if worker.is_alive():
+        worker.terminate()
+        worker.join()
+
+
+def solve_distributed(alg, queue, processes=2, poll_interval=0.1, timeout=None, pool=None):
+  '''Solve the components of alg's graph as jobs on queue and merge the
+  results into KPPAlgorithmResults
+
+  Jobs whose results are already on the queue are not submitted again,
+  unless the result is an error. If pool, a WorkerPool serving queue, is given its workers solve the jobs.
+  Otherwise, if queue is a FileQueue and processes > 0, that many local
+  worker processes are started for this run; else workers must be run
+  elsewhere, e.g. with run_worker. Raises RuntimeError if a job fails or
+  if the results are not all in after timeout seconds.'''
+  jobs = component_jobs(alg)
+  for job in jobs:
+    result = queue.result(job['job'])
+    if result is None or 'error' in result:
+      queue.put(job)
+  workers = []
+  if pool is None and isinstance(queue, FileQueue):
+    workers = [multiprocessing.Process(target=_file_worker, args=(queue.directory,))
+               for _ in range(processes)]
+  for worker in workers:
+    worker.start()
+  start = time()
+  records = dict()
+  try:
+    while True:
+      # Checked before collecting, as workers exit after their last result
+      alive = any(worker.is_alive() for worker in workers)
+      for job in jobs:
+        if job['job'] not in records:
+          result = queue.result(job['job'])
+          if result is not None and 'error' in result:
+            raise RuntimeError('Job %s (component %d) failed: %s' %
+                               (job['job'], job['component'], result['error']))
+          if result is not None:
+            records[job['job']] = result
+      if len(records) == len(jobs):
+        break
+      if timeout is not None and time() - start > timeout:
+        raise RuntimeError('Distributed solve timed out with %d of %d components solved' %
+                           (len(records), len(jobs)))
+      if (workers and not alive) or (pool is not None and not pool.alive()):
+        raise RuntimeError('Workers stopped with %d of %d components solved' %
+                           (len(records), len(jobs)))
+      sleep(poll_interval)
+  except BaseException:
+    for worker in workers:
+      worker.terminate()
+    raise
+  finally:
+    for worker in workers:
+      worker.join()
+  return alg.collect_results([records[job['job']] for job in jobs])
+
+
+if __name__ == '__main__':
+  # python -m kpp.distributed DIRECTORY [PROCESSES] serves the queue in
+  # DIRECTORY until interrupted
+  import sys
+  with WorkerPool(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1) as pool:
+    try:
+      for worker in pool.workers:
+        worker.join()
+    except KeyboardInterrupt:
+      pass
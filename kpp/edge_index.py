@@ -0,0 +1,49 @@
+from itertools import combinations
+import numpy as np
+from .graph import edge_arrays
+
+
+class EdgeIndex:
+  '''Canonical numbering of the edges of a graph
+
+  Edges are numbered in lexicographic order of their end points: edge i
+  has end points edges[i] = (u, v) with u < v, weight weights[i] and igraph
+  edge id eids[i]. Variables and solution vectors indexed by edge use this
+  numbering.'''
+
+  def __init__(self, G):
+    self.n = G.vcount()
+    self.edges, self.weights, self.eids = edge_arrays(G)
+    self.m = len(self.edges)
+    self.keys = [tuple(e) for e in self.edges.tolist()]
+    self.position = {e: i for i, e in enumerate(self.keys)}
+    self._codes = self.edges[:, 0] * self.n + self.edges[:, 1]
+
+  def __len__(self):
+    return self.m
+
+  def positions(self, pairs):
+    '''Positions of the edges given by an array of vertex pairs
+
+    pairs has shape (..., 2) and the result has the leading shape of pairs.
+    Raises KeyError if any pair is not an edge of the graph.'''
+    pairs = np.asarray(pairs, dtype=np.int64)
+    if pairs.size == 0:
+      return np.zeros(pairs.shape[:-1], dtype=np.int64)
+    u = np.minimum(pairs[..., 0], pairs[..., 1])
+    v = np.maximum(pairs[..., 0], pairs[..., 1])
+    codes = u * self.n + v
+    if self.m == 0:
+      raise KeyError('Graph has no edges')
+    loc = np.minimum(np.searchsorted(self._codes, codes), self.m - 1)
+    if np.any(self._codes[loc] != codes):
+      raise KeyError('Vertex pairs are not all edges of the graph')
+    return loc
+
+  def clique_positions(self, cliques, p):
+    '''Edge positions of each clique in a (num cliques, p) array of nodes
+
+    Returns an array of shape (num cliques, p(p-1)/2).'''
+    cliques = np.asarray(cliques, dtype=np.int64).reshape(-1, p)
+    pairs = np.array(list(combinations(range(p), 2)), dtype=np.int64).reshape(-1, 2)
+    return self.positions(np.stack((cliques[:, pairs[:, 0]], cliques[:, pairs[:, 1]]), axis=-1))
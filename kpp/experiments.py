@@ -0,0 +1,212 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from time import time
+import numpy as np
+from .graph import Decomposition, graph_fingerprint
+from .kpp_algorithm import KPPAlgorithm, KPPBasicAlgorithm, strip_record
+from .cut_store import cut_pool_key
+from .result_table import ResultTable
+from .result_writer import ResultWriter, read_results
+from .clique_cache import shared_cache, induced_cliques
+from .separation import CliqueIndex
+
+
+class GraphAnalysis:
+  '''Decomposition of a graph and maximal cliques of each component
+
+  Computed once and passed to the algorithm classes through their analysis
+  argument, so that runs with different parameters on the same graph share
+  the work. The components carry the 'original vertex' and 'maximal
+  cliques' attributes used by the algorithms. If the maximal cliques of G
+  are given, those of the components are derived from them rather than
+  enumerated again.'''
+
+  def __init__(self, G, k, preprocess=True, cliques=None):
+    self.k = k
+    self.preprocess = preprocess
+    start = time()
+    G = G.copy()
+    G.vs['original vertex'] = list(range(G.vcount()))
+    self.decomposition = Decomposition(G, k) if preprocess else None
+    self.components = self.decomposition.components if preprocess else [G]
+    self.preprocess_time = time() - start
+    for g in self.components:
+      if cliques is None:
+        g['maximal cliques'] = shared_cache.maximal_cliques(g)
+      else:
+        g['maximal cliques'] = induced_cliques(cliques, g.vs['original vertex'])
+
+
+def parameter_grid(grid):
+  '''List of parameter dicts for every combination of the values in grid'''
+  keys = list(grid)
+  return [dict(zip(keys, values)) for values in product(*(grid[key] for key in keys))]
+
+
+def experiment_jobs(instances, grid):
+  '''Jobs (job id, instance name, parameters) for every instance and
+  combination of parameters in grid'''
+  return [('%s/%d' % (name, i), name, params)
+          for name in instances
+          for i, params in enumerate(parameter_grid(grid))]
+
+
+def run_job(G, params, analysis=None, time_limit=None):
+  '''Run one experiment and return the records of its components
+
+  params holds k (and k2 to select KPPAlgorithm instead of
+  KPPBasicAlgorithm) along with the algorithm and Gurobi parameters.'''
+  params = dict(params)
+  k, k2 = params.pop('k'), params.pop('k2', None)
+  params.setdefault('verbosity', 0)
+  if time_limit is not None:
+    params['time limit'] = time_limit
+  if k2 is None:
+    alg = KPPBasicAlgorithm(G, k, analysis=analysis, **params)
+  else:
+    alg = KPPAlgorithm(G, k, k2, analysis=analysis, **params)
+  return [strip_record(record) for record in alg.iter_components()]
+
+
+_worker_state = dict()
+
+
+def _init_worker(instances, analyses):
+  _worker_state['instances'] = instances
+  _worker_state['analyses'] = analyses
+
+
+def _run_worker_job(name, params, time_limit):
+  analysis = _worker_state['analyses'].get((name, params['k'], params.get('preprocess', False)))
+  return run_job(_worker_state['instances'][name], params, analysis, time_limit)
+
+
+def run_experiments(instances, grid, path=None, processes=None, time_limit=None,
+                    resume=True):
+  '''Run the algorithms on every instance with every combination of the
+  parameter values in grid
+
+  instances maps names to graphs and grid maps parameter names (including
+  k and optionally k2) to lists of values. Each instance is decomposed and
+  its cliques enumerated once for each value of k. Jobs are run in a pool
+  of processes worker processes (in this process if processes is None) and
+  each is limited to time_limit seconds. If path is given, the records of
+  each job are appended to that file as soon as the job finishes, and with
+  resume jobs already recorded there are skipped. Returns a ResultTable with
+  one row per component per job, including the job id, instance name and
+  grid parameters.'''
+  jobs = experiment_jobs(instances, grid)
+  done = dict()
+  writer = None
+  if path is not None:
+    header = {'instances': {name: graph_fingerprint(G) for name, G in instances.items()},
+              'grid': cut_pool_key(grid), 'time limit': time_limit}
+    writer = ResultWriter(path, header, resume=resume, key='job')
+    if resume:
+      done = {record['job']: record['components'] for record in read_results(path)[1]}
+
+  def record(job_id, components):
+    done[job_id] = components
+    if writer is not None:
+      writer.write({'job': job_id, 'components': components})
+
+  try:
+    todo = [job for job in jobs if job[0] not in done]
+    analyses = dict()
+    for _, name, params in todo:
+      key = (name, params['k'], params.get('preprocess', False))
+      if key not in analyses:
+        analyses[key] = GraphAnalysis(instances[name], key[1], key[2])
+    if processes is None:
+      _init_worker(instances, analyses)
+      for job_id, name, params in todo:
+        record(job_id, _run_worker_job(name, params, time_limit))
+    else:
+      with ProcessPoolExecutor(processes, initializer=_init_worker,
+                               initargs=(instances, analyses)) as pool:
+        futures = {pool.submit(_run_worker_job, name, params, time_limit): job_id
+                   for job_id, name, params in todo}
+        for future in as_completed(futures):
+          record(futures[future], future.result())
+  finally:
+    if writer is not None:
+      writer.close()
+
+  rows = []
+  for job_id, name, params in jobs:
+    for i, results in enumerate(done[job_id]):
+      row = {'job': job_id, 'instance': name, 'component': i}
+      row.update(params)
+      row.update(results)
+      rows.append(row)
+  return ResultTable.from_records(rows)
+
+
+def solve_k_range(G, k_values, k2_values=None, **params):
+  '''Solve G for every value in k_values (and every k2 in k2_values, with
+  KPPAlgorithm) and return a ResultTable with one row per value
+
+  The maximal cliques of G are enumerated once, the p-cliques of each
+  component are indexed once and shared by the separators of every k for
+  which the component appears, and each problem is warm started from the
+  best colouring found for a previous value which is valid for it: values
+  are solved in increasing order and a colouring with k colours (and k2
+  colours per group) is also one with more. params are passed to the
+  algorithm classes.'''
+  params = dict(params)
+  params.setdefault('verbosity', 0)
+  preprocess = params.get('preprocess', False)
+  cliques = shared_cache.maximal_cliques(G)
+  indices = dict()
+  solutions = []
+  rows = []
+  for k in sorted(k_values):
+    start = time()
+    analysis = GraphAnalysis(G, k, preprocess, cliques=cliques)
+    for g in analysis.components:
+      key = tuple(g.vs['original vertex'])
+      if key not in indices:
+        indices[key] = CliqueIndex(g['maximal cliques'])
+      g['clique index'] = indices[key]
+    analysis_time = time() - start
+    for k2 in sorted(k2_values) if k2_values else [None]:
+      start = time()
+      warm_start = best_warm_start(solutions, k, k2)
+      if k2 is None:
+        alg = KPPBasicAlgorithm(G, k, analysis=analysis, warm_start=warm_start, **params)
+      else:
+        alg = KPPAlgorithm(G, k, k2, analysis=analysis, warm_start=warm_start, **params)
+      records = list(alg.iter_components())
+      labels = np.full(G.vcount(), -1, dtype=np.int64)
+      for record in records:
+        if record['colouring'] is not None:
+          labels[record['vertices']] = record['colouring']
+      table = ResultTable.from_records([strip_record(record) for record in records])
+      ub = float(table.sum('ub'))
+      solutions.append((k, k2, labels, ub))
+      rows.append({'k': k, 'k2': k2, 'components': len(records),
+                   'optimal value': float(table.sum('optimal value')),
+                   'lb': float(table.sum('lb')), 'ub': ub,
+                   'optimality': bool(np.all(table.optimal())),
+                   'branch and bound nodes': int(table.sum('branch and bound nodes')),
+                   'warm started': int(table.sum('warm start')),
+                   'time': time() - start + analysis_time})
+      analysis_time = 0.0
+  return ResultTable.from_records(rows)
+
+
+def best_warm_start(solutions, k, k2=None):
+  '''Labels of the cheapest of the solutions (k, k2, labels, cost) whose
+  colouring is also one with k colours (and k2 colours per group),
+  relabelled for k, or None if there is none
+
+  Colour c of a solution for (k, k2) is colour c % k of group c // k.
+  Vertices which were not coloured have label -1.'''
+  best = None
+  for k_old, k2_old, labels, cost in solutions:
+    if k_old > k or (k2_old or 1) > (k2 or 1) or not np.isfinite(cost):
+      continue
+    if best is None or cost < best[1]:
+      groups, subs = labels % k_old, labels // k_old
+      best = (np.where(labels < 0, -1, groups + k * subs), cost)
+  return None if best is None else best[0]
@@ -1,2 +1,4 @@
 from .graph_decomposition import *
 from .graph_generation import disk_graph, nbrs_of_nbr
+from .edge_list import graph_from_edges, load_edges, edge_arrays, graph_fingerprint
+from .colouring import k_colouring, uncolourable_subgraph
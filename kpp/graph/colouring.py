@@ -0,0 +1,158 @@
+from heapq import heappush, heappop
+import numpy as np
+
+
+def k_colouring(G, k):
+  '''Colouring of G using at most k colours, or None if G is not k-colourable
+
+  Vertices of degree less than k are peeled off first, the remaining core is
+  coloured exactly by DSATUR backtracking and the peeled vertices are then
+  coloured greedily in reverse order. Returns an array of labels.'''
+  adj = [set(nbrs) for nbrs in G.get_adjlist()]
+  labels = _colour(adj, set(range(G.vcount())), k)
+  if labels is None:
+    return None
+  return np.array([labels[v] for v in range(G.vcount())], dtype=np.int64)
+
+
+def uncolourable_subgraph(G, k):
+  '''Vertices of a vertex-critical subgraph of G which is not k-colourable
+
+  Every proper subset of the returned vertices induces a k-colourable
+  subgraph. Returns None if G is k-colourable.'''
+  adj = [set(nbrs) for nbrs in G.get_adjlist()]
+  core, _ = _peel(adj, set(range(G.vcount())), k)
+  for comp in _components(adj, core):
+    if _dsatur(adj, comp, k) is None:
+      vertices = comp
+      break
+  else:
+    return None
+  for v in sorted(vertices):
+    rest = vertices - {v}
+    if _colour(adj, rest, k) is None:
+      vertices = rest
+  return sorted(vertices)
+
+
+def _peel(adj, vertices, k):
+  '''Split vertices into the k-core of the subgraph they induce and the
+  peeled vertices in order of removal'''
+  degree = {v: len(adj[v] & vertices) for v in vertices}
+  core = set(vertices)
+  stack = [v for v in vertices if degree[v] < k]
+  peeled = []
+  while stack:
+    v = stack.pop()
+    if v not in core:
+      continue
+    core.remove(v)
+    peeled.append(v)
+    for u in adj[v] & core:
+      degree[u] -= 1
+      if degree[u] == k - 1:
+        stack.append(u)
+  return core, peeled
+
+
+def _components(adj, vertices):
+  remaining = set(vertices)
+  while remaining:
+    comp = set()
+    stack = [remaining.pop()]
+    while stack:
+      v = stack.pop()
+      comp.add(v)
+      nbrs = adj[v] & remaining
+      remaining -= nbrs
+      stack.extend(nbrs)
+    yield comp
+
+
+def _colour(adj, vertices, k):
+  '''Map of vertices to colours in range(k), or None if the subgraph induced
+  by vertices is not k-colourable'''
+  core, peeled = _peel(adj, vertices, k)
+  labels = dict()
+  for comp in _components(adj, core):
+    comp_labels = _dsatur(adj, comp, k)
+    if comp_labels is None:
+      return None
+    labels.update(comp_labels)
+  for v in reversed(peeled):
+    used = {labels[u] for u in adj[v] if u in labels}
+    labels[v] = min(c for c in range(k) if c not in used)
+  return labels
+
+
+def _dsatur(adj, comp, k):
+  '''Exact k-colouring of a connected vertex set by DSATUR backtracking
+
+  The search runs on an explicit stack, so large components do not hit the
+  recursion limit. For each vertex the number of neighbours of each colour
+  and its saturation (the number of distinct neighbour colours) are updated
+  as vertices are coloured and uncoloured, and the uncoloured vertices are
+  kept in one heap per saturation, keyed by position in order of
+  decreasing degree, with stale entries skipped when popped.'''
+  order = sorted(comp, key=lambda v: -len(adj[v] & comp))
+  pos = {v: i for i, v in enumerate(order)}
+  nbrs = [[pos[u] for u in adj[v] & comp] for v in order]
+  n = len(order)
+  counts = [[0] * k for _ in range(n)]  # Neighbours of each colour
+  sat = [0] * n
+  used = [0] * k  # Vertices of each colour
+  labels = [-1] * n
+  heaps = [list(range(n))] + [[] for _ in range(k)]
+  coloured = 0
+
+  def colour(v, c):
+    labels[v] = c
+    used[c] += 1
+    for u in nbrs[v]:
+      counts[u][c] += 1
+      if counts[u][c] == 1:
+        sat[u] += 1
+        if labels[u] < 0:
+          heappush(heaps[sat[u]], u)
+
+  def uncolour(v):
+    c = labels[v]
+    labels[v] = -1
+    used[c] -= 1
+    for u in nbrs[v]:
+      counts[u][c] -= 1
+      if counts[u][c] == 0:
+        sat[u] -= 1
+        if labels[u] < 0:
+          heappush(heaps[sat[u]], u)
+    heappush(heaps[sat[v]], v)
+
+  def select():
+    for s in range(k, -1, -1):
+      heap = heaps[s]
+      while heap and (labels[heap[0]] >= 0 or sat[heap[0]] != s):
+        heappop(heap)
+      if heap:
+        return heap[0]
+
+  stack = []  # Frames [vertex, candidate colours, next candidate]
+  while coloured < n:
+    v = select()
+    # Colours are interchangeable, so only one unused colour needs trying
+    top = min(k, max((c for c in range(k) if used[c]), default=-1) + 2)
+    stack.append([v, [c for c in range(top) if counts[v][c] == 0], 0])
+    while stack:
+      frame = stack[-1]
+      v, candidates, i = frame
+      if labels[v] >= 0:
+        uncolour(v)
+        coloured -= 1
+      if i < len(candidates):
+        frame[2] += 1
+        colour(v, candidates[i])
+        coloured += 1
+        break
+      stack.pop()
+    else:
+      return None
+  return {v: labels[pos[v]] for v in order}
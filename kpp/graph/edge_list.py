@@ -0,0 +1,101 @@
+import hashlib
+import igraph as ig
+import numpy as np
+
+
+def canonical_edges(src, dst):
+  '''Sort end points of each edge and the edges lexicographically
+
+  Returns the sorted (m, 2) edge array and the permutation applied to the
+  input edges.'''
+  src = _vertex_ids(src)
+  dst = _vertex_ids(dst)
+  if src.shape != dst.shape or src.ndim != 1:
+    raise ValueError('src and dst must be one-dimensional arrays of equal length')
+  u = np.minimum(src, dst)
+  v = np.maximum(src, dst)
+  order = np.lexsort((v, u))
+  edges = np.column_stack((u[order], v[order]))
+  return edges, order
+
+
+def _vertex_ids(arr):
+  arr = np.asarray(arr)
+  if not np.issubdtype(arr.dtype, np.integer):
+    if not np.all(np.mod(arr, 1) == 0):
+      raise ValueError('Vertex ids must be integers')
+  return arr.astype(np.int64)
+
+
+def graph_from_edges(src, dst, weight=None, n=None):
+  '''Build a graph in bulk from arrays of edge end points
+
+  Edge ids of the resulting graph follow the lexicographic order of the
+  canonical (min, max) end points, so edge_arrays returns the edges in
+  edge id order for graphs built by this function.'''
+  edges, order = canonical_edges(src, dst)
+  if len(edges) > 0:
+    if np.any(edges[:, 0] == edges[:, 1]):
+      raise ValueError('Edge list contains self loops')
+    if np.any(np.all(edges[1:] == edges[:-1], axis=1)):
+      raise ValueError('Edge list contains duplicate edges')
+    if edges[0, 0] < 0:
+      raise ValueError('Edge list contains negative vertex ids')
+  max_vertex = int(edges[:, 1].max()) + 1 if len(edges) > 0 else 0
+  if n is None:
+    n = max_vertex
+  elif n < max_vertex:
+    raise ValueError('Edge list refers to vertex %d but n = %d' % (max_vertex - 1, n))
+
+  G = ig.Graph(n=n, edges=edges)
+  if weight is not None:
+    weight = np.asarray(weight, dtype=float)
+    if weight.shape != order.shape:
+      raise ValueError('weight must have one entry per edge')
+    G.es['weight'] = weight[order].tolist()
+  return G
+
+
+def load_edges(path, weight_path=None, n=None, mmap_mode='r'):
+  '''Build a graph from an edge list stored in .npy files
+
+  The file at path holds an (m, 2) array of end points or an (m, 3) array
+  whose last column gives edge weights. Weights may instead be given as a
+  separate length m array in weight_path. Files are memory-mapped so only
+  the columns are read into memory when building the graph.'''
+  arr = np.load(path, mmap_mode=mmap_mode)
+  if arr.ndim != 2 or arr.shape[1] not in (2, 3):
+    raise ValueError('Edge file must hold an (m, 2) or (m, 3) array')
+  weight = None
+  if arr.shape[1] == 3:
+    weight = arr[:, 2]
+  if weight_path is not None:
+    weight = np.load(weight_path, mmap_mode=mmap_mode)
+  return graph_from_edges(arr[:, 0], arr[:, 1], weight=weight, n=n)
+
+
+def edge_arrays(G):
+  '''Canonical sorted edge array and weight vector of a graph
+
+  Returns an (m, 2) integer array holding the end points (min, max) of
+  every edge in lexicographic order, the matching vector of edge weights
+  (all ones if the graph has no weight attribute) and the igraph edge id of
+  each row.'''
+  m = G.ecount()
+  edges = np.array(G.get_edgelist(), dtype=np.int64).reshape(m, 2)
+  edges, eids = canonical_edges(edges[:, 0], edges[:, 1])
+  if 'weight' in G.es.attributes():
+    weights = np.array(G.es['weight'], dtype=float)[eids]
+  else:
+    weights = np.ones(m)
+  return edges, weights, eids
+
+
+def graph_fingerprint(G):
+  '''Hex digest identifying a graph by its vertex count, edges and weights'''
+  edges, weights, _ = edge_arrays(G)
+  h = hashlib.sha1()
+  h.update(np.int64(G.vcount()).tobytes())
+  h.update(np.ascontiguousarray(edges).tobytes())
+  h.update(np.ascontiguousarray(weights).tobytes())
+  return h.hexdigest()
@@ -19,6 +19,181 @@ def decompose_graph(G, k):
     components.append(graph)
   return components
 
+class Decomposition:
+  '''decompose_graph with a record of its steps, so that colourings of the
+  components can be lifted to a colouring of the whole graph
+
+  The components are those of decompose_graph(G, k), in the same order, and
+  their 'original vertex' attribute gives the corresponding vertex of G.
+  Colours are labels c in group c % k, as used by KPP (one colour per
+  group) and KPPExtension. Both problems split at cut vertices, as the
+  colours of a block can be permuted to agree with those of another block
+  at their common vertex, and vertices of degree below k can be removed,
+  as they can be put back into a group none of their neighbours has.'''
+
+  def __init__(self, G, k):
+    self.k = k
+    self.n = G.vcount()
+    self.m = G.ecount()
+    G = G.copy()
+    G.vs['original vertex'] = list(range(self.n))
+    self.components = []
+    self.steps = []  # Graphs processed, each after the one which produced it
+    to_process = [self.step(G)]
+    while len(to_process) > 0:
+      step = to_process.pop()
+      graph = step['graph']
+      bicomps = graph.biconnected_components()
+      if len(bicomps) > 1:
+        for bicomp in bicomps:
+          step['children'].append(self.step(graph.subgraph(bicomp)))
+        to_process.extend(step['children'])
+        continue
+      if min(graph.degree(range(graph.vcount())), default=0) < k:
+        step['peeled'] = peel_order(graph, k)
+        core = graph.k_core(k)
+        if core.vcount() > k:
+          step['children'].append(self.step(core))
+          to_process.append(step['children'][0])
+        continue
+      step['component'] = len(self.components)
+      self.components.append(graph)
+
+  def step(self, graph):
+    step = {'graph': graph, 'children': [], 'peeled': None, 'component': None}
+    self.steps.append(step)
+    return step
+
+  def stats(self):
+    '''Size of the reduction: components, vertices and edges of G in no
+    component and vertices split between several components'''
+    counts = np.zeros(self.n, dtype=np.int64)
+    for g in self.components:
+      counts[g.vs['original vertex']] += 1
+    return {'components': len(self.components),
+            'removed vertices': int(np.count_nonzero(counts == 0)),
+            'removed edges': self.m - sum(g.ecount() for g in self.components),
+            'split vertices': int(np.count_nonzero(counts > 1)),
+            'largest component': max((g.vcount() for g in self.components), default=0)}
+
+  def lift(self, colourings):
+    '''Labels of the vertices of G from a colouring of each component
+
+    colourings holds the labels of the vertices of each component. The cost
+    of the result is the sum of the costs of the component colourings.'''
+    labels = dict()
+    for step in reversed(self.steps):
+      graph = step['graph']
+      vertices = graph.vs['original vertex']
+      if step['component'] is not None:
+        labels[id(step)] = dict(zip(vertices, colourings[step['component']]))
+        continue
+      lifted = self.glue_blocks([labels.pop(id(child)) for child in step['children']])
+      if step['peeled'] is not None:
+        for v in reversed(step['peeled']):
+          used = {lifted[vertices[u]] % self.k for u in graph.neighbors(v)
+                  if vertices[u] in lifted}
+          lifted[vertices[v]] = min(set(range(self.k)) - used)
+      for v in vertices:
+        lifted.setdefault(v, 0)  # Isolated vertices
+      labels[id(step)] = lifted
+    return np.array([labels[id(self.steps[0])][v] for v in range(self.n)], dtype=np.int64)
+
+  def glue_blocks(self, blocks):
+    '''Labels of the union of blocks, dicts of labels which overlap in
+    single vertices like the blocks of a graph, glued along the block-cut
+    tree so that each block meets the blocks before it in one vertex'''
+    owners = dict()
+    for i, block in enumerate(blocks):
+      for v in block:
+        owners.setdefault(v, []).append(i)
+    lifted = dict()
+    queued = [False] * len(blocks)
+    for root in range(len(blocks)):
+      if queued[root]:
+        continue
+      queued[root] = True
+      queue = [root]
+      while queue:
+        block = blocks[queue.pop()]
+        self.glue(lifted, block)
+        for v in block:
+          for j in owners[v]:
+            if not queued[j]:
+              queued[j] = True
+              queue.append(j)
+    return lifted
+
+  def glue(self, lifted, block):
+    '''Add the labels of block to lifted, permuting the groups and the
+    colours within a group so that they agree at a common vertex'''
+    common = [v for v in block if v in lifted]
+    if common:
+      c, t = block[common[0]], lifted[common[0]]
+      k = self.k
+      groups = {c % k: t % k, t % k: c % k}
+      subs = {c // k: t // k, t // k: c // k}
+      for v, label in block.items():
+        group, sub = label % k, label // k
+        if group == c % k:
+          sub = subs.get(sub, sub)
+        block[v] = groups.get(group, group) + k * sub
+    for v, label in block.items():
+      lifted.setdefault(v, label)
+
+
+def peel_order(graph, k):
+  '''Vertices outside the k-core of graph, in an order in which each has
+  fewer than k neighbours among the later vertices and the k-core'''
+  degree = graph.degree(range(graph.vcount()))
+  removed = [False] * graph.vcount()
+  stack = [v for v in range(graph.vcount()) if degree[v] < k]
+  for v in stack:
+    removed[v] = True
+  order = []
+  while stack:
+    v = stack.pop()
+    order.append(v)
+    for u in graph.neighbors(v):
+      degree[u] -= 1
+      if degree[u] < k and not removed[u]:
+        removed[u] = True
+        stack.append(u)
+  return order
+
+
+def z_part(graph, k2):
+  '''Edges of graph, as a boolean array indexed by edge id, whose z
+  variable is needed by KPPExtension with k2 colours per group
+
+  A vertex outside the k2-core can be given a colour of its group which
+  none of its neighbours has, when put back after the vertices it precedes
+  in the peeling order, so some optimal solution has no z-clash on an edge
+  leaving the k2-core.'''
+  if graph.ecount() == 0:
+    return np.zeros(0, dtype=bool)
+  in_core = np.array(graph.coreness()) >= k2
+  edges = np.array(graph.get_edgelist(), dtype=np.int64)
+  return in_core[edges[:, 0]] & in_core[edges[:, 1]]
+
+
+def z_repair(graph, labels, k, k2):
+  '''Labels with the colours within each group of the vertices outside the
+  k2-core changed so that no edge of graph leaving the k2-core is a
+  z-clash; y-clashes are unchanged, so the cost does not increase'''
+  labels = np.array(labels, dtype=np.int64)
+  order = peel_order(graph, k2)
+  placed = np.ones(graph.vcount(), dtype=bool)
+  placed[order] = False
+  for v in reversed(order):
+    group = labels[v] % k
+    used = {labels[u] // k for u in graph.neighbors(v)
+            if placed[u] and labels[u] % k == group}
+    labels[v] = group + k * min(set(range(k2)) - used)
+    placed[v] = True
+  return labels
+
+
 def avg_degree(graph):
   return np.mean(graph.degree(range(graph.vcount())))
 
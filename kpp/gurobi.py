@@ -0,0 +1,46 @@
+import os
+import threading
+from importlib import import_module
+
+
+class _Gurobipy:
+  '''Stand-in for the gurobipy module which imports it on first attribute
+  access, so that importing kpp does not load Gurobi'''
+
+  def __getattr__(self, name):
+    return getattr(import_module('gurobipy'), name)
+
+
+gp = _Gurobipy()
+
+_local = threading.local()
+
+
+def _reset_envs():
+  global _local
+  _local = threading.local()
+
+
+# A forked process must start its own environment
+os.register_at_fork(after_in_child=_reset_envs)
+
+
+def shared_env():
+  '''Gurobi environment shared by the models built in this thread
+
+  It is started, with output disabled, when the first model is built, and
+  reused by later models so that each job of a long-running worker does not
+  pay for starting one. Threads get separate environments, as Gurobi
+  environments must not be used from several threads at once.'''
+  env = getattr(_local, 'env', None)
+  if env is None:
+    env = gp.Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.start()
+    _local.env = env
+  return env
+
+
+def new_model():
+  '''Empty Gurobi model in the shared environment'''
+  return gp.Model(env=shared_env())
@@ -1,14 +1,79 @@
+import numpy as np
 from .kpp import KPP
+from .graph import edge_arrays
 
 
-def two_stage_kpp_heuristic(G, k1, k2, verbosity=0):
+def two_stage_kpp_heuristic(G, k1, k2, verbosity=0, models=None):
+  '''Cost of solving KPP with k1 colours and then KPP with k2 colours on
+  each colour class
+
+  If models is a list, each KPP is appended to it before it is solved, so
+  another thread can terminate it.'''
+  if models is None:
+    models = []
   k1pp = KPP(G, k1, verbosity=verbosity)
+  models.append(k1pp)
   k1pp.solve()
   k_col = k1pp.get_colouring()
   obj = k1pp.model.objVal
   for i, nds in zip(range(k1), k_col):
     g = G.subgraph(nds)
     k2pp = KPP(g, k2, verbosity=verbosity)
+    models.append(k2pp)
     k2pp.solve()
     obj += k2pp.model.objVal
   return obj
+
+
+def neighbour_arrays(G):
+  '''Neighbours and edge weights of every node in CSR form
+
+  Returns ptr, nbrs and weights such that the neighbours of v are
+  nbrs[ptr[v]:ptr[v + 1]] with the matching entries of weights.'''
+  edges, weights, _ = edge_arrays(G)
+  src = np.concatenate((edges[:, 0], edges[:, 1]))
+  dst = np.concatenate((edges[:, 1], edges[:, 0]))
+  order = np.argsort(src, kind='stable')
+  ptr = np.searchsorted(src[order], np.arange(G.vcount() + 1))
+  return ptr, dst[order], np.concatenate((weights, weights))[order]
+
+
+def local_search_colouring(G, k, k2=None, labels=None, max_passes=50):
+  '''Colouring found by greedy construction and single node moves
+
+  With k2 = None the cost of a colouring is the weight of the edges whose
+  end points share a colour, as in KPP. Otherwise there are k * k2 colours
+  and an edge costs its weight if the colours of its end points agree
+  modulo k, plus one if they are equal, as in KPPExtension. Nodes without
+  a label are coloured greedily in order of decreasing degree, then nodes
+  are moved to their cheapest colour until no move improves the cost or
+  max_passes passes have been made. Returns an array of labels.'''
+  n = G.vcount()
+  K = k if k2 is None else k * k2
+  ptr, nbrs, weights = neighbour_arrays(G)
+
+  def costs(v):
+    nb, w = nbrs[ptr[v]:ptr[v + 1]], weights[ptr[v]:ptr[v + 1]]
+    coloured = labels[nb] >= 0
+    nb, w = labels[nb[coloured]], w[coloured]
+    if k2 is None:
+      return np.bincount(nb, w, minlength=K)
+    return np.bincount(nb % k, w, minlength=k)[np.arange(K) % k] + \
+        np.bincount(nb, minlength=K)
+
+  labels = np.full(n, -1, dtype=np.int64) if labels is None else \
+      np.array(labels, dtype=np.int64)
+  for v in np.argsort(-np.diff(ptr), kind='stable'):
+    if labels[v] < 0:
+      labels[v] = np.argmin(costs(v))
+  for _ in range(max_passes):
+    moved = False
+    for v in range(n):
+      c = costs(v)
+      best = np.argmin(c)
+      if c[best] < c[labels[v]] - 1e-12:
+        labels[v] = best
+        moved = True
+    if not moved:
+      break
+  return labels
@@ -1,73 +1,149 @@
 from abc import ABCMeta, abstractmethod
 import sys
 from math import ceil
-from gurobipy import Model, GRB, LinExpr
+from time import time
+import numpy as np
+import igraph as ig
+from scipy.sparse import csr_matrix
 from .separation import Solution
+from .edge_index import EdgeIndex
+from .cut_pool import CutPool
+from .graph import k_colouring, uncolourable_subgraph
+from .gurobi import gp, new_model
+
+# Gurobi's sense characters GRB.LESS_EQUAL, GRB.GREATER_EQUAL and GRB.EQUAL
+SENSES = {'<': '<', '>': '>', '==': '='}
 
 
 class KPPBase(metaclass=ABCMeta):
 
   def __init__(self, G, k, verbosity):
     self.G = G
-    self.model = Model()
-    self.model.modelSense = GRB.MINIMIZE
+    self.model = new_model()
+    self.model.modelSense = gp.GRB.MINIMIZE
     self.k = k
-    self.y = {}
     self.model.setParam("OutputFlag", 0)
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      if 'weight' in e.attributes():
-        self.y[u, v] = self.model.addVar(obj=e['weight'], ub=1.0)
-      else:
-        self.y[u, v] = self.model.addVar(obj=1.0, ub=1.0)
+    self.edge_index = EdgeIndex(G)
+    self.edges, self.weights = self.edge_index.edges, self.edge_index.weights
+    self.y = self.model.addVars(self.edge_index.keys, obj=self.weights.tolist(), ub=1.0)
+    self.y_vars = list(self.y.values())
     self.x = {}
+    self.x_vars = []
     self.z = {}
+    self.z_vars = []
     self.discretized = False
-    self.constraints = []
+    self.constraints = CutPool(self.model)
     self.sep_algs = []
     self.out = sys.stdout
     self.verbosity = verbosity
+    self.terminated = False
+    # Periodic checkpoints, see kpp.checkpoint
+    self.checkpoint = None  # Called with the variable bounds to save a checkpoint
+    self.checkpoint_interval = 60.0
+    self.last_checkpoint = time()
+    self.incumbent = None  # Labels of the best solution found by solve
+    self.y_bound = None  # Right-hand side of the fractional y-cut, if added
+
+  def terminate(self):
+    '''Stop the solve or cutting plane loop running in another thread
+
+    The interrupted call raises a RuntimeError.'''
+    self.terminated = True
+    self.model.terminate()
+
+  def check_terminated(self):
+    if self.terminated:
+      raise RuntimeError('KPP solve was terminated')
+
+  def variable_bounds(self):
+    '''Lower and upper bounds of the x, y and z variables as arrays'''
+    bounds = dict()
+    for name in ['x', 'y', 'z']:
+      variables = getattr(self, name + '_vars')
+      if variables:
+        bounds[name + '_lb'] = np.array(self.model.getAttr('LB', variables))
+        bounds[name + '_ub'] = np.array(self.model.getAttr('UB', variables))
+    return bounds
+
+  def save_checkpoint(self, bounds=None, force=False):
+    '''Call the checkpoint function if checkpoint_interval seconds have
+    passed since the last checkpoint (or if force is set)'''
+    if self.checkpoint is None:
+      return
+    if force or time() - self.last_checkpoint >= self.checkpoint_interval:
+      self.checkpoint(bounds)
+      self.last_checkpoint = time()
 
   def get_solution(self):
-    return Solution(self.model.getAttr('x', self.x),
-                    self.model.getAttr('x', self.y),
-                    self.model.getAttr('x', self.z))
+    '''Current LP/MIP solution as NumPy arrays
+
+    x has shape (n, num_colours) and y and z are indexed by edge position in
+    self.edge_index. x and z are None if the variables have not been added.'''
+    x, z = None, None
+    y = np.array(self.model.getAttr('X', self.y_vars))
+    if self.x_vars:
+      x = np.array(self.model.getAttr('X', self.x_vars)).reshape(self.G.vcount(), -1)
+    if self.z_vars:
+      z = np.array(self.model.getAttr('X', self.z_vars))
+    return Solution(x, y, z, self.edge_index)
+
+  def get_labels(self):
+    '''Array giving the colour of each node in the current incumbent'''
+    if self.discretized and self.model.SolCount > 0:
+      return np.argmax(self.get_solution().x, axis=1)
+    else:
+      raise(RuntimeError('Can only extract colouring once KPP has a feasible solution'))
 
   def get_colouring(self):
     '''Map of colours to nodes with that colour'''
     if self.discretized and self.model.status == 2:
-      n = self.G.vcount()
-      K = self.num_colours()
-      colouring = [[] for i in range(K)]
-      x = self.get_solution().x
-      for u in range(n):
-        for i in range(K):
-          if abs(x[u, i] - 1.0) < 1e-3:
-            colouring[i].append(u)
-      return colouring
+      return colour_classes(self.get_labels(), self.num_colours())
     else:
       raise(RuntimeError('Can only extract colouring if KPP has been fully solved'))
 
+  def verify_solution(self, tol=1e-6):
+    '''Check the objective recomputed from the incumbent colouring against model.objVal'''
+    obj = self.colouring_objective(self.get_labels())
+    return abs(obj - self.model.objVal) <= tol * max(1.0, abs(self.model.objVal))
+
   def add_fractional_cut(self):
-    if self.x:
+    if self.x or self.z:
       raise RuntimeError(
-          'Fractional y-cut can only be added before the x variables have been added')
+          'Fractional y-cut can only be added before the x and z variables have been added')
     if not self.model.status == 2:
       raise RuntimeError(
           'Fractional y-cut can only be added after successful a cutting plane phase (and before constraint removal)')
-    y_lb = sum(self.model.getAttr('x', self.y).values())
+    # Rounding up the bound is only valid for integral edge weights
+    if not np.all(self.weights == np.round(self.weights)):
+      return False
+    y_lb = self.weights.dot(self.get_solution().y)
     eps = self.model.params.optimalityTol
     if abs(ceil(y_lb) - y_lb) > eps:
-      sum_y = LinExpr()
-      for e in self.G.es():
-        u = min(e.source, e.target)
-        v = max(e.source, e.target)
-        sum_y.addTerms(1.0, self.y[u, v])
-      self.model.addConstr(sum_y >= ceil(y_lb))
+      self.add_y_bound(ceil(y_lb - eps))
       return True
 
-  def cut(self):
+  def add_y_bound(self, rhs):
+    '''Require the total weight of the y variables to be at least rhs'''
+    sum_y = gp.LinExpr(self.weights.tolist(), self.y_vars)
+    self.model.addConstr(sum_y >= rhs)
+    self.y_bound = rhs
+
+  def cut(self, max_rounds=None, time_limit=None, stall_rounds=None,
+          stall_tol=1e-6, max_cuts=None, max_age=None, window=5, scheduler=None):
+    '''Run the separation algorithms until no violated constraints are found
+
+    The loop also stops after max_rounds rounds, after time_limit seconds,
+    or once the bound has improved by less than stall_tol in each of the
+    last stall_rounds rounds. If max_cuts is given, the number of cuts each
+    separator may add in a round starts at the separators' max_constraints
+    (capped at max_cuts). It is doubled, up to max_cuts, when the last bound
+    gain falls below half the mean gain of the previous window rounds, and
+    halved, down to one, when it exceeds that mean. If max_age is given, cuts which have been inactive in the
+    last max_age LP solves are removed from the model during the loop. If
+    a SeparatorScheduler is given, it chooses which separators run in each
+    round; the loop only stops for lack of cuts once all separators have
+    been run. The bound, cut limit, cuts added and removed and elapsed time
+    of every round are recorded in self.cut_history.'''
     if self.discretized:
       raise RuntimeError(
           'Cutting plan algorithm can only be used before model has been discretized')
@@ -75,50 +151,96 @@ class KPPBase(metaclass=ABCMeta):
     if self.verbosity > 0:
       print('Running cutting plane algorithms', file=self.out)
 
+    start = time()
+    self.cut_history = []
+    limit = None
+    if max_cuts and self.sep_algs:
+      limit = min(max_cuts, max(s.max_constraints for s in self.sep_algs))
+    stalled = 0
+    gains = []
     it_count = 0
     total_added = 0
     while True:
       it_count += 1
       self.model.optimize()
+      self.check_terminated()
+      bound = self.model.objVal
       if self.verbosity > 1:
         print('\n', 10 * '-', 'Iteration ', it_count,
               10 * '-', file=self.out)
-        print(" Objective value: ", self.model.objVal, file=self.out)
+        print(" Objective value: ", bound, file=self.out)
+
+      if self.cut_history:
+        gain = bound - self.cut_history[-1]['bound']
+        if scheduler is not None:
+          scheduler.credit(gain)
+        stalled = stalled + 1 if gain < stall_tol else 0
+        if limit is not None and gains:
+          recent = np.mean(gains[-window:])
+          if gain < 0.5 * recent:
+            limit = min(2 * limit, max_cuts)
+          elif gain > recent:
+            limit = max(limit // 2, 1)
+        gains.append(gain)
+
+      stop = None
+      if max_rounds is not None and it_count > max_rounds:
+        stop = 'Reached maximum number of rounds'
+      elif time_limit is not None and time() - start > time_limit:
+        stop = 'Reached time limit'
+      elif stall_rounds is not None and stalled >= stall_rounds:
+        stop = 'Bound has stalled'
+
+      self.constraints.update()
       new_constraints = []
-      sol = self.get_solution()
-      for sep_alg in self.sep_algs:
-        constr_list = sep_alg.find_violated_constraints(
-            sol, self.verbosity - 1)
-        new_constraints.extend(constr_list)
+      removed = 0
+      if not stop:
+        sol = self.get_solution()
+        # Only age out cuts after the bound has improved, so that removing
+        # and re-adding the same cuts cannot cycle
+        if max_age is not None and gains and gains[-1] > stall_tol:
+          removed = self.constraints.remove_aged(max_age)
+        if scheduler is None:
+          for sep_alg in self.sep_algs:
+            constr_list = sep_alg.find_violated_constraints(
+                sol, self.verbosity - 1, limit)
+            new_constraints.extend(constr_list)
+        else:
+          selected = scheduler.select(it_count)
+          for sep_alg in selected:
+            new_constraints.extend(scheduler.separate(sep_alg, sol, self.verbosity - 1, limit))
+          if not new_constraints:
+            # Run the skipped separators before concluding there are no cuts
+            for sep_alg in self.sep_algs:
+              if sep_alg not in selected:
+                new_constraints.extend(scheduler.separate(sep_alg, sol, self.verbosity - 1, limit))
+        if not new_constraints and not removed:
+          stop = 'Found no constraints to add'
 
       total_added += len(new_constraints)
-      for constr in new_constraints:
-        self.add_constraint(constr)
-      if not new_constraints:
+      self.add_constraints(new_constraints)
+      self.save_checkpoint()
+      self.cut_history.append({'round': it_count, 'bound': bound, 'limit': limit,
+                               'cuts': len(new_constraints), 'removed': removed,
+                               'time': time() - start})
+      if stop:
         if self.verbosity > 1:
-          print(' Found no constraints to add; exiting cutting plane loop', file=self.out)
+          print(' ' + stop + '; exiting cutting plane loop', file=self.out)
         if self.verbosity > 0:
           print(' Added a total of', total_added, 'constraints', file=self.out)
-          print(' Lower bound: ', self.model.objVal)
+          print(' Lower bound: ', bound)
         break
 
     return total_added
 
   def remove_redundant_constraints(self, hard=False, allowed_slack=1e-3):
-    slack, dual = 0, 0
-    to_remove = []
-
-    for constr in self.constraints:
-      if abs(constr.Slack) > allowed_slack:
-        to_remove.append(constr)
-        slack += 1
-      elif hard and constr.Pi == 0.0:
-        to_remove.append(constr)
-        dual += 1
-
-    for constr in to_remove:
-      self.model.remove(constr)
-      self.constraints.remove(constr)
+    self.constraints.refresh()
+    slack_mask = self.constraints.slack > allowed_slack
+    dual_mask = ~slack_mask & (self.constraints.dual == 0.0) if hard else \
+        np.zeros(len(self.constraints), dtype=bool)
+    slack = int(np.count_nonzero(slack_mask))
+    dual = int(np.count_nonzero(dual_mask))
+    self.constraints.remove(slack_mask | dual_mask)
 
     if self.verbosity > 0:
       print(" Removed", slack, "constraints with slack greater than",
@@ -133,7 +255,7 @@ class KPPBase(metaclass=ABCMeta):
     self.sep_algs.append(sep_alg)
 
   def add_constraint(self, constraint):
-    expr = LinExpr()
+    expr = gp.LinExpr()
     for e, coef in constraint.x_coefs.items():
       expr.addTerms(coef, self.x[e])
     for e, coef in constraint.y_coefs.items():
@@ -146,7 +268,42 @@ class KPPBase(metaclass=ABCMeta):
       cons = self.model.addConstr(expr >= constraint.rhs)
     elif constraint.op == '==':
       cons = self.model.addConstr(expr == constraint.rhs)
-    self.constraints.append(cons)
+    self.constraints.append(cons, constraint)
+
+  def add_constraints(self, constraints):
+    '''Add a batch of constraints with a single matrix constraint call'''
+    if not constraints:
+      return
+    self.model.update()
+    indptr = [0]
+    cols = []
+    vals = []
+    for constraint in constraints:
+      for var_dict, coefs in ((self.x, constraint.x_coefs),
+                              (self.y, constraint.y_coefs),
+                              (self.z, constraint.z_coefs)):
+        for e, coef in coefs.items():
+          cols.append(var_dict[e].index)
+          vals.append(coef)
+      indptr.append(len(cols))
+    A = csr_matrix((vals, cols, indptr), shape=(len(constraints), self.model.NumVars))
+    sense = np.array([SENSES[constraint.op] for constraint in constraints])
+    rhs = np.array([constraint.rhs for constraint in constraints], dtype=float)
+    cons = self.model.addMConstr(A, None, sense, rhs)
+    self.model.update()
+    self.constraints.extend(cons.tolist(), list(constraints))
+
+  def add_rows(self, cols, coefs, sense, rhs):
+    '''Add a constraint for each row of cols, an array of variable indices,
+    with the coefficients coefs (broadcast to the shape of cols) in a single
+    matrix constraint call'''
+    rows, terms = cols.shape
+    if rows == 0:
+      return
+    vals = np.broadcast_to(np.asarray(coefs, dtype=float), cols.shape)
+    A = csr_matrix((vals.ravel(), cols.ravel(), np.arange(0, rows * terms + 1, terms)),
+                   shape=(rows, self.model.NumVars))
+    self.model.addMConstr(A, None, sense, np.full(rows, rhs))
 
   def solve(self):
     if not self.x:
@@ -155,10 +312,22 @@ class KPPBase(metaclass=ABCMeta):
       self.discretize()
     if self.verbosity > 0:
       print("Running branch-and-bound", file=self.out)
-    self.model.optimize()
+    self.check_terminated()
+    if self.checkpoint is not None:
+      self.checkpoint_bounds = self.variable_bounds()
+      self.model.optimize(self._checkpoint_callback)
+    else:
+      self.model.optimize()
+    self.check_terminated()
     if self.verbosity > 0:
       print(" Optimal objective value: ", self.model.objVal, file=self.out)
 
+  def _checkpoint_callback(self, model, where):
+    if where == gp.GRB.Callback.MIPSOL:
+      x = np.array(model.cbGetSolution(self.x_vars)).reshape(self.G.vcount(), -1)
+      self.incumbent = np.argmax(x, axis=1)
+      self.save_checkpoint(self.checkpoint_bounds)
+
   @abstractmethod
   def add_node_variables(self):
     pass
@@ -172,9 +341,29 @@ class KPPBase(metaclass=ABCMeta):
       raise RuntimeError(
           "Cannot discretize problem before x variables have been added")
     for var in self.x.values():
-      var.vtype = GRB.BINARY
+      var.vtype = gp.GRB.BINARY
     self.discretized = True
 
+  def write_model(self, path):
+    '''Write the model to path, in the format given by its extension
+    (e.g. .mps or .lp)'''
+    self.model.update()
+    self.model.write(path)
+
+  def set_start(self, labels):
+    '''Use the colouring given by labels (colours in range(num_colours()))
+    as the MIP start of branch-and-bound'''
+    if not self.x:
+      self.add_node_variables()
+    n = self.G.vcount()
+    start = np.zeros((n, self.num_colours()))
+    start[np.arange(n), np.asarray(labels, dtype=np.int64)] = 1.0
+    self.model.setAttr('Start', self.x_vars, start.ravel().tolist())
+
+  @abstractmethod
+  def colouring_objective(self, labels):
+    pass
+
   @abstractmethod
   def print_solution(self):
     pass
@@ -195,61 +384,64 @@ class KPP(KPPBase):
 
   def add_node_variables(self):
     n = self.G.vcount()
-    for i in range(n):
-      for j in range(self.k):
-        self.x[i, j] = self.model.addVar(vtype=GRB.CONTINUOUS)
+    self.x = self.model.addVars(n, self.k, vtype=gp.GRB.CONTINUOUS)
+    self.x_vars = list(self.x.values())
     if self.x_coefs:
       for ((i, c), coef) in self.x_coefs.items():
         self.x[i, c].obj = coef
 
     self.model.update()
 
-    for i in range(n):
-      total_assign = LinExpr()
-      for j in range(self.k):
-        total_assign.addTerms(1.0, self.x[i, j])
-      self.model.addConstr(total_assign == 1.0)
-
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      for i in range(self.k):
-        self.model.addConstr(self.y[u, v] >= self.x[u, i] + self.x[v, i] - 1.0)
-        self.model.addConstr(self.x[u, i] >= self.x[v, i] + self.y[u, v] - 1.0)
-        self.model.addConstr(self.x[v, i] >= self.x[u, i] + self.y[u, v] - 1.0)
+    x = var_indices(self.x_vars).reshape(n, self.k)
+    y = var_indices(self.y_vars)
+    self.add_rows(x, 1.0, SENSES['=='], 1.0)
+    self.add_rows(clash_columns(x, y, self.edges), [1.0, -1.0, -1.0], SENSES['>'], -1.0)
     self.model.update()
 
-  def break_symmetry(self):
+  def break_symmetry(self, method='basic'):
+    '''Remove equivalent relabellings of the colours from the model
+
+    'basic' restricts node i to the first i + 1 colours for i < k - 1.
+    'representative' orders the colours by their lowest numbered node.
+    Both assume interchangeable colours, so x coefficients are rejected.'''
+    if self.x_coefs:
+      raise ValueError('Cannot break colour symmetry with x coefficients')
     if self.verbosity > 0:
       print("Adding symmetry breaking constraints")
     if not self.x:
       self.add_node_variables()
-    for i in range(self.k - 1):
-      sym = LinExpr()
-      for j in range(i + 1):
-        sym.addTerms(1.0, self.x[i, j])
-    self.model.addConstr(sym == 1)
+    n = self.G.vcount()
+    if method == 'basic':
+      for i in range(min(self.k - 1, n)):
+        sym = gp.LinExpr()
+        for j in range(i + 1):
+          sym.addTerms(1.0, self.x[i, j])
+        self.model.addConstr(sym == 1)
+    elif method == 'representative':
+      add_representative_constraints(self.model, self.x, n, [[c] for c in range(self.k)])
+    else:
+      raise ValueError('Unknown symmetry breaking method %s' % method)
     self.model.update()
 
+  def colouring_objective(self, labels):
+    labels = np.asarray(labels)
+    obj = self.weights[labels[self.edges[:, 0]] == labels[self.edges[:, 1]]].sum()
+    if self.x_coefs:
+      keys = np.array(list(self.x_coefs.keys()), dtype=np.int64).reshape(-1, 2)
+      coefs = np.array(list(self.x_coefs.values()), dtype=float)
+      obj += coefs[labels[keys[:, 0]] == keys[:, 1]].sum()
+    return obj
+
   def print_solution(self):
     sol = self.get_solution()
     x, y = sol.x, sol.y
-    clusters = []
-    for i in range(self.k):
-      cluster = []
-      for j in range(self.G.vcount()):
-        if abs(x[j, i] - 1.0) < 1e-4:
-          cluster.append(j)
-      clusters.append(cluster)
+    clusters = assigned_nodes(x)
     for i in range(self.k):
       print("Colour", i, ": ", clusters[i], file=self.out)
 
     print("Clashes: ", file=self.out)
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      if abs(y[u, v] - 1.0) < 1e-4:
-        print((u, v), end=', ', file=self.out)
+    for (u, v) in self.edges[np.abs(y - 1.0) < 1e-4].tolist():
+      print((u, v), end=', ', file=self.out)
     print('\n', file=self.out)
 
   def num_colours(self):
@@ -261,51 +453,52 @@ class KPPExtension(KPPBase):
   def __init__(self, G, k1, k2, verbosity=1):
     KPPBase.__init__(self, G, k1, verbosity)
     self.k2 = k2
+    # Edges, by position, whose z variable is free; the others are fixed to
+    # zero, see graph.z_part
+    self.z_part = None
 
   def num_colours(self):
     return self.k * self.k2
 
   def add_z_variables(self):
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      self.z[u, v] = self.model.addVar(obj=1.0, ub=1.0)
+    ub = 1.0 if self.z_part is None else np.where(self.z_part, 1.0, 0.0).tolist()
+    self.z = self.model.addVars(self.edge_index.keys, obj=1.0, ub=ub)
+    self.z_vars = list(self.z.values())
 
   def add_node_variables(self):
     if not self.z:
       self.add_z_variables()
     n = self.G.vcount()
-    for i in range(n):
-      for j in range(self.k2 * self.k):
-        self.x[i, j] = self.model.addVar(vtype=GRB.CONTINUOUS)
+    self.x = self.model.addVars(n, self.k2 * self.k, vtype=gp.GRB.CONTINUOUS)
+    self.x_vars = list(self.x.values())
 
     self.model.update()
 
-    for i in range(n):
-      total_assign = LinExpr()
-      for j in range(self.k2 * self.k):
-        total_assign.addTerms(1.0, self.x[i, j])
-      self.model.addConstr(total_assign == 1.0)
-
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      for c in range(self.k):
-        mod_k_clashes = LinExpr()
-        for j in range(self.k2):
-          mod_k_clashes.addTerms(1.0, self.x[u, c + j * self.k])
-          mod_k_clashes.addTerms(1.0, self.x[v, c + j * self.k])
-        self.model.addConstr(self.y[u, v] >= mod_k_clashes - 1.0)
-
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      for c in range(self.k2 * self.k):
-        self.model.addConstr(self.z[u, v] >= self.x[u, c] + self.x[v, c] - 1.0)
-        self.model.addConstr(self.x[u, c] >= self.x[v, c] + self.z[u, v] - 1.0)
-        self.model.addConstr(self.x[v, c] >= self.x[u, c] + self.z[u, v] - 1.0)
-
-  def break_symmetry(self):
+    x = var_indices(self.x_vars).reshape(n, self.k2 * self.k)
+    y = var_indices(self.y_vars)
+    z = var_indices(self.z_vars)
+    self.add_rows(x, 1.0, SENSES['=='], 1.0)
+
+    # y_uv >= sum over the colours c + jk of x[u, c + jk] + x[v, c + jk] - 1
+    groups = x.reshape(n, self.k2, self.k).transpose(0, 2, 1)  # (n, k, k2)
+    u, v = self.edges[:, 0], self.edges[:, 1]
+    y_cols = np.broadcast_to(y[:, None, None], (len(y), self.k, 1))
+    cols = np.concatenate((y_cols, groups[u], groups[v]), axis=2).reshape(-1, 1 + 2 * self.k2)
+    self.add_rows(cols, [1.0] + [-1.0] * (2 * self.k2), SENSES['>'], -1.0)
+
+    self.add_rows(clash_columns(x, z, self.edges), [1.0, -1.0, -1.0], SENSES['>'], -1.0)
+    self.model.update()
+
+  def break_symmetry(self, method='basic'):
+    '''Remove equivalent relabellings of the colours from the model
+
+    Colour c belongs to group c % k, and relabelling the groups or the
+    colours within a group leaves the objective unchanged. 'basic' fixes
+    x[v, c] = 0 whenever (c // k) + (c % k) > v. 'representative' also
+    orders the groups, and the colours within each group, by their lowest
+    numbered node.'''
+    if method not in ('basic', 'representative'):
+      raise ValueError('Unknown symmetry breaking method %s' % method)
     if not self.G.vcount() > self.k2 * self.k:
       if self.verbosity > 0:
         print('Too few nodes to add symmetry breaking constraints')
@@ -319,38 +512,188 @@ class KPPExtension(KPPBase):
         for c in range(self.k2 * self.k):
           if (c // self.k) + (c % self.k) >= v + 1:
             self.x[v, c].ub = self.x[v, c].start = 0.0
+      if method == 'representative':
+        groups = [[g + j * self.k for j in range(self.k2)] for g in range(self.k)]
+        add_representative_constraints(self.model, self.x, n, groups)
+        for g in range(self.k):
+          add_representative_constraints(self.model, self.x, n, [[c] for c in groups[g]])
     self.model.update()
 
+  def colouring_objective(self, labels):
+    labels = np.asarray(labels)
+    u, v = self.edges[:, 0], self.edges[:, 1]
+    y_clash = (labels[u] % self.k) == (labels[v] % self.k)
+    z_clash = labels[u] == labels[v]
+    return self.weights[y_clash].sum() + np.count_nonzero(z_clash)
+
   def print_solution(self):
     sol = self.get_solution()
     x, y, z = sol.x, sol.y, sol.z
-    clusters = []
-    n = self.G.vcount()
-    if x:
-      for c in range(self.k2 * self.k):
-        cluster = []
-        for j in range(n):
-          if abs(x[j, c] - 1.0) < 1e-4:
-            cluster.append(j)
-        clusters.append(cluster)
+    if x is not None:
+      clusters = assigned_nodes(x)
       for i in range(self.k2 * self.k):
         print("Colour", i, ": ", clusters[i], file=self.out)
 
     print("3-Clashes: ")
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      if abs(y[u, v] - 1.0) < 1e-4:
-        print((u, v), end=', ', file=self.out)
+    for (u, v) in self.edges[np.abs(y - 1.0) < 1e-4].tolist():
+      print((u, v), end=', ', file=self.out)
     print('\n', file=self.out)
 
-    print("6-Clashes: ")
-    for e in self.G.es():
-      u = min(e.source, e.target)
-      v = max(e.source, e.target)
-      if abs(z[u, v] - 1.0) < 1e-4:
+    if z is not None:
+      print("6-Clashes: ")
+      for (u, v) in self.edges[np.abs(z - 1.0) < 1e-4].tolist():
         print((u, v), end=', ', file=self.out)
-    print('\n', file=self.out)
+      print('\n', file=self.out)
 
   def num_colours(self):
     return self.k * self.k2
+
+
+class KPPEdge(KPPBase):
+  '''KPP formulated with the edge variables only
+
+  A binary y is feasible if the edges with y = 0 form a k-colourable graph.
+  Rather than adding node variables, solve() separates this condition
+  lazily: whenever Gurobi finds an incumbent whose y = 0 edges contain a
+  subgraph which is not k-colourable, the constraint that at least one of
+  its edges has y = 1 is added. The colouring is recovered from y.'''
+
+  def __init__(self, G, k, verbosity=1):
+    KPPBase.__init__(self, G, k, verbosity)
+    self.lazy_constraints = 0
+
+  def num_colours(self):
+    return self.k
+
+  def add_node_variables(self):
+    pass
+
+  def break_symmetry(self, method='basic'):
+    if self.verbosity > 0:
+      print('Edge formulation has no colour symmetry to break')
+
+  def discretize(self):
+    for var in self.y_vars:
+      var.vtype = gp.GRB.BINARY
+    self.model.setParam('LazyConstraints', 1)
+    self.discretized = True
+
+  def solve(self):
+    if not self.discretized:
+      self.discretize()
+    if self.verbosity > 0:
+      print("Running branch-and-bound", file=self.out)
+    self.check_terminated()
+    if self.checkpoint is not None:
+      self.checkpoint_bounds = self.variable_bounds()
+    self.model.optimize(self._partition_callback)
+    self.check_terminated()
+    if self.verbosity > 0:
+      print(" Optimal objective value: ", self.model.objVal, file=self.out)
+      print(" Added", self.lazy_constraints, "lazy constraints", file=self.out)
+
+  def _partition_callback(self, model, where):
+    if where != gp.GRB.Callback.MIPSOL:
+      return
+    y = np.array(model.cbGetSolution(self.y_vars))
+    nodes = self.uncoloured_nodes(y)
+    if nodes is None:
+      if self.checkpoint is not None:
+        self.incumbent = k_colouring(self.separated_graph(y), self.k)
+        self.save_checkpoint(self.checkpoint_bounds)
+      return
+    inside = np.zeros(self.G.vcount(), dtype=bool)
+    inside[nodes] = True
+    cut = np.flatnonzero((y < 0.5) & inside[self.edges[:, 0]] & inside[self.edges[:, 1]])
+    model.cbLazy(gp.LinExpr([1.0] * len(cut), [self.y_vars[i] for i in cut]) >= 1.0)
+    self.lazy_constraints += 1
+
+  def set_start(self, labels):
+    labels = np.asarray(labels)
+    clash = labels[self.edges[:, 0]] == labels[self.edges[:, 1]]
+    self.model.setAttr('Start', self.y_vars, clash.astype(float).tolist())
+
+  def separated_graph(self, y):
+    '''Graph of the edges whose end points must have different colours'''
+    return ig.Graph(n=self.G.vcount(), edges=self.edges[y < 0.5])
+
+  def uncoloured_nodes(self, y):
+    '''Nodes of a subgraph of the y = 0 edges which is not k-colourable,
+    or None if y is feasible'''
+    return uncolourable_subgraph(self.separated_graph(y), self.k)
+
+  def get_labels(self):
+    '''Array giving the colour of each node in the current incumbent'''
+    if self.discretized and self.model.SolCount > 0:
+      labels = k_colouring(self.separated_graph(self.get_solution().y), self.k)
+      if labels is not None:
+        return labels
+    raise(RuntimeError('Can only extract colouring once KPP has a feasible solution'))
+
+  def colouring_objective(self, labels):
+    labels = np.asarray(labels)
+    return self.weights[labels[self.edges[:, 0]] == labels[self.edges[:, 1]]].sum()
+
+  def print_solution(self):
+    clusters = colour_classes(self.get_labels(), self.k)
+    for i in range(self.k):
+      print("Colour", i, ": ", clusters[i], file=self.out)
+
+    y = self.get_solution().y
+    print("Clashes: ", file=self.out)
+    for (u, v) in self.edges[np.abs(y - 1.0) < 1e-4].tolist():
+      print((u, v), end=', ', file=self.out)
+    print('\n', file=self.out)
+
+
+def add_representative_constraints(model, x, n, classes):
+  '''Order interchangeable classes of colours by their lowest numbered node
+
+  classes is a list of lists of colours. A node may only take a colour of
+  class i > 0 if a lower numbered node takes a colour of class i - 1, and
+  node v may only take colours of the first v + 1 classes.'''
+  for i in range(1, len(classes)):
+    for v in range(n):
+      if i > v:
+        for c in classes[i]:
+          x[v, c].ub = 0.0
+        continue
+      expr = gp.LinExpr()
+      for c in classes[i]:
+        expr.addTerms(1.0, x[v, c])
+      for u in range(v):
+        for c in classes[i - 1]:
+          expr.addTerms(-1.0, x[u, c])
+      model.addConstr(expr <= 0.0)
+
+
+def var_indices(variables):
+  '''Column indices of a list of variables as an array'''
+  return np.array([var.index for var in variables], dtype=np.int64)
+
+
+def clash_columns(x, w, edges):
+  '''Variable indices of the constraints linking the clash variable w_uv
+  of each edge to x[u, c] and x[v, c] for every colour c
+
+  x holds the indices of the node variables, shape (n, colours), and w
+  those of the edge variables. Each edge and colour has the three rows
+  (w_uv, x_uc, x_vc), (x_uc, x_vc, w_uv) and (x_vc, x_uc, w_uv), whose
+  constraints have coefficients (1, -1, -1) and right hand side -1.'''
+  xu, xv = x[edges[:, 0]], x[edges[:, 1]]
+  wc = np.broadcast_to(w[:, None], xu.shape)
+  rows = np.stack((wc, xu, xv, xu, xv, wc, xv, xu, wc), axis=-1)
+  return rows.reshape(-1, 3)
+
+
+def colour_classes(labels, K):
+  '''Lists of nodes having each of the colours 0, ..., K - 1'''
+  order = np.argsort(labels, kind='stable')
+  counts = np.bincount(labels, minlength=K)
+  return [nodes.tolist() for nodes in np.split(order, np.cumsum(counts)[:-1])]
+
+
+def assigned_nodes(x, tol=1e-4):
+  '''Lists of nodes whose x value is one for each colour'''
+  assigned = np.abs(x - 1.0) < tol
+  return [np.flatnonzero(assigned[:, c]).tolist() for c in range(x.shape[1])]
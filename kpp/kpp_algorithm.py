@@ -1,13 +1,27 @@
 from abc import ABCMeta, abstractmethod
+import os
+from math import ceil
 from time import time
 import numpy as np
 from copy import deepcopy, copy
-from .kpp import KPP, KPPExtension
-from .separation import YCliqueSeparator, YZCliqueSeparator, ZCliqueSeparator, ProjectedCliqueSeparator
-from .graph import decompose_graph
+from .kpp import KPP, KPPExtension, KPPEdge
+from .separation import YCliqueSeparator, YZCliqueSeparator, ZCliqueSeparator, MultiProjectedCliqueSeparator
+from .separation import YTriangleSeparator, YZTriangleSeparator, ZTriangleSeparator, CliqueIndex
+from .graph import Decomposition, graph_fingerprint, z_part, z_repair
+from .cut_store import cut_pool_path, save_cut_pool, load_cut_pool, apply_cuts, cut_pool_key
+from .result_writer import ResultWriter
+from .heuristic import local_search_colouring
+from .result_table import ResultTable
+from .clique_cache import shared_cache
+from .checkpoint import checkpoint_path, save_checkpoint, load_checkpoint
+from .scheduler import SeparatorScheduler
 
 
 class KPPAlgorithmResults:
+  '''Output of KPPAlgorithmBase.run
+
+  With preprocessing, output['solution'] is a ResultTable with one row per
+  component; otherwise it is the results dict of the single problem.'''
 
   def __init__(self, output):
     self.output = output
@@ -15,36 +29,50 @@ class KPPAlgorithmResults:
   def __getitem__(self, key):
     return self.output[key]
 
+  @property
+  def table(self):
+    '''Results as a ResultTable with one row per solved problem'''
+    solution = self.output['solution']
+    if isinstance(solution, ResultTable):
+      return solution
+    return ResultTable.from_records([solution])
+
   def algorithm_params(self):
     return self.output['params']
 
   def preprocess_stats(self):
     if not self.output['params']['preprocess']:
       return None
-    keys = ['preprocess time', 'preprocess components', 'largest components']
+    keys = ['preprocess time', 'preprocess components', 'largest components', 'reduction']
     return {k: self.output[k] for k in keys}
 
   def branch_and_bound_stats(self):
     keys = ['optimal value', 'branch and bound time', 'ub', 'lb']
-    res = dict()
-    if self.output['params']['preprocess']:
-      if self.output['preprocess components'] == 0:
-        for k in keys:
-          res[k] = 0.0
-        res['optimality'] = True
-      else:
-        for k in keys:
-          res[k] = sum(self.output['solution'][k])
-        if np.all(np.array(self.output['solution']['status']) == 2):
-          res['optimality'] = True
-        else:
-          res['optimality'] = False
-    else:
-      for k in keys:
-        res[k] = self.output['solution'][k]
-      res['optimality'] = (self.output['solution']['status'] == 2)
+    table = self.table
+    res = {k: float(table.sum(k)) for k in keys}
+    res['optimality'] = bool(np.all(table.optimal()))
     return res
 
+  def phase_stats(self):
+    '''Total time, constraints added and constraints removed of each phase'''
+    table = self.table
+    stats = dict()
+    for phase, total_time in table.phase_times().items():
+      stats[phase] = {'time': total_time}
+      for key in ['constraints added', 'constraints removed']:
+        if phase + ' ' + key in table:
+          stats[phase][key] = int(table.sum(phase + ' ' + key))
+    return stats
+
+  def to_csv(self, path):
+    self.table.to_csv(path)
+
+  def to_npz(self, path):
+    self.table.to_npz(path)
+
+  def to_parquet(self, path):
+    self.table.to_parquet(path)
+
 
 class KPPAlgorithmBase(metaclass=ABCMeta):
 
@@ -61,21 +89,261 @@ class KPPAlgorithmBase(metaclass=ABCMeta):
     self.params['removal slack'] = kwargs.pop('removal slack', 1e-3)
     self.params['symmetry breaking'] = kwargs.pop('symmetry breaking', False)
     self.params['fractional y-cut'] = kwargs.pop('fractional y-cut', False)
+    self.params['triangle cut'] = kwargs.pop('triangle cut', False)
+    self.params['verify solution'] = kwargs.pop('verify solution', False)
+    self.params['bound only'] = kwargs.pop('bound only', False)
+    self.params['early termination'] = kwargs.pop('early termination', False)
+    # Cutting plane loop limits
+    self.params['cut rounds'] = kwargs.pop('cut rounds', None)
+    self.params['cut time limit'] = kwargs.pop('cut time limit', None)
+    self.params['cut stall rounds'] = kwargs.pop('cut stall rounds', None)
+    self.params['cut stall tolerance'] = kwargs.pop('cut stall tolerance', 1e-6)
+    self.params['max cuts per round'] = kwargs.pop('max cuts per round', None)
+    self.params['cut max age'] = kwargs.pop('cut max age', None)
+    self.params['cut pool dir'] = kwargs.pop('cut pool dir', None)
+    # Skip low yield separators in the cutting plane loop, see SeparatorScheduler
+    self.params['adaptive separation'] = kwargs.pop('adaptive separation', False)
+    # Rank cuts by violation times the mean edge weight of their clique
+    self.params['weighted separation'] = kwargs.pop('weighted separation', False)
+    # Export of the model with its root cuts before branch-and-bound
+    self.params['model dir'] = kwargs.pop('model dir', None)
+    self.params['model format'] = kwargs.pop('model format', 'mps')
+    # Checkpoints of each component's model, written after every phase and
+    # every checkpoint interval seconds during a phase
+    self.params['checkpoint dir'] = kwargs.pop('checkpoint dir', None)
+    self.params['checkpoint interval'] = kwargs.pop('checkpoint interval', 60.0)
+    self.completed_phases = []
+    # Wall clock limit in seconds for the whole run
+    self.params['time limit'] = kwargs.pop('time limit', None)
+    self.deadline = None
+    self.terminated = False
+    self.active_model = None
+    self.decomposition = None  # Decomposition found by preprocessing
+
+    # Clique enumeration
+    self.params['clique dir'] = kwargs.pop('clique dir', None)
+    self.params['max clique size'] = kwargs.pop('max clique size', None)
+    self.params['clique time limit'] = kwargs.pop('clique time limit', None)
+    self.clique_cache = kwargs.pop('clique_cache', shared_cache)
+
+    # Colour of each vertex of G (-1 if unknown) used to start branch-and-bound
+    self.warm_start = kwargs.pop('warm_start', None)
+
+    # Decomposition and cliques computed beforehand, see GraphAnalysis
+    self.analysis = kwargs.pop('analysis', None)
+    if self.analysis is not None and (self.analysis.k != k or
+                                      self.analysis.preprocess != self.params['preprocess']):
+      raise ValueError('Graph analysis was computed for different k or preprocessing')
 
     self.verbosity = kwargs.pop('verbosity', 1)
+    self.kwargs = kwargs
 
   @abstractmethod
-  def solve_single_problem(self, g):
+  def solve_component(self, g):
+    '''Solve the problem on g, returning the results and the labels of the
+    best colouring found (or None)'''
     pass
 
-  def y_cut_phase(self, kpp, max_cliques, results):
-    for p in self.params['y-cut']:
-      kpp.add_separator(YCliqueSeparator(max_cliques, p, self.k))
+  def solve_single_problem(self, g):
+    return self.solve_component(g)[0]
+
+  def cut_pool_params(self):
+    '''Parameters which determine the cuts found for a graph'''
+    return {'k': self.k, 'y-cut': list(self.params['y-cut']),
+            'triangle cut': self.params['triangle cut']}
+
+  def remaining_time(self, limit=None):
+    '''Smaller of limit and the time left before the run's deadline'''
+    if self.deadline is None:
+      return limit
+    remaining = max(self.deadline - time(), 0.0)
+    return remaining if limit is None else min(limit, remaining)
+
+  def terminate(self):
+    '''Stop the run from another thread, terminating the model being solved
+
+    The interrupted run raises a RuntimeError.'''
+    self.terminated = True
+    if self.active_model is not None:
+      self.active_model.terminate()
+
+  def prepare_model(self, kpp):
+    '''Set the parameters of a new model and make it the one stopped by
+    terminate'''
+    self.active_model = kpp
+    if self.terminated:
+      kpp.terminate()
+      kpp.check_terminated()
+    self.set_model_params(kpp)
+
+  def set_model_params(self, kpp):
+    for (key, val) in self.gurobi_params.items():
+      kpp.model.setParam(key, val)
+    if self.deadline is not None:
+      kpp.model.setParam('TimeLimit', self.remaining_time(self.gurobi_params.get('TimeLimit')))
+
+  def maximal_cliques(self, g):
+    '''Maximal cliques of g, taken from its 'maximal cliques' attribute if
+    they have been computed beforehand and from the clique cache otherwise'''
+    if 'maximal cliques' in g.attributes():
+      return g['maximal cliques']
+    return self.clique_cache.maximal_cliques(
+        g, directory=self.params['clique dir'], max_size=self.params['max clique size'],
+        time_limit=self.params['clique time limit'])
+
+  def clique_index(self, g, max_cliques):
+    '''CliqueIndex of g, taken from its 'clique index' attribute if it has
+    been built beforehand'''
+    if 'clique index' in g.attributes():
+      return g['clique index']
+    return CliqueIndex(max_cliques)
+
+  def warm_start_labels(self, kpp):
+    '''Colouring of kpp.G given by the warm start, or None if there is no
+    warm start or it does not colour every vertex with one of kpp's colours'''
+    if self.warm_start is None:
+      return None
+    if 'original vertex' in kpp.G.vs.attributes():
+      vertices = kpp.G.vs['original vertex']
+    else:
+      vertices = list(range(kpp.G.vcount()))
+    labels = np.asarray(self.warm_start, dtype=np.int64)[vertices]
+    if np.any(labels < 0) or np.any(labels >= kpp.num_colours()):
+      return None
+    return labels
+
+  def symmetry_method(self):
+    '''Method passed to break_symmetry; True selects the basic method'''
+    method = self.params['symmetry breaking']
+    return 'basic' if method is True else method
+
+  def load_cut_pool(self, kpp, results):
+    '''Cuts saved for this graph in the cut pool directory, if any'''
+    results['cut pool loaded'] = 0
+    if not self.params['cut pool dir']:
+      return []
+    path = cut_pool_path(self.params['cut pool dir'], kpp.G, self.cut_pool_params())
+    if not os.path.exists(path):
+      return []
+    cuts = load_cut_pool(path, kpp, self.cut_pool_params())
+    if self.verbosity > 0:
+      print(' Loaded %d cuts from %s' % (len(cuts), path))
+    return cuts
+
+  def apply_cut_pool(self, kpp, cuts, results):
+    '''Add the saved cuts which apply to the variables in kpp and return the rest'''
+    pending = apply_cuts(kpp, cuts)
+    results['cut pool loaded'] += len(cuts) - len(pending)
+    return pending
+
+  def save_cut_pool(self, kpp):
+    if self.params['cut pool dir']:
+      os.makedirs(self.params['cut pool dir'], exist_ok=True)
+      path = cut_pool_path(self.params['cut pool dir'], kpp.G, self.cut_pool_params())
+      save_cut_pool(path, kpp, self.cut_pool_params())
+
+  def checkpoint_path(self, g):
+    '''Checkpoint file of g, keyed on the parameters which shape the model'''
+    params = dict(self.cut_pool_params(), formulation=self.params.get('formulation', 'node'))
+    for key in self.params:
+      if key.endswith(' removal') or key in ('removal slack', 'fractional y-cut'):
+        params[key] = self.params[key]
+    return checkpoint_path(self.params['checkpoint dir'], g, params)
+
+  def resume_model(self, g, results, **kwargs):
+    '''Model of g restored from its checkpoint, or None if there is none
+
+    The results saved with the checkpoint are copied to results and the
+    phases it had completed to completed_phases. kwargs are passed to the
+    model's constructor.'''
+    self.completed_phases = []
+    if not self.params['checkpoint dir'] or not os.path.exists(self.checkpoint_path(g)):
+      return None
+    kpp, state = load_checkpoint(self.checkpoint_path(g), g, self.verbosity, **kwargs)
+    results.update(state['results'])
+    results['resumed phases'] = len(state['completed'])
+    self.completed_phases = state['completed']
+    if self.verbosity > 0:
+      print(' Resumed from checkpoint after phases %s' % ', '.join(self.completed_phases))
+    return kpp
+
+  def enable_checkpoints(self, kpp, results):
+    '''Make kpp save checkpoints of itself, the completed phases and results'''
+    if not self.params['checkpoint dir']:
+      return
+    os.makedirs(self.params['checkpoint dir'], exist_ok=True)
+    path = self.checkpoint_path(kpp.G)
+    kpp.checkpoint_interval = self.params['checkpoint interval']
+    kpp.checkpoint = lambda bounds: save_checkpoint(
+        path, kpp, {'completed': self.completed_phases, 'results': results}, bounds)
+
+  def run_phase(self, phase):
+    '''Whether phase still has to be run, i.e. was not completed before the
+    checkpoint the model was resumed from'''
+    return phase not in self.completed_phases
+
+  def complete_phase(self, kpp, phase):
+    self.completed_phases.append(phase)
+    kpp.save_checkpoint(force=True)
+
+  def remove_checkpoint(self, kpp):
+    '''Delete the checkpoint of a component which has been solved'''
+    if self.params['checkpoint dir'] and os.path.exists(self.checkpoint_path(kpp.G)):
+      os.remove(self.checkpoint_path(kpp.G))
+
+  def cut_phase(self, kpp, phase, separators, results):
+    '''Run the cutting plane loop with the given separators, recording
+    statistics under keys starting with the phase name
+
+    Separators without cliques, e.g. when clique enumeration stopped before
+    finding any, are left out.'''
+    for sep_alg in (s for s in separators if len(s.cliques)):
+      sep_alg.weighted = self.params['weighted separation']
+      kpp.add_separator(sep_alg)
+    scheduler = None
+    if self.params['adaptive separation']:
+      scheduler = SeparatorScheduler(kpp.sep_algs)
     start = time()
-    results['y-cut constraints added'] = kpp.cut()
+    results[phase + ' constraints added'] = kpp.cut(
+        max_rounds=self.params['cut rounds'],
+        time_limit=self.remaining_time(self.params['cut time limit']),
+        stall_rounds=self.params['cut stall rounds'],
+        stall_tol=self.params['cut stall tolerance'],
+        max_cuts=self.params['max cuts per round'],
+        max_age=self.params['cut max age'],
+        scheduler=scheduler)
     end = time()
-    results['y-cut time'] = end - start
-    results['y-cut lb'] = kpp.model.objVal
+    if scheduler is not None:
+      results[phase + ' schedule'] = scheduler.log
+      results[phase + ' separators'] = scheduler.summary()
+    results[phase + ' time'] = end - start
+    results[phase + ' lb'] = kpp.model.objVal
+    results[phase + ' rounds'] = len(kpp.cut_history)
+    results[phase + ' history'] = kpp.cut_history
+
+  def remove_phase_cuts(self, kpp, phase, results):
+    '''Remove redundant cuts if requested by the phase's removal parameter'''
+    removal = self.params[phase + ' removal']
+    if removal:
+      results[phase + ' constraints removed'] = kpp.remove_redundant_constraints(
+          hard=(removal > 1), allowed_slack=self.params['removal slack'])
+    kpp.sep_algs.clear()
+
+  def skip_phase(self, phase, lb, results):
+    '''Record the statistics of a cut phase which is not run'''
+    results[phase + ' time'] = 0.0
+    results[phase + ' lb'] = lb
+    results[phase + ' constraints added'] = 0
+    results[phase + ' constraints removed'] = 0
+    results[phase + ' rounds'] = 0
+    results[phase + ' history'] = []
+
+  def y_cut_phase(self, kpp, max_cliques, results):
+    separators = [YCliqueSeparator(max_cliques, p, self.k)
+                  for p in self.params['y-cut']]
+    if self.params['triangle cut']:
+      separators.append(YTriangleSeparator(max_cliques, self.k))
+    self.cut_phase(kpp, 'y-cut', separators, results)
     if self.params['fractional y-cut']:
       res = kpp.add_fractional_cut()
       if self.verbosity > 0:
@@ -83,215 +351,480 @@ class KPPAlgorithmBase(metaclass=ABCMeta):
           print(" Added fractional y-cut")
         else:
           print(" Fractional y-cut not appropriate")
-    if self.params['y-cut removal']:
-      results["y-cut constraints removed"] = kpp.remove_redundant_constraints(hard=(
-          self.params['y-cut removal'] > 1), allowed_slack=self.params['removal slack'])
-    kpp.sep_algs.clear()
+    self.remove_phase_cuts(kpp, 'y-cut', results)
+
+  @abstractmethod
+  def heuristic_colouring(self, g):
+    pass
+
+  def integral_objective(self, kpp):
+    '''Whether the objective value of every colouring is integral'''
+    return bool(np.all(kpp.weights == np.round(kpp.weights)))
+
+  def rounded_bound(self, kpp, lb):
+    '''Lower bound lb, rounded up if the objective is integral'''
+    return ceil(lb - 1e-6) if self.integral_objective(kpp) else lb
+
+  def bound_met(self, kpp, lb, ub):
+    '''Whether the lower bound lb proves the upper bound ub optimal'''
+    return self.rounded_bound(kpp, lb) >= ub - 1e-6 * max(1.0, abs(ub))
+
+  def cost_floor(self, kpp):
+    '''Lower bound on the cost of any colouring, before solving anything'''
+    return 0.0
+
+  def partial_bound(self, kpp):
+    '''Whether the LP bound of kpp leaves out part of the objective, so that
+    it cannot prove a colouring optimal'''
+    return False
+
+  def start_early_termination(self, kpp, results):
+    '''Heuristic colouring and its cost if early termination is enabled
+    (else None), the initial lower bound and whether it is already met'''
+    if not self.params['early termination']:
+      return None, None, False
+    labels = self.heuristic_colouring(kpp.G)
+    heuristic = (labels, kpp.colouring_objective(labels))
+    start = self.warm_start_labels(kpp)
+    if start is not None and kpp.colouring_objective(start) < heuristic[1]:
+      heuristic = (start, kpp.colouring_objective(start))
+    results['heuristic ub'] = heuristic[1]
+    results['early termination'] = None
+    lb = self.cost_floor(kpp)
+    met = self.bound_met(kpp, lb, heuristic[1])
+    if met:
+      results['early termination'] = 'heuristic'
+    return heuristic, lb, met
+
+  def check_early_termination(self, kpp, phase, heuristic, results):
+    '''Bound after a cut phase and whether it meets the heuristic bound'''
+    if self.partial_bound(kpp):
+      return None, False
+    lb = results[phase + ' lb']
+    if heuristic is None or not self.bound_met(kpp, lb, heuristic[1]):
+      return lb, False
+    if self.verbosity > 0:
+      print(' Bound after %s phase proves the heuristic colouring optimal' % phase)
+    results['early termination'] = phase
+    return lb, True
+
+  def finish(self, kpp, results, heuristic=None, lb=None):
+    '''Solve the model by branch-and-bound, or only bound it if the bound
+    only parameter is set
+
+    If the lower bound lb already proves the heuristic colouring (labels,
+    cost) optimal, that colouring is recorded without solving further.'''
+    if heuristic is not None and lb is not None and self.bound_met(kpp, lb, heuristic[1]):
+      return self.record_bounds(kpp, results, heuristic, lb, 0.0)
+    if self.params['bound only']:
+      return self.bound(kpp, results, heuristic)
+    labels = self.branch_and_bound(kpp, results)
+    if self.params['verify solution'] and kpp.model.SolCount > 0:
+      results["solution verified"] = kpp.verify_solution()
+    return labels
+
+  def export_model(self, kpp, results):
+    '''Write the model, including the cuts found so far, to the model
+    directory in the model format (e.g. mps or lp)'''
+    os.makedirs(self.params['model dir'], exist_ok=True)
+    path = os.path.join(self.params['model dir'], '%s-%s.%s' % (
+        graph_fingerprint(kpp.G)[:16], type(kpp).__name__, self.params['model format']))
+    kpp.write_model(path)
+    results['model path'] = path
+
+  def branch_and_bound(self, kpp, results):
+    if not kpp.x:
+      kpp.add_node_variables()
+    if self.params['model dir']:
+      self.export_model(kpp, results)
+    if self.params['symmetry breaking']:
+      kpp.break_symmetry(self.symmetry_method())
+    start = self.warm_start_labels(kpp)
+    results["warm start"] = start is not None
+    if start is not None:
+      kpp.set_start(start)
+
+    kpp.solve()
+    if self.verbosity > 0:
+      print('')
+
+    results["optimality gap"] = kpp.model.MIPGap
+    results["status"] = kpp.model.Status
+    results["branch and bound time"] = kpp.model.Runtime
+    if results["status"] == 2:
+      results["optimal value"] = kpp.model.objVal
+    else:
+      results["optimal value"] = np.nan
+
+    if kpp.model.SolCount > 0:
+      results["ub"] = kpp.model.objVal
+    else:
+      results["ub"] = np.inf
+    results["lb"] = kpp.model.objBound
+    results["branch and bound nodes"] = int(kpp.model.NodeCount)
+    return kpp.get_labels() if kpp.model.SolCount > 0 else None
+
+  def bound(self, kpp, results, heuristic=None):
+    '''Record the LP bound of the cut phases and the cost of a heuristic
+    colouring without running branch-and-bound'''
+    start = time()
+    kpp.model.optimize()
+    if heuristic is None:
+      labels = self.heuristic_colouring(kpp.G)
+      heuristic = (labels, kpp.colouring_objective(labels))
+    return self.record_bounds(kpp, results, heuristic, kpp.model.objVal, time() - start)
+
+  def record_bounds(self, kpp, results, heuristic, lb, runtime):
+    '''Record lb and the heuristic colouring (labels, cost) as the bounds
+
+    The status is only 2 (optimal) if the two bounds meet.'''
+    labels, ub = heuristic
+    lb = self.rounded_bound(kpp, lb)
+    closed = self.bound_met(kpp, lb, ub)
+    results["optimality gap"] = abs(ub - lb) / abs(ub) if ub != 0 else (0.0 if closed else np.inf)
+    results["status"] = 2 if closed else None
+    results["branch and bound time"] = runtime
+    results["optimal value"] = ub if closed else np.nan
+    results["ub"] = ub
+    results["lb"] = lb
+    results["branch and bound nodes"] = 0
+    if self.verbosity > 0:
+      print(' Bounds: %g <= opt <= %g' % (lb, ub))
+    return labels
+
+  def components(self):
+    '''Graphs to be solved: the components found by preprocessing, or the
+    input graph
+
+    The 'original vertex' attribute of each component gives the vertex of
+    the input graph corresponding to each of its vertices.'''
+    if self.analysis is not None:
+      graphs = self.analysis.components
+      self.decomposition = self.analysis.decomposition
+      if self.params['preprocess']:
+        self.output['preprocess time'] = self.analysis.preprocess_time
+        self.output['preprocess components'] = len(graphs)
+        self.output['largest components'] = max((g.vcount() for g in graphs), default=0)
+      return graphs
+    if not self.params['preprocess']:
+      return [self.G]
+    start = time()
+    self.decomposition = Decomposition(self.G, self.k)
+    graphs = self.decomposition.components
+    end = time()
+    self.output['preprocess time'] = end - start
+    self.output['preprocess components'] = len(graphs)
+    if len(graphs) > 0:
+      self.output['largest components'] = max(g.vcount() for g in graphs)
+    else:
+      self.output['largest components'] = 0
+    if self.verbosity:
+      print('Graph preprocessing yields %d components' % len(graphs))
+    return graphs
+
+  def reduction_stats(self, table):
+    '''Statistics of the preprocessing of the graph, see
+    Decomposition.stats'''
+    if self.decomposition is None:
+      return None
+    return self.decomposition.stats()
+
+  def iter_components(self, skip=()):
+    '''Solve the graphs returned by components in turn, yielding a record
+    for each as soon as it is finished
+
+    A record is the results dict of the component together with its index
+    under 'component', the vertices of the input graph it contains under
+    'vertices' and the colour of each of these under 'colouring' (None if no
+    colouring was found). Components whose index is in skip are not solved.'''
+    if self.params['time limit'] is not None:
+      self.deadline = time() + self.params['time limit']
+    for i, g in enumerate(self.components()):
+      if i in skip:
+        continue
+      if self.params['preprocess'] and self.verbosity > 0:
+        print(25 * '-')
+        print('Solving for component %d' % i)
+        print(25 * '-')
+      results, labels = self.solve_component(g)
+      if 'original vertex' in g.vs.attributes():
+        vertices = g.vs['original vertex']
+      else:
+        vertices = list(range(g.vcount()))
+      record = {'component': i, 'vertices': vertices,
+                'colouring': None if labels is None else np.asarray(labels).tolist()}
+      record.update(results)
+      yield record
+
+  def write_results(self, path, resume=True):
+    '''Solve the components, appending a record for each to the JSON lines
+    file at path as soon as it is finished
+
+    If resume is True, components already recorded in path are skipped.
+    Returns the number of components solved.'''
+    header = {'fingerprint': graph_fingerprint(self.G),
+              'params': cut_pool_key(dict(self.params, **self.cut_pool_params()))}
+    with ResultWriter(path, header, resume=resume) as writer:
+      count = 0
+      for record in self.iter_components(skip=writer.recorded):
+        writer.write(record)
+        count += 1
+    return count
 
   def run(self):
-    self.output['params'] = copy(self.params)
     if self.verbosity > 1:
       print('Solving 2-Level KPP')
       print('Input graph has %d nodes and %d edges' %
             (self.G.vcount(), self.G.ecount()))
-    if self.params['preprocess']:
-      start = time()
-      graphs = decompose_graph(self.G, self.k)
-      end = time()
-      self.output['preprocess time'] = end - start
-      self.output['preprocess components'] = len(graphs)
-      if len(graphs) > 0:
-        self.output['largest components'] = max(g.vcount() for g in graphs)
-      else:
-        self.output['largest components'] = 0
-
-      self.output['solution'] = dict()
-
-      if self.verbosity:
-        print('Graph preprocessing yields %d components' % len(graphs))
-
-      for i, g in enumerate(graphs):
-        if self.verbosity > 0:
-          print(25 * '-')
-          print('Solving for component %d' % i)
-          print(25 * '-')
-        res = self.solve_single_problem(g)
-        if not self.output['solution']:
-          for k, val in res.items():
-            self.output['solution'][k] = [val]
-        else:
-          for k, val in res.items():
-            self.output['solution'][k].append(val)
+    return self.collect_results(self.iter_components())
 
+  def collect_results(self, records):
+    '''KPPAlgorithmResults of the component records, e.g. as yielded by
+    iter_components, in order of component
+
+    output['colouring'] holds the labels of the vertices of the input
+    graph, with the colourings of the components lifted through the
+    decomposition, or None if a component has no colouring.'''
+    self.output['params'] = copy(self.params)
+    records = list(records)
+    colourings = [res['colouring'] for res in records]
+    if any(colouring is None for colouring in colourings):
+      self.output['colouring'] = None
+    elif self.decomposition is not None:
+      self.output['colouring'] = self.decomposition.lift(colourings).tolist()
     else:
-      res = self.solve_single_problem(self.G)
-      self.output['solution'] = res
+      self.output['colouring'] = list(colourings[0])
+    if self.params['preprocess']:
+      table = ResultTable.from_records([strip_record(res) for res in records])
+      self.output['solution'] = table
+      lb, ub = float(table.sum('lb')), float(table.sum('ub'))
+      self.output['reduction'] = self.reduction_stats(table)
+    else:
+      for res in records:
+        self.output['solution'] = res = strip_record(res)
+      lb, ub = res['lb'], res['ub']
 
+    if self.params['bound only']:
+      self.output['bound'] = {'lb': lb, 'ub': ub}
     return KPPAlgorithmResults(self.output)
 
 
+def strip_record(record):
+  '''Results dict of a record yielded by iter_components'''
+  return {k: v for k, v in record.items() if k not in ('component', 'vertices', 'colouring')}
+
+
 class KPPBasicAlgorithm(KPPAlgorithmBase):
 
   def __init__(self, G, k, x_coefs=None, **kwargs):
     KPPAlgorithmBase.__init__(self, G, k, **kwargs)
+    kwargs = self.kwargs
     self.x_coefs = x_coefs
     if x_coefs and self.params['preprocess']:
-      raise ArgumentError(
+      raise ValueError(
           'Cannot set x coefficients when preprocessing is enabled')
+    if x_coefs and self.params['symmetry breaking']:
+      raise ValueError(
+          'Cannot set x coefficients when symmetry breaking is enabled')
     self.params['x-cut'] = kwargs.pop('x-cut', [])
+    # Colour subsets of the x-cuts, or 'auto' to pick the best per clique
     self.params['x-cut colours'] = kwargs.pop('x-cut colours', [])
     self.params['x-cut removal'] = kwargs.pop('x-cut removal', 0)
+    self.params['formulation'] = kwargs.pop('formulation', 'node')
+    if self.params['formulation'] not in ('node', 'edge'):
+      raise ValueError('Unknown formulation %s' % self.params['formulation'])
+    if self.params['formulation'] == 'edge' and (x_coefs or self.params['x-cut']):
+      raise ValueError(
+          'x coefficients and x-cuts require the node formulation')
     # Gurobi parameters
     self.gurobi_params = kwargs
 
+  def cut_pool_params(self):
+    params = KPPAlgorithmBase.cut_pool_params(self)
+    params['x-cut'] = list(self.params['x-cut'])
+    colours = self.params['x-cut colours']
+    params['x-cut colours'] = colours if colours == 'auto' else [list(c) for c in colours]
+    return params
+
+  def heuristic_colouring(self, g):
+    return local_search_colouring(g, self.k)
+
+  def integral_objective(self, kpp):
+    return KPPAlgorithmBase.integral_objective(self, kpp) and \
+        all(float(c).is_integer() for c in (self.x_coefs or dict()).values())
+
+  def cost_floor(self, kpp):
+    if not self.x_coefs:
+      return 0.0
+    floor = dict()
+    for (i, c), coef in self.x_coefs.items():
+      floor[i] = min(floor.get(i, 0.0), coef)
+    return sum(floor.values())
+
+  def partial_bound(self, kpp):
+    # The model ignores the x coefficients until it has node variables
+    return bool(self.x_coefs) and not kpp.x
+
   def x_cut_phase(self, kpp, max_cliques, results):
-    for p in self.params['x-cut']:
-      for colours in self.params['x-cut colours']:
-        kpp.add_separator(ProjectedCliqueSeparator(max_cliques, p,
-                                                   kpp.num_colours(), colours))
-    start = time()
-    results['x-cut constraints added'] = kpp.cut()
-    end = time()
-    results['x-cut time'] = end - start
-    results['x-cut lb'] = kpp.model.objVal
-    if self.params['x-cut removal']:
-      results["x-cut constraints removed"] = kpp.remove_redundant_constraints(hard=(
-          self.params['x-cut removal'] > 1), allowed_slack=self.params['removal slack'])
-    kpp.sep_algs.clear()
+    separators = [MultiProjectedCliqueSeparator(max_cliques, p, kpp.num_colours(),
+                                                self.params['x-cut colours'])
+                  for p in self.params['x-cut']]
+    self.cut_phase(kpp, 'x-cut', separators, results)
+    self.remove_phase_cuts(kpp, 'x-cut', results)
 
-  def solve_single_problem(self, g):
+  def solve_component(self, g):
     if self.verbosity > 0:
       print("Running exact solution algorithm")
     results = dict()
     results['nodes'] = g.vcount()
     results['edges'] = g.ecount()
-    kpp = KPP(g, self.k, x_coefs=self.x_coefs, verbosity=self.verbosity)
-    for (key, val) in self.gurobi_params.items():
-      kpp.model.setParam(key, val)
-
-    if self.params['y-cut']:
-      max_cliques = g.maximal_cliques()
-      results["clique number"] = max(len(nodes) for nodes in max_cliques)
-      self.y_cut_phase(kpp, max_cliques, results)
-
-    kpp.add_node_variables()
-    if self.params['x-cut']:
-      self.x_cut_phase(kpp, max_cliques, results)
-
-    if self.params['symmetry breaking']:
-      kpp.break_symmetry()
-
-    kpp.solve()
-    if self.verbosity > 0:
-      print('')
-
-    results["optimality gap"] = kpp.model.MIPGap
-    results["status"] = kpp.model.Status
-    results["branch and bound time"] = kpp.model.Runtime
-    if results["status"] == 2:
-      results["optimal value"] = kpp.model.objVal
-    else:
-      results["optimal value"] = np.NaN
-
-    if kpp.model.SolCount > 0:
-      results["ub"] = kpp.model.objVal
+    if self.params['formulation'] == 'edge':
+      kpp = self.resume_model(g, results)
     else:
-      results["ub"] = np.Inf
-    results["lb"] = kpp.model.objBound
-    results["branch and bound nodes"] = int(kpp.model.NodeCount)
-    return results
+      kpp = self.resume_model(g, results, x_coefs=self.x_coefs)
+    resumed = kpp is not None
+    if not resumed and self.params['formulation'] == 'edge':
+      kpp = KPPEdge(g, self.k, verbosity=self.verbosity)
+    elif not resumed:
+      kpp = KPP(g, self.k, x_coefs=self.x_coefs, verbosity=self.verbosity)
+    self.prepare_model(kpp)
+    self.enable_checkpoints(kpp, results)
+    saved_cuts = [] if resumed else self.load_cut_pool(kpp, results)
+    saved_cuts = self.apply_cut_pool(kpp, saved_cuts, results)
+
+    if self.params['y-cut'] or self.params['triangle cut'] or self.params['x-cut']:
+      max_cliques = self.maximal_cliques(g)
+      results["clique number"] = max((len(nodes) for nodes in max_cliques), default=0)
+      max_cliques = self.clique_index(g, max_cliques)
+    heuristic, lb, met = self.start_early_termination(kpp, results)
+    if self.params['y-cut'] or self.params['triangle cut']:
+      if self.run_phase('y-cut'):
+        self.y_cut_phase(kpp, max_cliques, results)
+        self.complete_phase(kpp, 'y-cut')
+      lb, met = self.check_early_termination(kpp, 'y-cut', heuristic, results)
+
+    # Node variables are only needed in bound only mode to run the x-cuts or
+    # to include the x coefficients in the bound
+    if not met and not kpp.x and (not self.params['bound only'] or self.params['x-cut'] or
+                                  self.x_coefs):
+      kpp.add_node_variables()
+      self.apply_cut_pool(kpp, saved_cuts, results)
+    if self.params['x-cut'] and not met:
+      if self.run_phase('x-cut'):
+        self.x_cut_phase(kpp, max_cliques, results)
+        self.complete_phase(kpp, 'x-cut')
+      lb, met = self.check_early_termination(kpp, 'x-cut', heuristic, results)
+    self.save_cut_pool(kpp)
+
+    labels = self.finish(kpp, results, heuristic, lb)
+    self.remove_checkpoint(kpp)
+    return results, labels
 
 
 class KPPAlgorithm(KPPAlgorithmBase):
 
   def __init__(self, G, k, k2, **kwargs):
     KPPAlgorithmBase.__init__(self, G, k, **kwargs)
+    kwargs = self.kwargs
     self.k2 = k2
     self.params['yz-cut'] = kwargs.pop('yz-cut', [])
     self.params['yz-cut removal'] = kwargs.pop('yz-cut removal', 0)
     self.params['z-cut'] = kwargs.pop('z-cut', [])
     self.params['z-cut removal'] = kwargs.pop('z-cut removal', 0)
+    # Fix the z variables outside the k2-core of each component to zero
+    self.params['z peeling'] = kwargs.pop('z peeling', False)
     # Gurobi parameters
     self.gurobi_params = kwargs
 
-  def solve_single_problem(self, g):
+  def cut_pool_params(self):
+    params = KPPAlgorithmBase.cut_pool_params(self)
+    params['k2'] = self.k2
+    params['yz-cut'] = list(self.params['yz-cut'])
+    params['z-cut'] = list(self.params['z-cut'])
+    return params
+
+  def heuristic_colouring(self, g):
+    labels = local_search_colouring(g, self.k, self.k2)
+    if self.params['z peeling']:
+      labels = z_repair(g, labels, self.k, self.k2)
+    return labels
+
+  def reduction_stats(self, table):
+    stats = KPPAlgorithmBase.reduction_stats(self, table)
+    if stats is not None and self.params['z peeling'] and 'z fixed edges' in table:
+      stats['z fixed edges'] = int(table.sum('z fixed edges'))
+      stats['z-free components'] = int(np.count_nonzero(table['z fixed edges'] == table['edges']))
+    return stats
+
+  def yz_cut_phase(self, kpp, max_cliques, results):
+    separators = [YZCliqueSeparator(max_cliques, p, self.k, self.k2)
+                  for p in self.params['yz-cut']]
+    if self.params['triangle cut']:
+      separators.append(YZTriangleSeparator(max_cliques, self.k))
+    self.cut_phase(kpp, 'yz-cut', separators, results)
+    self.remove_phase_cuts(kpp, 'yz-cut', results)
+
+  def z_cut_phase(self, kpp, max_cliques, results):
+    separators = [ZCliqueSeparator(max_cliques, p, self.k, self.k2)
+                  for p in self.params['z-cut']]
+    if self.params['triangle cut']:
+      separators.append(ZTriangleSeparator(max_cliques, self.k))
+    self.cut_phase(kpp, 'z-cut', separators, results)
+    self.remove_phase_cuts(kpp, 'z-cut', results)
+
+  def solve_component(self, g):
     if self.verbosity > 0:
       print("Running exact solution algorithm")
     results = dict()
     results['nodes'] = g.vcount()
     results['edges'] = g.ecount()
-    kpp = KPPExtension(g, self.k, self.k2, verbosity=self.verbosity)
-    for (key, val) in self.gurobi_params.items():
-      kpp.model.setParam(key, val)
-
-    if self.params['y-cut'] or self.params['yz-cut'] or self.params['z-cut']:
-      max_cliques = g.maximal_cliques()
-      results["clique number"] = max(len(nodes) for nodes in max_cliques)
-
-    if self.params['y-cut']:
-      self.y_cut_phase(kpp, max_cliques, results)
-    else:
-      results['y-cut time'] = 0.0
-      results['y-cut lb'] = 0.0
-      results['y-cut constraints added'] = 0
-      results['y-cut constraints removed'] = 0
-
-    kpp.add_z_variables()
-    if self.params['yz-cut']:
-      for p in self.params['yz-cut']:
-        kpp.add_separator(YZCliqueSeparator(max_cliques, p, self.k, self.k2))
-      start = time()
-      results['yz-cut constraints added'] = kpp.cut()
-      end = time()
-      results['yz-cut time'] = end - start
-      results['yz-cut lb'] = kpp.model.objVal
-
-      if self.params['yz-cut removal']:
-        results["yz-cut constraints removed"] = kpp.remove_redundant_constraints(
-            hard=(self.params['yz-cut removal']), allowed_slack=self.params['removal slack'])
-      kpp.sep_algs.clear()
+    kpp = self.resume_model(g, results)
+    resumed = kpp is not None
+    if not resumed:
+      kpp = KPPExtension(g, self.k, self.k2, verbosity=self.verbosity)
+    if self.params['z peeling']:
+      kpp.z_part = z_part(g, self.k2)[kpp.edge_index.eids]
+      results['z fixed edges'] = int(np.count_nonzero(~kpp.z_part))
+    self.prepare_model(kpp)
+    self.enable_checkpoints(kpp, results)
+    saved_cuts = [] if resumed else self.load_cut_pool(kpp, results)
+    saved_cuts = self.apply_cut_pool(kpp, saved_cuts, results)
+
+    triangles = self.params['triangle cut']
+    if self.params['y-cut'] or self.params['yz-cut'] or self.params['z-cut'] or triangles:
+      max_cliques = self.maximal_cliques(g)
+      results["clique number"] = max((len(nodes) for nodes in max_cliques), default=0)
+      max_cliques = self.clique_index(g, max_cliques)
+
+    heuristic, lb, met = self.start_early_termination(kpp, results)
+    if self.params['y-cut'] or triangles:
+      if self.run_phase('y-cut'):
+        self.y_cut_phase(kpp, max_cliques, results)
+        self.complete_phase(kpp, 'y-cut')
+      lb, met = self.check_early_termination(kpp, 'y-cut', heuristic, results)
     else:
-      results['yz-cut time'] = 0.0
-      results['yz-cut lb'] = results['y-cut lb']
-      results['yz-cut constraints added'] = 0
-      results['yz-cut constraints removed'] = 0
-
-    if self.params['z-cut']:
-      for p in self.params['z-cut']:
-        kpp.add_separator(ZCliqueSeparator(max_cliques, p, self.k, self.k2))
-      start = time()
-      results['z-cut constraints added'] = kpp.cut()
-      end = time()
-      results['z-cut time'] = end - start
-      results['z-cut lb'] = kpp.model.objVal
-
-      if self.params['z-cut removal']:
-        results["z-cut constraints removed"] = kpp.remove_redundant_constraints(
-            hard=(self.params['z-cut removal']), allowed_slack=self.params['removal slack'])
-      kpp.sep_algs.clear()
+      self.skip_phase('y-cut', 0.0, results)
+
+    if not met and not kpp.z:
+      kpp.add_z_variables()
+      saved_cuts = self.apply_cut_pool(kpp, saved_cuts, results)
+    if (self.params['yz-cut'] or triangles) and not met:
+      if self.run_phase('yz-cut'):
+        self.yz_cut_phase(kpp, max_cliques, results)
+        self.complete_phase(kpp, 'yz-cut')
+      lb, met = self.check_early_termination(kpp, 'yz-cut', heuristic, results)
     else:
-      results['z-cut time'] = 0.0
-      results['z-cut lb'] = results['yz-cut lb']
-      results['z-cut constraints added'] = 0
-      results['z-cut constraints removed'] = 0
-
-    kpp.add_node_variables()
-
-    if self.params['symmetry breaking']:
-      kpp.break_symmetry()
-
-    kpp.solve()
-    if self.verbosity > 0:
-      print('')
+      self.skip_phase('yz-cut', results['y-cut lb'], results)
 
-    results["optimality gap"] = kpp.model.MIPGap
-    results["status"] = kpp.model.Status
-    if results["status"] == 2:
-      results["optimal value"] = kpp.model.objVal
-      results["branch and bound time"] = kpp.model.Runtime
+    if (self.params['z-cut'] or triangles) and not met:
+      if self.run_phase('z-cut'):
+        self.z_cut_phase(kpp, max_cliques, results)
+        self.complete_phase(kpp, 'z-cut')
+      lb, met = self.check_early_termination(kpp, 'z-cut', heuristic, results)
     else:
-      results["optimal value"] = np.NaN
-      results["branch and bound time"] = np.NaN
+      self.skip_phase('z-cut', results['yz-cut lb'], results)
 
-    results["branch and bound nodes"] = int(kpp.model.NodeCount)
-    return results
+    self.save_cut_pool(kpp)
+    labels = self.finish(kpp, results, heuristic, lb)
+    self.remove_checkpoint(kpp)
+    return results, labels
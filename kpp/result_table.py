@@ -0,0 +1,155 @@
+import csv
+import json
+from numbers import Number
+import numpy as np
+
+
+class ResultTable:
+  '''Columnar store of results with one row per solved component
+
+  Each metric is held as a single NumPy array: bool, int64 or float64 when
+  every value is of that type (missing values and None become NaN in float
+  columns) and an object array otherwise, e.g. for cut histories.'''
+
+  def __init__(self, columns=None, length=0):
+    self.columns = dict()
+    self.length = length
+    for key, values in (columns or dict()).items():
+      self.columns[key] = np.asarray(values)
+      self.length = len(self.columns[key])
+
+  @classmethod
+  def from_records(cls, records):
+    '''Table built from a list of result dicts'''
+    keys = dict()
+    for record in records:
+      keys.update(dict.fromkeys(record))
+    columns = {key: column([record.get(key) for record in records]) for key in keys}
+    return cls(columns, len(records))
+
+  @classmethod
+  def concat(cls, tables):
+    '''Table holding the rows of all the given tables'''
+    tables = list(tables)
+    keys = dict()
+    for table in tables:
+      keys.update(dict.fromkeys(table.columns))
+    columns = dict()
+    for key in keys:
+      parts = [table.columns[key] if key in table.columns else missing(len(table))
+               for table in tables]
+      if all(part.dtype != object for part in parts):
+        columns[key] = np.concatenate(parts)
+      else:
+        columns[key] = column([value for table in tables
+                               for value in (table.columns[key].tolist() if key in table.columns
+                                             else [None] * len(table))])
+    return cls(columns, sum(len(table) for table in tables))
+
+  def __len__(self):
+    return self.length
+
+  def __getitem__(self, key):
+    return self.columns[key]
+
+  def __contains__(self, key):
+    return key in self.columns
+
+  def keys(self):
+    return self.columns.keys()
+
+  def items(self):
+    return self.columns.items()
+
+  def row(self, i):
+    return {key: values[i].item() if values.dtype != object else values[i]
+            for key, values in self.columns.items()}
+
+  def sum(self, key):
+    return self.columns[key].sum() if key in self.columns else 0.0
+
+  def optimal(self):
+    '''Boolean array flagging the rows solved to optimality'''
+    if 'status' not in self.columns:
+      return np.zeros(len(self), dtype=bool)
+    status = self.columns['status']
+    if status.dtype == object:
+      return np.array([s == 2 for s in status], dtype=bool)
+    return status == 2
+
+  def phase_times(self):
+    '''Total time spent in each phase, keyed by phase name'''
+    return {key[:-len(' time')]: float(np.nansum(values))
+            for key, values in self.columns.items()
+            if key.endswith(' time') and values.dtype != object}
+
+  def to_npz(self, path):
+    '''Write the columns to an .npz file; object columns are stored as JSON
+    strings under keys prefixed with "json:"'''
+    arrays = dict()
+    for key, values in self.columns.items():
+      if values.dtype == object:
+        arrays['json:' + key] = np.array([to_json(v) for v in values.tolist()], dtype=str)
+      else:
+        arrays[key] = values
+    np.savez_compressed(path, **arrays)
+
+  @classmethod
+  def from_npz(cls, path):
+    columns = dict()
+    with np.load(path) as data:
+      for name in data.files:
+        if name.startswith('json:'):
+          columns[name[5:]] = column([json.loads(v) for v in data[name].tolist()])
+        else:
+          columns[name] = data[name]
+    return cls(columns)
+
+  def to_csv(self, path):
+    '''Write one line per row; object values are written as JSON'''
+    keys = list(self.columns)
+    cells = [self.columns[key].tolist() for key in keys]
+    objects = [self.columns[key].dtype == object for key in keys]
+    with open(path, 'w', newline='') as f:
+      writer = csv.writer(f)
+      writer.writerow(keys)
+      for i in range(len(self)):
+        writer.writerow([to_json(col[i]) if obj else col[i]
+                         for col, obj in zip(cells, objects)])
+
+  def to_parquet(self, path):
+    '''Write the table to a Parquet file; requires pyarrow'''
+    try:
+      import pyarrow as pa
+      import pyarrow.parquet as pq
+    except ImportError:
+      raise ImportError('Writing Parquet files requires pyarrow')
+    table = pa.table({key: values.tolist() if values.dtype == object else values
+                      for key, values in self.columns.items()})
+    pq.write_table(table, path)
+
+
+def column(values):
+  '''Typed array holding a list of values'''
+  present = [v for v in values if v is not None]
+  if present and len(present) == len(values) and \
+     all(isinstance(v, (bool, np.bool_)) for v in present):
+    return np.array(values, dtype=bool)
+  if present and len(present) == len(values) and \
+     all(isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_))
+         for v in present):
+    return np.array(values, dtype=np.int64)
+  if all(isinstance(v, Number) and not isinstance(v, (bool, np.bool_)) for v in present):
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+  arr = np.empty(len(values), dtype=object)
+  for i, v in enumerate(values):
+    arr[i] = v
+  return arr
+
+
+def missing(length):
+  return np.full(length, np.nan)
+
+
+def to_json(value):
+  return json.dumps(value, default=lambda obj: obj.tolist())
@@ -0,0 +1,95 @@
+import json
+import os
+import numpy as np
+
+
+class ResultWriter:
+  '''Append-only JSON lines file of records
+
+  The first line of the file is a header identifying the run, e.g. the graph
+  fingerprint and parameters, and each further line is one record, e.g. the
+  results of a component. Every record is flushed to disk as soon as it is
+  written, so a crashed run loses at most the record being computed. When
+  resuming, the header in the file must match and the values of the key
+  field of the records already written are available in recorded.'''
+
+  def __init__(self, path, header, resume=True, key='component'):
+    self.path = path
+    self.key = key
+    self.recorded = set()
+    if resume and os.path.exists(path) and os.path.getsize(path) > 0:
+      saved_header, records, end = _read(path)
+      if saved_header != json.loads(_dumps(header)):
+        raise ValueError('Results in %s were written for a different run' % path)
+      self.recorded = {record[key] for record in records}
+      self.file = open(path, 'r+')
+      # Drop a partially written last line
+      self.file.truncate(end)
+      self.file.seek(end)
+    else:
+      self.file = open(path, 'w')
+      self._write_line(header)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _write_line(self, obj):
+    self.file.write(_dumps(obj) + '\n')
+    self.file.flush()
+    os.fsync(self.file.fileno())
+
+  def write(self, record):
+    self._write_line(record)
+    self.recorded.add(record[self.key])
+
+  def close(self):
+    self.file.close()
+
+
+def read_results(path):
+  '''Header and list of records of a file written by ResultWriter'''
+  header, records, _ = _read(path)
+  return header, records
+
+
+def results_to_parquet(path, parquet_path):
+  '''Convert the records of a file written by ResultWriter to Parquet
+
+  Requires pyarrow.'''
+  try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+  except ImportError:
+    raise ImportError('Writing Parquet files requires pyarrow')
+  _, records = read_results(path)
+  pq.write_table(pa.Table.from_pylist(records), parquet_path)
+  return len(records)
+
+
+def _read(path):
+  '''Header, records and offset of the end of the last complete line'''
+  header, records, end = None, [], 0
+  with open(path, 'rb') as f:
+    for line in f:
+      if not line.endswith(b'\n'):
+        break
+      obj = json.loads(line)
+      if header is None:
+        header = obj
+      else:
+        records.append(obj)
+      end += len(line)
+  return header, records, end
+
+
+def _default(obj):
+  if isinstance(obj, (np.generic, np.ndarray)):
+    return obj.tolist()
+  raise TypeError('Cannot write %s to a results file' % type(obj).__name__)
+
+
+def _dumps(obj):
+  return json.dumps(obj, default=_default)
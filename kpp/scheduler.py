@@ -0,0 +1,98 @@
+from time import time
+
+
+def separator_name(sep_alg):
+  '''Name of a separator for logs, e.g. YCliqueSeparator(p=4)'''
+  name = '%s(p=%d' % (type(sep_alg).__name__, sep_alg.p)
+  if hasattr(sep_alg, 'colours'):
+    name += ', colours=%s' % (sep_alg.colours,)
+  return name + ')'
+
+
+class SeparatorScheduler:
+  '''Chooses the separators run by each round of the cutting plane loop
+
+  For each separator the scheduler tracks its scoring time, the cuts it
+  returned and their total violation, and the bound gain of the rounds it
+  contributed cuts to, split between the separators in proportion to their
+  cuts. Separators are run in order of decreasing yield: bound gain per
+  second, or violation per second before any gain has been credited. A
+  separator which found no cuts, or whose yield is below min_yield times
+  the best yield, is skipped for a number of rounds which doubles each time
+  it is skipped again, up to max_skip. The separators run and skipped in
+  every round are appended to log.'''
+
+  def __init__(self, separators, min_yield=0.1, max_skip=8):
+    self.separators = list(separators)
+    self.min_yield = min_yield
+    self.max_skip = max_skip
+    self.names = [separator_name(s) for s in self.separators]
+    num = len(self.separators)
+    self.runs = [0] * num
+    self.skips = [0] * num
+    self.time = [0.0] * num
+    self.cuts = [0] * num
+    self.violation = [0.0] * num
+    self.gain = [0.0] * num
+    self.skip_until = [0] * num
+    self.backoff = [1] * num
+    self.last_cuts = [0] * num  # Cuts returned by the last run
+    self.round_cuts = [0] * num  # Cuts returned in the current round
+    self.log = []
+
+  def yields(self):
+    '''Bound gain per second of each separator, or violation per second if
+    no separator has been credited with a gain'''
+    benefit = self.gain if any(g > 0 for g in self.gain) else self.violation
+    return [b / max(t, 1e-9) for b, t in zip(benefit, self.time)]
+
+  def select(self, round):
+    '''Separators to run in round, highest yield first'''
+    yields = self.yields()
+    best = max(yields, default=0.0)
+    selected, skipped = [], []
+    for i in sorted(range(len(self.separators)), key=lambda i: -yields[i]):
+      if round < self.skip_until[i]:
+        skipped.append(i)
+        continue
+      if self.runs[i] > 0 and (self.last_cuts[i] == 0 or yields[i] < self.min_yield * best):
+        self.skip_until[i] = round + 1 + self.backoff[i]
+        self.backoff[i] = min(2 * self.backoff[i], self.max_skip)
+        skipped.append(i)
+        continue
+      self.backoff[i] = 1
+      selected.append(i)
+    for i in skipped:
+      self.skips[i] += 1
+    self.log.append({'round': round, 'run': [self.names[i] for i in selected],
+                     'skipped': [self.names[i] for i in skipped]})
+    return [self.separators[i] for i in selected]
+
+  def separate(self, sep_alg, sol, verbosity, limit):
+    '''Run one separator and record its time, cuts and violation'''
+    i = self.separators.index(sep_alg)
+    start = time()
+    constraints = sep_alg.find_violated_constraints(sol, verbosity, limit)
+    self.time[i] += time() - start
+    self.runs[i] += 1
+    self.cuts[i] += len(constraints)
+    self.violation[i] += sep_alg.last_violation
+    self.last_cuts[i] = len(constraints)
+    self.round_cuts[i] += len(constraints)
+    return constraints
+
+  def credit(self, gain):
+    '''Split the bound gain of the last round between the separators in
+    proportion to the cuts they returned in it'''
+    total = sum(self.round_cuts)
+    if total > 0 and gain > 0:
+      for i, cuts in enumerate(self.round_cuts):
+        self.gain[i] += gain * cuts / total
+    self.round_cuts = [0] * len(self.separators)
+
+  def summary(self):
+    '''Totals for each separator, keyed by name'''
+    return {name: {'runs': self.runs[i], 'skips': self.skips[i], 'time': self.time[i],
+                   'cuts': self.cuts[i], 'violation': self.violation[i],
+                   'gain': self.gain[i]}
+            for i, name in enumerate(self.names)}
@@ -1,7 +1,7 @@
 from abc import ABCMeta, abstractmethod
-import heapq
 import sys
-from itertools import combinations
+from itertools import combinations, permutations
+import numpy as np
 
 
 class Structure:
@@ -25,7 +25,7 @@ class Structure:
 
 
 class Solution(Structure):
-  _fields = ['x', 'y', 'z']
+  _fields = ['x', 'y', 'z', 'edge_index']
 
 
 class Constraint(Structure):
@@ -60,45 +60,101 @@ def edge_clique(clq):
   return e_clq
 
 
+class CliqueIndex:
+  '''p-cliques contained in the maximal cliques of a graph
+
+  The p-cliques for each p, and their edge positions, are computed on first
+  use and shared by all separators built from the index, e.g. separators
+  for different k on the same graph.'''
+
+  def __init__(self, max_cliques):
+    self.max_cliques = max_cliques
+    self.tables = dict()
+    self.positions = dict()
+
+  def p_cliques(self, p):
+    '''p-cliques as tuples, their edges and a (num cliques, p) node array'''
+    if p not in self.tables:
+      cliques = p_cliques(self.max_cliques, p)
+      self.tables[p] = (cliques, [edge_clique(clq) for clq in cliques],
+                        np.array(cliques, dtype=np.int64).reshape(-1, p))
+    return self.tables[p]
+
+  def clique_positions(self, p, edge_index):
+    '''Edge positions of the p-cliques; edge_index must number the edges of
+    the graph the cliques were found in'''
+    if p not in self.positions:
+      self.positions[p] = edge_index.clique_positions(self.p_cliques(p)[2], p)
+    return self.positions[p]
+
+
 class CliqueSeparator(metaclass=ABCMeta):
 
   def __init__(self, max_cliques, p, k):
+    '''max_cliques is a list of maximal cliques or a CliqueIndex'''
     self.max_constraints = 10
     self.out = sys.stdout
     self.eps = 1e-3
-    self.cliques = p_cliques(max_cliques, p)
-    self.edge_cliques = [edge_clique(clq) for clq in self.cliques]
+    if not isinstance(max_cliques, CliqueIndex):
+      max_cliques = CliqueIndex(max_cliques)
+    self.index = max_cliques
+    self.cliques, self.edge_cliques, self.clique_nodes = self.index.p_cliques(p)
+    self.clique_edges = None  # Edge positions of each clique
+    self.edge_index = None
     self.k = k
     self.p = p  # Clique size
+    self.last_violation = 0.0  # Total violation of the last cuts returned
+    # Weighted mode scores each violation by the mean weight of the clique's
+    # edges, so that cuts on expensive clashes are ranked first
+    self.weighted = False
+    self.clique_weights = None
+
+  def index_edges(self, edge_index):
+    '''Look up edge positions of the cliques in edge_index (done once per index)'''
+    if self.edge_index is not edge_index:
+      if self.index is not None:
+        self.clique_edges = self.index.clique_positions(self.p, edge_index)
+      else:
+        self.clique_edges = edge_index.clique_positions(self.clique_nodes, self.p)
+      self.clique_weights = edge_index.weights[self.clique_edges].mean(axis=1)
+      self.edge_index = edge_index
+
+  def scores(self, viol):
+    '''Violations scaled by the clique weights in weighted mode'''
+    return viol * self.clique_weights if self.weighted else viol
 
   @abstractmethod
-  def calculate_violation(self, sol, nodes, edges):
+  def calculate_violations(self, sol):
+    '''Violation of the inequality for every clique as an array'''
     pass
 
   def find_violated_cliques(self, sol):
-    viol_clqs = []
-    for nodes, edges in zip(self.cliques, self.edge_cliques):
-      viol = self.calculate_violation(sol, nodes, edges)
-      if viol > self.eps:
-        viol_clqs.append((nodes, edges, viol))
-    return viol_clqs
+    self.index_edges(sol.edge_index)
+    viol = self.calculate_violations(sol)
+    idx = np.flatnonzero(viol > self.eps)
+    score = self.scores(viol)
+    return [(self.cliques[i], self.edge_cliques[i], score[i]) for i in idx]
 
   @abstractmethod
   def clique_constraint(self, nodes, edges):
     pass
 
-  def find_violated_constraints(self, sol, verbosity=1):
+  def find_violated_constraints(self, sol, verbosity=1, max_constraints=None):
+    if max_constraints is None:
+      max_constraints = self.max_constraints
     cons = []
     viol_clqs = self.find_violated_cliques(sol)
     num_viol = len(viol_clqs)
-    to_add = min(num_viol, self.max_constraints)
+    to_add = min(num_viol, max_constraints)
     if verbosity > 0:
       msg = " Adding {}/{} violated {}-cliques".format(
           to_add, num_viol, self.p)
       print(msg, file=self.out)
     if to_add < num_viol:
-      viol_clqs = heapq.nlargest(
-          to_add, viol_clqs, key=lambda s: s[2])
+      viols = np.array([s[2] for s in viol_clqs])
+      best = np.argsort(-viols, kind='stable')[:to_add]
+      viol_clqs = [viol_clqs[i] for i in best]
+    self.last_violation = float(sum(viol for _, _, viol in viol_clqs))
     for nodes, edges, viol in viol_clqs:
       cons.append(self.clique_constraint(nodes, edges))
     return cons
@@ -109,8 +165,8 @@ class YCliqueSeparator(CliqueSeparator):
   def __init__(self, max_cliques, p, k):
     CliqueSeparator.__init__(self, max_cliques, p, k)
 
-  def calculate_violation(self, sol, nodes, edges):
-    total = sum(sol.y[e] for e in edges)
+  def calculate_violations(self, sol):
+    total = sol.y[self.clique_edges].sum(axis=1)
     return clique_rhs(self.p, self.k) - total
 
   def clique_constraint(self, nodes, edges):
@@ -123,8 +179,8 @@ class ZCliqueSeparator(CliqueSeparator):
     CliqueSeparator.__init__(self, max_cliques, p, k)
     self.k2 = k2
 
-  def calculate_violation(self, sol, nodes, edges):
-    total = sum(sol.z[e] for e in edges)
+  def calculate_violations(self, sol):
+    total = sol.z[self.clique_edges].sum(axis=1)
     return clique_rhs(self.p, self.k2 * self.k) - total
 
   def clique_constraint(self, nodes, edges):
@@ -137,8 +193,9 @@ class YZCliqueSeparator(CliqueSeparator):
     CliqueSeparator.__init__(self, max_cliques, p, k)
     self.k2 = k2
 
-  def calculate_violation(self, sol, nodes, edges):
-    lhs = sum(sol.y[e] for e in edges) - self.k2 * sum(sol.z[e] for e in edges)
+  def calculate_violations(self, sol):
+    lhs = sol.y[self.clique_edges].sum(axis=1) - \
+        self.k2 * sol.z[self.clique_edges].sum(axis=1)
     t2 = self.p // self.k2
     r2 = self.p % self.k2
     rhs = t2 * nc2(self.k2) + nc2(r2)
@@ -157,9 +214,10 @@ class ProjectedCliqueSeparator(CliqueSeparator):
     CliqueSeparator.__init__(self, max_cliques, p, k)
     self.colours = colours
 
-  def calculate_violation(self, sol, nodes, edges):
-    lhs = sum(sol.x[v, c] for v in nodes for c in self.colours) + \
-        sum(sol.y[u, v] for (u, v) in edges)
+  def calculate_violations(self, sol):
+    colours = list(self.colours)
+    lhs = sol.x[self.clique_nodes][:, :, colours].sum(axis=(1, 2)) + \
+        sol.y[self.clique_edges].sum(axis=1)
     return clique_rhs(self.p + len(self.colours), self.k) - lhs
 
   def clique_constraint(self, nodes, edges):
@@ -168,6 +226,148 @@ class ProjectedCliqueSeparator(CliqueSeparator):
                       clique_rhs(self.p + len(self.colours), self.k), '>')
 
 
+class MultiProjectedCliqueSeparator(CliqueSeparator):
+  '''Projected clique inequalities of ProjectedCliqueSeparator for several
+  colour subsets at once
+
+  colour_sets is a list of colour subsets, or 'auto' to consider every
+  subset: for each size the subset minimising the left hand side is the
+  one of the colours with the smallest x-values on the clique. In either
+  case each clique gets at most one cut, for its most violated subset, and
+  the scoring is vectorised over cliques and subsets.'''
+
+  def __init__(self, max_cliques, p, k, colour_sets='auto'):
+    CliqueSeparator.__init__(self, max_cliques, p, k)
+    self.colours = colour_sets
+    if colour_sets == 'auto':
+      self.sizes = np.arange(1, k)
+      self.max_constraints *= max(k - 1, 1)
+    else:
+      sets = [list(colours) for colours in colour_sets]
+      self.sizes = np.array([len(colours) for colours in sets], dtype=np.int64)
+      # Indicator matrix of the subsets, shape (k, number of subsets)
+      self.membership = np.zeros((k, len(sets)))
+      for j, colours in enumerate(sets):
+        self.membership[colours, j] = 1.0
+      self.max_constraints *= max(len(sets), 1)
+    self.rhs = np.array([clique_rhs(p + size, k) for size in self.sizes.tolist()])
+    self.best_colours = None  # Most violated subset of each clique
+    self.violated_colours = dict()
+
+  def calculate_violations(self, sol):
+    '''Violation of the most violated subset of each clique, recording the
+    subsets in best_colours'''
+    x_sums = sol.x[self.clique_nodes].sum(axis=1)  # (cliques, colours)
+    y_sums = sol.y[self.clique_edges].sum(axis=1)
+    if len(self.sizes) == 0 or len(x_sums) == 0:
+      self.best_colours = []
+      return np.full(len(x_sums), -np.inf)
+    if self.colours == 'auto':
+      order = np.argsort(x_sums, axis=1, kind='stable')
+      partial = np.cumsum(np.take_along_axis(x_sums, order, axis=1), axis=1)
+      lhs = partial[:, self.sizes - 1]
+    else:
+      lhs = x_sums.dot(self.membership)
+    viol = self.rhs[None, :] - lhs - y_sums[:, None]
+    best = np.argmax(viol, axis=1)
+    if self.colours == 'auto':
+      self.best_colours = [order[i, :self.sizes[j]] for i, j in enumerate(best.tolist())]
+    else:
+      self.best_colours = [np.flatnonzero(self.membership[:, j]) for j in best.tolist()]
+    return viol[np.arange(len(viol)), best]
+
+  def find_violated_cliques(self, sol):
+    self.index_edges(sol.edge_index)
+    viol = self.calculate_violations(sol)
+    idx = np.flatnonzero(viol > self.eps)
+    self.violated_colours = {self.cliques[i]: self.best_colours[i].tolist() for i in idx}
+    score = self.scores(viol)
+    return [(self.cliques[i], self.edge_cliques[i], score[i]) for i in idx]
+
+  def clique_constraint(self, nodes, edges):
+    colours = self.violated_colours[nodes]
+    return Constraint({(v, c): 1.0 for v in nodes for c in colours},
+                      {e: 1.0 for e in edges}, {},
+                      clique_rhs(self.p + len(colours), self.k), '>')
+
+
+def triangles(max_cliques, orders):
+  '''Triangles contained in the maximal cliques, each listed once for every
+  vertex order in orders (permutations of (0, 1, 2))'''
+  tris = sorted(set(tuple(sorted(t)) for t in p_cliques(max_cliques, 3)))
+  return [tuple(t[i] for i in order) for t in tris for order in orders]
+
+
+class TriangleSeparator(CliqueSeparator):
+  '''Triangle inequalities a_uv + b_uw - c_vw <= 1 on the same-colour
+  indicators of the edges of a triangle (u, v, w)
+
+  Each triangle is listed once per vertex order, so every clique (u, v, w)
+  has edges (uv, uw, vw) in that order and a single inequality.'''
+
+  orders = [(0, 1, 2), (1, 2, 0), (2, 0, 1)]
+
+  def __init__(self, max_cliques, k):
+    CliqueSeparator.__init__(self, [], 3, k)
+    if isinstance(max_cliques, CliqueIndex):
+      max_cliques = max_cliques.max_cliques
+    self.index = None
+    self.cliques = triangles(max_cliques, self.orders)
+    self.edge_cliques = [edge_clique(clq) for clq in self.cliques]
+    self.clique_nodes = np.array(self.cliques, dtype=np.int64).reshape(-1, 3)
+
+  @abstractmethod
+  def edge_values(self, sol):
+    '''Values of the variables in the three terms of the inequality, each
+    an array indexed by edge position'''
+    pass
+
+  def calculate_violations(self, sol):
+    a, b, c = self.edge_values(sol)
+    e = self.clique_edges
+    return a[e[:, 0]] + b[e[:, 1]] - c[e[:, 2]] - 1.0
+
+  @abstractmethod
+  def clique_constraint(self, nodes, edges):
+    pass
+
+
+class YTriangleSeparator(TriangleSeparator):
+  '''y_uv + y_uw - y_vw <= 1'''
+
+  def edge_values(self, sol):
+    return sol.y, sol.y, sol.y
+
+  def clique_constraint(self, nodes, edges):
+    uv, uw, vw = edges
+    return Constraint({}, {uv: 1.0, uw: 1.0, vw: -1.0}, {}, 1.0, '<')
+
+
+class ZTriangleSeparator(TriangleSeparator):
+  '''z_uv + z_uw - z_vw <= 1'''
+
+  def edge_values(self, sol):
+    return sol.z, sol.z, sol.z
+
+  def clique_constraint(self, nodes, edges):
+    uv, uw, vw = edges
+    return Constraint({}, {}, {uv: 1.0, uw: 1.0, vw: -1.0}, 1.0, '<')
+
+
+class YZTriangleSeparator(TriangleSeparator):
+  '''z_uv + y_uw - y_vw <= 1: if u and v have the same colour and u and w
+  the same colour modulo k, then so do v and w'''
+
+  orders = list(permutations(range(3)))
+
+  def edge_values(self, sol):
+    return sol.z, sol.y, sol.y
+
+  def clique_constraint(self, nodes, edges):
+    uv, uw, vw = edges
+    return Constraint({}, {uw: 1.0, vw: -1.0}, {uv: 1.0}, 1.0, '<')
+
+
 def nc2(n):
   return (n * (n - 1)) // 2
 
@@ -0,0 +1,8 @@
+'''Graphs shared by the tests'''
+import numpy as np
+from kpp.graph import disk_graph
+
+
+def geometric_graph(n, r):
+  '''Disk graph of radius r on n random points of the unit square, seeded by n'''
+  return disk_graph(np.random.default_rng(n).random((n, 2)), r)
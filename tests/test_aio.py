@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+import numpy as np
+import igraph as ig
+from kpp import KPP, KPPBasicAlgorithm, two_stage_kpp_heuristic
+from kpp.aio import AsyncSolver
+from helpers import geometric_graph
+
+
+PARAMS = {'y-cut': [4], 'preprocess': True, 'verbosity': 0}
+
+
+def test_run():
+  G = geometric_graph(30, 0.3)
+
+  async def main():
+    async with AsyncSolver(max_workers=2) as solver:
+      alg = KPPBasicAlgorithm(G, 3, **PARAMS)
+      progress = [record['component'] async for record in solver.components(alg)]
+      results = await asyncio.gather(*(solver.run(KPPBasicAlgorithm(G, 3, **PARAMS), time_limit=60)
+                                       for _ in range(3)))
+      return progress, results
+
+  progress, results = asyncio.run(main())
+  expected = KPPBasicAlgorithm(G, 3, **PARAMS).run().branch_and_bound_stats()['optimal value']
+  assert progress == list(range(len(progress)))
+  for res in results:
+    assert res.branch_and_bound_stats()['optimal value'] == pytest.approx(expected)
+
+
+def dense_graph(n, p):
+  upper = np.triu(np.random.default_rng(0).random((n, n)) < p, 1)
+  return ig.Graph(list(zip(*np.nonzero(upper))))
+
+
+def test_cancel():
+  # Takes several seconds to solve to optimality
+  alg = KPPBasicAlgorithm(dense_graph(28, 0.5), 3, **{'verbosity': 0})
+
+  async def main():
+    async with AsyncSolver(max_workers=1) as solver:
+      task = asyncio.ensure_future(solver.run(alg))
+      await asyncio.sleep(0.5)
+      task.cancel()
+      with pytest.raises(asyncio.CancelledError):
+        await task
+      # The pool's only thread is freed for the next request
+      kpp = KPP(geometric_graph(10, 0.4), 2, verbosity=0)
+      await solver.solve(kpp, time_limit=30)
+      return kpp
+
+  kpp = asyncio.run(main())
+  assert alg.terminated
+  assert alg.active_model.terminated
+  assert kpp.model.Status == 2
+
+
+def test_time_limit():
+  kpp = KPP(dense_graph(28, 0.5), 3, verbosity=0)
+
+  async def main():
+    async with AsyncSolver(grace=0.0) as solver:
+      with pytest.raises(asyncio.TimeoutError):
+        await solver.solve(kpp, time_limit=0.0)
+
+  asyncio.run(main())
+  assert kpp.terminated
+
+
+def test_two_stage_heuristic():
+  G = geometric_graph(12, 0.4)
+
+  async def main():
+    async with AsyncSolver() as solver:
+      return await solver.two_stage_heuristic(G, 2, 2)
+
+  assert asyncio.run(main()) == pytest.approx(two_stage_kpp_heuristic(G, 2, 2))
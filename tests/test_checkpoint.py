@@ -0,0 +1,82 @@
+import os
+import pytest
+import numpy as np
+from kpp import KPP, KPPExtension, KPPBasicAlgorithm, KPPAlgorithm, YCliqueSeparator
+from kpp.kpp_algorithm import KPPAlgorithmBase
+from kpp.checkpoint import save_checkpoint, load_checkpoint
+from helpers import geometric_graph
+
+
+def test_save_load(tmp_path):
+  G = geometric_graph(20, 0.4)
+  kpp = KPPExtension(G, 2, 2, verbosity=0)
+  kpp.add_separator(YCliqueSeparator(G.maximal_cliques(), 4, 2))
+  kpp.cut()
+  kpp.add_z_variables()
+  kpp.add_node_variables()
+  kpp.break_symmetry()
+  kpp.model.optimize()
+  path = str(tmp_path / 'kpp.ckpt.npz')
+  save_checkpoint(path, kpp, {'completed': ['y-cut']})
+  restored, state = load_checkpoint(path, G)
+  assert state == {'completed': ['y-cut']}
+  assert len(restored.constraints) == len(kpp.constraints)
+  for name, values in kpp.variable_bounds().items():
+    assert np.array_equal(restored.variable_bounds()[name], values)
+  restored.model.optimize()
+  assert restored.model.objVal == pytest.approx(kpp.model.objVal)
+  with pytest.raises(ValueError):
+    load_checkpoint(path, geometric_graph(21, 0.4))
+
+
+def test_fractional_cut(tmp_path):
+  G = geometric_graph(20, 0.4)
+  kpp = KPP(G, 3, verbosity=0)
+  kpp.add_separator(YCliqueSeparator(G.maximal_cliques(), 4, 3))
+  kpp.cut()
+  assert kpp.add_fractional_cut()
+  kpp.model.optimize()
+  path = str(tmp_path / 'kpp.ckpt.npz')
+  save_checkpoint(path, kpp, {'completed': ['y-cut']})
+  restored, _ = load_checkpoint(path, G)
+  assert restored.y_bound == kpp.y_bound
+  restored.model.optimize()
+  assert restored.model.objVal == pytest.approx(kpp.model.objVal)
+  params = {'y-cut': [4], 'verbosity': 0, 'checkpoint dir': str(tmp_path)}
+  paths = {KPPBasicAlgorithm(G, 3, **dict(params, **extra)).checkpoint_path(G)
+           for extra in [{}, {'fractional y-cut': True}, {'y-cut removal': 1}]}
+  assert len(paths) == 3
+
+
+def test_resume(tmp_path, monkeypatch):
+  G = geometric_graph(30, 0.3)
+  params = {'y-cut': [4], 'preprocess': True, 'verbosity': 0,
+            'checkpoint dir': str(tmp_path)}
+  expected = KPPBasicAlgorithm(G, 3, **{'y-cut': [4], 'preprocess': True,
+                                        'verbosity': 0}).run()
+
+  def crash(self, *args):
+    raise RuntimeError('crash')
+
+  with monkeypatch.context() as m:
+    m.setattr(KPPAlgorithmBase, 'finish', crash)
+    with pytest.raises(RuntimeError):
+      KPPBasicAlgorithm(G, 3, **params).run()
+  assert len(os.listdir(str(tmp_path))) == 1
+  res = KPPBasicAlgorithm(G, 3, **params).run()
+  assert res['solution']['resumed phases'][0] == 1
+  assert res.branch_and_bound_stats()['optimal value'] == \
+      pytest.approx(expected.branch_and_bound_stats()['optimal value'])
+  assert os.listdir(str(tmp_path)) == []
+
+
+def test_incumbent_checkpoint(tmp_path, monkeypatch):
+  G = geometric_graph(16, 0.4)
+  monkeypatch.setattr(KPPAlgorithmBase, 'remove_checkpoint', lambda self, kpp: None)
+  res = KPPAlgorithm(G, 2, 2, **{'y-cut': [3], 'verbosity': 0, 'checkpoint dir': str(tmp_path),
+                                 'checkpoint interval': 0.0}).run()
+  path = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+  kpp, state = load_checkpoint(path, G)
+  assert state['completed'] == ['y-cut']
+  assert kpp.incumbent is not None
+  assert kpp.colouring_objective(kpp.incumbent) == pytest.approx(res['solution']['optimal value'])
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import igraph as ig
+from kpp import KPPBasicAlgorithm
+from kpp.clique_cache import CliqueCache, enumerate_cliques, induced_cliques
+from helpers import geometric_graph
+
+
+def is_clique(G, nodes):
+  return all(G.are_adjacent(u, v) for u in nodes for v in nodes if u < v)
+
+
+@pytest.mark.parametrize("n", [30, 60])
+def test_enumerate_cliques(n):
+  G = geometric_graph(n, 0.25)
+  expected = set(map(frozenset, G.maximal_cliques()))
+  assert set(map(frozenset, enumerate_cliques(G, time_limit=60))) == expected
+  capped = enumerate_cliques(G, max_size=3)
+  assert max(len(clq) for clq in capped) <= 3
+  assert all(is_clique(G, clq) for clq in capped)
+  # Out of time before finding any clique, so only the edges are returned
+  assert set(map(frozenset, enumerate_cliques(G, time_limit=0.0))) == \
+      set(map(frozenset, G.get_edgelist()))
+
+
+def test_induced_cliques():
+  G = geometric_graph(60, 0.25)
+  cliques = G.maximal_cliques()
+  vertices = np.random.default_rng(1).permutation(60)[:30].tolist()
+  expected = set(map(frozenset, G.subgraph(vertices).maximal_cliques()))
+  # subgraph renumbers vertices in increasing order
+  assert set(map(frozenset, induced_cliques(cliques, sorted(vertices)))) == expected
+
+
+def test_clique_cache(tmp_path, monkeypatch):
+  G = geometric_graph(40, 0.3)
+  cache = CliqueCache(max_entries=1)
+  directory = str(tmp_path)
+  cliques = cache.maximal_cliques(G, directory=directory)
+  assert cache.maximal_cliques(G, directory=directory) is cliques
+  cache.maximal_cliques(ig.Graph.Full(4))
+  assert len(cache.memory) == 1
+
+  # A fresh cache reads the cliques back from disk
+  monkeypatch.setattr(ig.Graph, 'maximal_cliques', None)
+  loaded = CliqueCache().maximal_cliques(G, directory=directory)
+  assert sorted(map(sorted, loaded)) == sorted(map(sorted, cliques))
+
+
+def test_algorithm_clique_limits(tmp_path):
+  G = geometric_graph(30, 0.3)
+  params = {'y-cut': [4, 5], 'verbosity': 0}
+  exact = KPPBasicAlgorithm(G, 3, **params).run()['solution']
+  capped = KPPBasicAlgorithm(G, 3, **params, **{'max clique size': 4,
+                                                 'clique dir': str(tmp_path)}).run()['solution']
+  assert capped['clique number'] <= 4
+  assert capped['optimal value'] == pytest.approx(exact['optimal value'])
+  assert len(list(tmp_path.iterdir())) == 1
+  limited = KPPBasicAlgorithm(G, 3, **params, **{'clique time limit': 1e-9}).run()['solution']
+  assert limited['clique number'] >= 2
+  assert limited['optimal value'] == pytest.approx(exact['optimal value'])
+  G['maximal cliques'] = []
+  empty = KPPBasicAlgorithm(G, 3, **params).run()['solution']
+  assert empty['clique number'] == 0
+  assert empty['y-cut constraints added'] == 0
+  assert empty['optimal value'] == pytest.approx(exact['optimal value'])
@@ -0,0 +1,38 @@
+import pytest
+import igraph as ig
+from kpp.graph import k_colouring, uncolourable_subgraph
+
+
+def proper(G, labels, k):
+  return max(labels, default=0) < k and all(labels[u] != labels[v] for u, v in G.get_edgelist())
+
+
+@pytest.mark.parametrize("n", [4, 5, 6, 7])
+def test_k_colouring(n):
+  G = ig.Graph.Ring(n)
+  assert proper(G, k_colouring(G, 3), 3)
+  assert (k_colouring(G, 2) is None) == (n % 2 == 1)
+  G = ig.Graph.Full(n)
+  assert k_colouring(G, n - 1) is None
+  assert proper(G, k_colouring(G, n), n)
+
+
+def test_large_core():
+  G = ig.Graph.Random_Bipartite(700, 700, p=0.01)
+  assert proper(G, k_colouring(G, 3), 3)
+  assert proper(G, k_colouring(G, 2), 2)
+
+
+def test_uncolourable_subgraph():
+  # A 5-cycle with a pendant path and a triangle attached to it
+  G = ig.Graph(n=9, edges=[(0, 1), (1, 2), (2, 3), (3, 4), (4, 0), (4, 5),
+                           (5, 6), (6, 7), (7, 8), (8, 6)])
+  assert uncolourable_subgraph(G, 3) is None
+  nodes = uncolourable_subgraph(G, 2)
+  assert nodes in ([0, 1, 2, 3, 4], [6, 7, 8])
+  assert k_colouring(G.subgraph(nodes), 2) is None
+  for v in range(len(nodes)):
+    sub = G.subgraph([u for i, u in enumerate(nodes) if i != v])
+    assert k_colouring(sub, 2) is not None
+  G = ig.Graph.Full(6)
+  assert len(uncolourable_subgraph(G, 3)) == 4
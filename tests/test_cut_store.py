@@ -0,0 +1,55 @@
+from math import isclose
+from random import seed, random
+import pytest
+import igraph as ig
+from kpp import KPP, KPPBasicAlgorithm, KPPAlgorithm, YCliqueSeparator
+from kpp.cut_store import save_cut_pool, load_cut_pool, apply_cuts
+
+seed(1)
+
+
+def test_save_and_load(tmp_path):
+  G = ig.Graph.GRG(30, 0.3)
+  max_cliques = G.maximal_cliques()
+  kpp = KPP(G, 3, verbosity=0)
+  kpp.add_separator(YCliqueSeparator(max_cliques, 4, 3))
+  kpp.cut()
+  lb = kpp.model.objVal
+  params = {'k': 3, 'y-cut': [4]}
+  path = str(tmp_path / 'pool.npz')
+  num = save_cut_pool(path, kpp, params)
+  assert num == len(kpp.constraints)
+
+  new_kpp = KPP(G, 3, verbosity=0)
+  cuts = load_cut_pool(path, new_kpp, params)
+  assert len(cuts) == num
+  assert apply_cuts(new_kpp, cuts) == []
+  new_kpp.model.optimize()
+  assert isclose(new_kpp.model.objVal, lb)
+
+  with pytest.raises(ValueError):
+    load_cut_pool(path, new_kpp, {'k': 4, 'y-cut': [4]})
+  H = G.copy()
+  H.es['weight'] = [random() for e in H.es()]
+  with pytest.raises(ValueError):
+    load_cut_pool(path, KPP(H, 3, verbosity=0), params)
+
+
+def test_algorithm_cut_pool(tmp_path):
+  graph = ig.Graph.Full(8)
+  for e in graph.es():
+    e['weight'] = random()
+  params = {'y-cut': [4, 5], 'yz-cut': [5], 'z-cut': [5, 6], 'verbosity': 0,
+            'cut pool dir': str(tmp_path)}
+  first = KPPAlgorithm(graph, 2, 2, **params).run()['solution']
+  second = KPPAlgorithm(graph, 2, 2, **params).run()['solution']
+  assert first['cut pool loaded'] == 0
+  assert second['cut pool loaded'] > 0
+  assert isclose(first['optimal value'], second['optimal value'])
+
+  params = {'y-cut': [4, 5], 'x-cut': [3], 'x-cut colours': [[0]],
+            'verbosity': 0, 'cut pool dir': str(tmp_path)}
+  first = KPPBasicAlgorithm(graph, 3, **params).run()['solution']
+  second = KPPBasicAlgorithm(graph, 3, **params).run()['solution']
+  assert second['cut pool loaded'] > 0
+  assert isclose(first['optimal value'], second['optimal value'])
@@ -1,7 +1,8 @@
 import unittest
 from random import seed
 import igraph as ig
-from kpp.graph import decompose_graph
+import numpy as np
+from kpp.graph import decompose_graph, Decomposition, disk_graph, z_part, z_repair
 from kpp import KPP, KPPExtension, YCliqueSeparator, YZCliqueSeparator, ZCliqueSeparator
 
 seed(1)
@@ -66,5 +67,47 @@ class TestDecomposition(unittest.TestCase):
     cut_and_solve_extension(full_kpp)
     self.assertAlmostEqual(full_kpp.model.objVal, comps_sum)
 
+  def test_lift_colouring(self):
+    print('\n\ntest_lift_colouring...\n')
+    G = disk_graph(np.random.default_rng(0).random((60, 2)), 0.17)
+    G.es['weight'] = np.random.default_rng(1).integers(1, 4, G.ecount()).tolist()
+    decomposition = Decomposition(G, 3)
+    self.assertEqual([g.vcount() for g in decomposition.components],
+                     [g.vcount() for g in decompose_graph(G, 3)])
+    stats = decomposition.stats()
+    self.assertEqual(stats['components'], len(decomposition.components))
+    self.assertGreater(stats['removed vertices'], 0)
+    comps_sum = 0.0
+    colourings = []
+    for g in decomposition.components:
+      kpp = KPP(g, 3, verbosity=0)
+      kpp.solve()
+      comps_sum += kpp.model.objVal
+      colourings.append(kpp.get_labels())
+    labels = decomposition.lift(colourings)
+    self.assertEqual(len(labels), G.vcount())
+    self.assertAlmostEqual(KPP(G, 3, verbosity=0).colouring_objective(labels), comps_sum)
+
+  def test_z_part(self):
+    print('\n\ntest_z_part...\n')
+    G = disk_graph(np.random.default_rng(0).random((30, 2)), 0.3)
+    k, k2 = 2, 4
+    g = Decomposition(G, k).components[0]
+    mask = z_part(g, k2)
+    self.assertTrue(np.any(~mask))
+    plain = KPPExtension(g, k, k2, verbosity=0)
+    plain.solve()
+    fixed = KPPExtension(g, k, k2, verbosity=0)
+    fixed.z_part = mask[fixed.edge_index.eids]
+    fixed.solve()
+    self.assertAlmostEqual(plain.model.objVal, fixed.model.objVal)
+    labels = np.random.default_rng(2).integers(0, k * k2, g.vcount())
+    repaired = z_repair(g, labels, k, k2)
+    self.assertTrue(np.all(repaired % k == labels % k))
+    edges = np.array(g.get_edgelist())
+    clashes = repaired[edges[:, 0]] == repaired[edges[:, 1]]
+    self.assertFalse(np.any(clashes & ~mask))
+    self.assertLessEqual(plain.colouring_objective(repaired), plain.colouring_objective(labels))
+
 
 # unittest.main()
@@ -0,0 +1,80 @@
+import os
+import pytest
+from kpp import KPPBasicAlgorithm, KPPAlgorithm
+from kpp.distributed import FileQueue, component_jobs, job_graph, run_worker, solve_distributed
+from kpp.distributed import WorkerPool
+from helpers import geometric_graph
+
+
+def test_component_jobs():
+  G = geometric_graph(40, 0.25)
+  alg = KPPBasicAlgorithm(G, 3, **{'y-cut': [4], 'preprocess': True, 'verbosity': 0})
+  jobs = component_jobs(alg)
+  assert len(jobs) == len(alg.components())
+  assert len({job['job'] for job in jobs}) == len(jobs)
+  assert [job['job'] for job in component_jobs(alg)] == [job['job'] for job in jobs]
+  for job, g in zip(jobs, alg.components()):
+    assert job_graph(job).get_edgelist() == sorted(tuple(sorted(e)) for e in g.get_edgelist())
+    assert job['params']['preprocess'] is False
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_solve_distributed(tmp_path, processes):
+  G = geometric_graph(30, 0.3)
+  params = {'y-cut': [4], 'preprocess': True, 'verbosity': 0}
+  queue = FileQueue(str(tmp_path / 'queue'))
+  alg = KPPBasicAlgorithm(G, 3, **params)
+  if processes == 0:
+    for job in component_jobs(alg):
+      queue.put(job)
+    assert run_worker(queue) == len(alg.components())
+  res = solve_distributed(alg, queue, processes=processes, timeout=120)
+  local = KPPBasicAlgorithm(G, 3, **params).run()
+  assert res.branch_and_bound_stats()['optimal value'] == \
+      pytest.approx(local.branch_and_bound_stats()['optimal value'])
+  assert len(res['solution']) == res['preprocess components']
+  assert os.listdir(str(tmp_path / 'queue' / 'jobs')) == []
+
+
+def test_worker_pool(tmp_path):
+  G = geometric_graph(30, 0.3)
+  params = {'y-cut': [4], 'preprocess': True, 'verbosity': 0}
+  queue = FileQueue(str(tmp_path / 'queue'))
+  with WorkerPool(queue.directory, processes=2) as pool:
+    pids = [worker.pid for worker in pool.workers]
+    for k in [2, 3]:
+      res = solve_distributed(KPPBasicAlgorithm(G, k, **params), queue, pool=pool, timeout=120)
+      local = KPPBasicAlgorithm(G, k, **params).run()
+      assert res.branch_and_bound_stats()['optimal value'] == \
+          pytest.approx(local.branch_and_bound_stats()['optimal value'])
+      assert pool.alive()
+    assert [worker.pid for worker in pool.workers] == pids
+  assert not pool.alive()
+
+
+def test_failed_job(tmp_path):
+  G = geometric_graph(30, 0.3)
+  queue = FileQueue(str(tmp_path / 'queue'))
+  # Gurobi rejects the unknown parameter when the worker builds the model
+  alg = KPPBasicAlgorithm(G, 3, **{'y-cut': [4], 'preprocess': True, 'verbosity': 0,
+                                   'NoSuchParameter': 1})
+  jobs = component_jobs(alg)
+  for job in jobs:
+    queue.put(job)
+  assert run_worker(queue) == 0
+  assert os.listdir(str(tmp_path / 'queue' / 'claimed')) == []
+  assert all('error' in queue.result(job['job']) for job in jobs)
+  with pytest.raises(RuntimeError, match='|'.join(job['job'] for job in jobs)):
+    solve_distributed(alg, queue, processes=1, timeout=120)
+  with WorkerPool(queue.directory, processes=1) as pool:
+    with pytest.raises(RuntimeError, match='failed'):
+      solve_distributed(alg, queue, pool=pool, timeout=120)
+    assert pool.alive()
+
+
+def test_model_export(tmp_path):
+  G = geometric_graph(16, 0.4)
+  res = KPPAlgorithm(G, 2, 2, **{'y-cut': [3], 'verbosity': 0,
+                                 'model dir': str(tmp_path), 'model format': 'lp'}).run()
+  assert os.path.exists(res['solution']['model path'])
+  assert res['solution']['model path'].endswith('.lp')
@@ -0,0 +1,67 @@
+from random import seed, random
+import numpy as np
+import pytest
+import igraph as ig
+from kpp import KPP
+from kpp.edge_index import EdgeIndex
+from kpp.graph import graph_from_edges, load_edges, edge_arrays
+
+seed(1)
+
+
+def test_graph_from_edges():
+  src = np.array([3, 0, 2, 1])
+  dst = np.array([1, 2, 0, 0])
+  with pytest.raises(ValueError):
+    graph_from_edges(src, dst)
+  src, dst = src[[0, 1, 3]], dst[[0, 1, 3]]
+  weight = np.array([1.5, 2.0, -1.0])
+  G = graph_from_edges(src, dst, weight, n=5)
+  assert G.vcount() == 5
+  edges, weights, eids = edge_arrays(G)
+  assert edges.tolist() == [[0, 1], [0, 2], [1, 3]]
+  assert eids.tolist() == [0, 1, 2]
+  assert weights.tolist() == [-1.0, 2.0, 1.5]
+
+
+def test_load_edges(tmp_path):
+  G = ig.Graph.GRG(20, 0.4)
+  for e in G.es():
+    e['weight'] = random()
+  edges, weights, eids = edge_arrays(G)
+  assert np.all(np.diff(edges[:, 0] * G.vcount() + edges[:, 1]) > 0)
+  assert np.allclose(weights, np.array(G.es['weight'])[eids])
+  path = tmp_path / 'edges.npy'
+  np.save(path, np.column_stack((edges[:, 1], edges[:, 0], weights)))
+  H = load_edges(path, n=G.vcount())
+  new_edges, new_weights, new_eids = edge_arrays(H)
+  assert np.array_equal(new_edges, edges)
+  assert np.allclose(new_weights, weights)
+  assert np.array_equal(new_eids, np.arange(H.ecount()))
+
+  bad_path = tmp_path / 'bad_edges.npy'
+  np.save(bad_path, np.array([[0.0, 1.5, 1.0], [1.0, 2.0, 1.0]]))
+  with pytest.raises(ValueError):
+    load_edges(bad_path)
+
+  kpp = KPP(G, 3, verbosity=0)
+  kpp.solve()
+  kpp_loaded = KPP(H, 3, verbosity=0)
+  kpp_loaded.solve()
+  assert np.isclose(kpp.model.objVal, kpp_loaded.model.objVal)
+
+
+def test_edge_index():
+  G = ig.Graph.GRG(30, 0.3)
+  index = EdgeIndex(G)
+  for e in G.es():
+    u, v = min(e.tuple), max(e.tuple)
+    i = index.position[u, v]
+    assert index.eids[i] == e.index
+    assert index.positions([v, u]) == i
+  with pytest.raises(KeyError):
+    index.positions([[0, 0]])
+  for clq in G.maximal_cliques(min=3):
+    pos = index.clique_positions([clq[:3]], 3)
+    assert pos.shape == (1, 3)
+    assert set(index.edges[pos[0]].ravel()) == set(clq[:3])
@@ -0,0 +1,89 @@
+from random import seed
+import pytest
+import igraph as ig
+import numpy as np
+import kpp.experiments
+from kpp import KPPBasicAlgorithm
+from kpp.experiments import GraphAnalysis, parameter_grid, run_experiments, solve_k_range
+from kpp.experiments import best_warm_start
+
+
+def instances():
+  seed(3)
+  return {'grg': ig.Graph.GRG(50, 0.2), 'full': ig.Graph.Full(6)}
+
+
+def test_parameter_grid():
+  grid = parameter_grid({'k': [2, 3], 'y-cut': [[], [4]]})
+  assert len(grid) == 4
+  assert {'k': 3, 'y-cut': [4]} in grid
+
+
+def test_analysis():
+  G = instances()['grg']
+  analysis = GraphAnalysis(G, 3)
+  assert all('maximal cliques' in g.attributes() for g in analysis.components)
+  res = KPPBasicAlgorithm(G, 3, analysis=analysis, **{'y-cut': [4], 'preprocess': True,
+                                                      'verbosity': 0}).run()
+  plain = KPPBasicAlgorithm(G, 3, **{'y-cut': [4], 'preprocess': True, 'verbosity': 0}).run()
+  assert res.branch_and_bound_stats()['optimal value'] == \
+      pytest.approx(plain.branch_and_bound_stats()['optimal value'])
+  with pytest.raises(ValueError):
+    KPPBasicAlgorithm(G, 2, analysis=analysis, preprocess=True)
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_run_experiments(tmp_path, processes):
+  graphs = instances()
+  grid = {'k': [3], 'y-cut': [[], [4]], 'preprocess': [True]}
+  path = str(tmp_path / 'experiments.jsonl')
+  table = run_experiments(graphs, grid, path=path, processes=processes, time_limit=60)
+  components = {name: len(GraphAnalysis(G, 3).components) for name, G in graphs.items()}
+  assert len(table) == 2 * sum(components.values())
+  assert set(table['job'].tolist()) == {'grg/0', 'grg/1', 'full/0', 'full/1'}
+  assert table.optimal().all()
+  opt = {}
+  for job, instance, value in zip(table['job'].tolist(), table['instance'].tolist(),
+                                  table['optimal value'].tolist()):
+    opt.setdefault(job, [instance, 0.0])[1] += value
+  assert opt['grg/0'][1] == pytest.approx(opt['grg/1'][1])
+
+
+def test_resume(tmp_path, monkeypatch):
+  graphs = instances()
+  grid = {'k': [3], 'y-cut': [[4]], 'preprocess': [True, False]}
+  path = str(tmp_path / 'experiments.jsonl')
+  first = run_experiments(graphs, grid, path=path)
+  calls = []
+  run = kpp.experiments._run_worker_job
+  monkeypatch.setattr(kpp.experiments, '_run_worker_job',
+                      lambda *args: calls.append(args) or run(*args))
+  second = run_experiments(graphs, grid, path=path)
+  assert calls == []
+  assert second['ub'].tolist() == first['ub'].tolist()
+  run_experiments(graphs, grid, path=path, resume=False)
+  assert len(calls) == 4
+
+
+def test_solve_k_range():
+  G = instances()['grg']
+  params = {'y-cut': [4], 'preprocess': True, 'verbosity': 0}
+  table = solve_k_range(G, [4, 3], **params)
+  assert table['k'].tolist() == [3, 4]
+  for k, value in zip(table['k'].tolist(), table['optimal value'].tolist()):
+    res = KPPBasicAlgorithm(G, k, **params).run()
+    assert value == pytest.approx(res.branch_and_bound_stats()['optimal value'])
+  assert table.sum('warm started') > 0
+  table = solve_k_range(G.subgraph(range(12)), [2], [1, 2], **{'y-cut': [3], 'verbosity': 0})
+  assert table['k2'].tolist() == [1, 2]
+  assert table['warm started'].tolist() == [0, 1]
+
+
+def test_best_warm_start():
+  labels = np.array([0, 1, 2, 3, -1])
+  solutions = [(2, 2, labels, 5.0), (3, None, np.array([0, 1, 2, 0, 1]), 4.0)]
+  assert best_warm_start(solutions, 2, 1) is None
+  assert best_warm_start(solutions[:1], 3, 2).tolist() == [0, 1, 3, 4, -1]
+  assert best_warm_start(solutions, 3, 2).tolist() == [0, 1, 2, 0, 1]
+  assert best_warm_start(solutions, 3).tolist() == [0, 1, 2, 0, 1]
+  assert best_warm_start(solutions[:1], 3) is None
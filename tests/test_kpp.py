@@ -1,7 +1,7 @@
 import unittest
 from random import seed
 import igraph as ig
-from kpp import KPP, KPPExtension, YCliqueSeparator, ZCliqueSeparator, YZCliqueSeparator
+from kpp import KPP, KPPExtension, KPPEdge, YCliqueSeparator, ZCliqueSeparator, YZCliqueSeparator
 
 seed(1)
 k = 3
@@ -51,6 +51,16 @@ class TestKPP(unittest.TestCase):
     obj_val = sym_kpp.model.objVal
     self.assertAlmostEqual(self.obj_val, obj_val)
 
+  def test_representative_symmetry(self):
+    print("\ttest_representative_symmetry...")
+    sym_kpp = KPP(self.G, k, verbosity=0)
+    sym_kpp.break_symmetry('representative')
+    sym_kpp.solve()
+    self.assertAlmostEqual(self.obj_val, sym_kpp.model.objVal)
+    self.assertTrue(sym_kpp.verify_solution())
+    with self.assertRaises(ValueError):
+      sym_kpp.break_symmetry('orbitope')
+
   def test_cuts_and_break_symmetry(self):
     print("\ttest_cuts_and_break_symmetry...")
     kpp = KPP(self.G, k, verbosity=0)
@@ -61,6 +71,105 @@ class TestKPP(unittest.TestCase):
     obj_val = kpp.model.objVal
     self.assertAlmostEqual(self.obj_val, obj_val)
 
+  def test_cut_limits(self):
+    print("\ttest_cut_limits...")
+    cuts_kpp = KPP(self.G, k, verbosity=0)
+    cuts_kpp.add_separator(YCliqueSeparator(self.max_cliques, k + 1, k))
+    cuts_kpp.add_separator(YCliqueSeparator(self.max_cliques, k + 2, k))
+    added = cuts_kpp.cut(max_rounds=2, stall_rounds=1, max_cuts=40)
+    history = cuts_kpp.cut_history
+    self.assertLessEqual(len(history), 3)
+    self.assertEqual(added, sum(h['cuts'] for h in history))
+    self.assertEqual(history[-1]['cuts'], 0)
+    self.assertAlmostEqual(history[-1]['bound'], cuts_kpp.model.objVal)
+    cuts_kpp.solve()
+    self.assertAlmostEqual(self.obj_val, cuts_kpp.model.objVal)
+
+  def test_adaptive_cut_limit(self):
+    print("\ttest_adaptive_cut_limit...")
+    G = ig.Graph.Full(10)
+    max_cliques = G.maximal_cliques()
+    for max_cuts in [4, 16]:
+      cuts_kpp = KPP(G, k, verbosity=0)
+      for p in [k + 1, k + 2]:
+        sep_alg = YCliqueSeparator(max_cliques, p, k)
+        sep_alg.max_constraints = 2
+        cuts_kpp.add_separator(sep_alg)
+      cuts_kpp.cut(max_cuts=max_cuts)
+      limits = [h['limit'] for h in cuts_kpp.cut_history]
+      self.assertEqual(limits[0], 2)
+      self.assertGreater(len(set(limits)), 1)
+      self.assertLessEqual(max(limits), max_cuts)
+      for h in cuts_kpp.cut_history:
+        self.assertLessEqual(h['cuts'], 2 * h['limit'])
+
+  def test_cut_aging(self):
+    print("\ttest_cut_aging...")
+    cuts_kpp = KPP(self.G, k, verbosity=0)
+    cuts_kpp.add_separator(YCliqueSeparator(self.max_cliques, k + 1, k))
+    cuts_kpp.add_separator(YCliqueSeparator(self.max_cliques, k + 2, k))
+    added = cuts_kpp.cut(max_age=1)
+    removed = sum(h['removed'] for h in cuts_kpp.cut_history)
+    self.assertEqual(len(cuts_kpp.constraints), added - removed)
+    self.assertEqual(cuts_kpp.model.NumConstrs, len(cuts_kpp.constraints))
+    self.assertEqual(cuts_kpp.model.Status, 2)
+    self.assertAlmostEqual(cuts_kpp.model.objVal, cuts_kpp.cut_history[-1]['bound'])
+    cuts_kpp.remove_redundant_constraints(hard=True)
+    self.assertEqual(cuts_kpp.model.NumConstrs, len(cuts_kpp.constraints))
+    cuts_kpp.solve()
+    self.assertAlmostEqual(self.obj_val, cuts_kpp.model.objVal)
+
+  def test_add_constraints(self):
+    print("\ttest_add_constraints...")
+    batch_kpp = KPP(self.G, k, verbosity=0)
+    single_kpp = KPP(self.G, k, verbosity=0)
+    sep_alg = YCliqueSeparator(self.max_cliques, k + 1, k)
+    batch_kpp.model.optimize()
+    constraints = sep_alg.find_violated_constraints(batch_kpp.get_solution(), 0, 1000)
+    batch_kpp.add_constraints(constraints)
+    for constraint in constraints:
+      single_kpp.add_constraint(constraint)
+    batch_kpp.model.optimize()
+    single_kpp.model.optimize()
+    self.assertEqual(len(batch_kpp.constraints), len(constraints))
+    self.assertEqual(batch_kpp.model.NumConstrs, single_kpp.model.NumConstrs)
+    self.assertAlmostEqual(batch_kpp.model.objVal, single_kpp.model.objVal)
+    batch_kpp.remove_redundant_constraints(allowed_slack=1e-6)
+    self.assertEqual(batch_kpp.model.NumConstrs, len(batch_kpp.constraints))
+
+  def test_node_constraints(self):
+    print("\ttest_node_constraints...")
+    kpp = KPP(self.G, k, verbosity=0)
+    kpp.add_node_variables()
+    n, m = self.G.vcount(), self.G.ecount()
+    self.assertEqual(kpp.model.NumConstrs, n + 3 * m * k)
+    self.assertEqual(kpp.model.NumNZs, n * k + 9 * m * k)
+    kpp.solve()
+    self.assertAlmostEqual(kpp.colouring_objective(kpp.get_labels()), self.obj_val)
+
+  def test_verify_solution(self):
+    print("\ttest_verify_solution...")
+    kpp = KPP(self.G, k, verbosity=0)
+    kpp.solve()
+    self.assertTrue(kpp.verify_solution())
+    colouring = kpp.get_colouring()
+    self.assertEqual(sorted(sum(colouring, [])), list(range(self.G.vcount())))
+    labels = kpp.get_labels()
+    for c, nodes in enumerate(colouring):
+      self.assertTrue(all(labels[u] == c for u in nodes))
+
+  def test_edge_formulation(self):
+    print("\ttest_edge_formulation...")
+    edge_kpp = KPPEdge(self.G, k, verbosity=0)
+    edge_kpp.add_separator(YCliqueSeparator(self.max_cliques, k + 1, k))
+    edge_kpp.cut()
+    edge_kpp.solve()
+    self.assertAlmostEqual(edge_kpp.model.objVal, self.obj_val)
+    self.assertIsNone(edge_kpp.get_solution().x)
+    self.assertTrue(edge_kpp.verify_solution())
+    self.assertEqual(sorted(sum(edge_kpp.get_colouring(), [])),
+                     list(range(self.G.vcount())))
+
 
 class TestKPPExtension(unittest.TestCase):
 
@@ -78,6 +187,16 @@ class TestKPPExtension(unittest.TestCase):
   def setUp(self):
     pass
 
+  def test_node_constraints(self):
+    print("\ttest_node_constraints...")
+    kpp = KPPExtension(self.G, k, k2, verbosity=0)
+    kpp.add_node_variables()
+    n, m = self.G.vcount(), self.G.ecount()
+    self.assertEqual(kpp.model.NumConstrs, n + m * k + 3 * m * k * k2)
+    self.assertEqual(kpp.model.NumNZs, n * k * k2 + m * k * (1 + 2 * k2) + 9 * m * k * k2)
+    kpp.solve()
+    self.assertAlmostEqual(kpp.colouring_objective(kpp.get_labels()), self.obj_val)
+
   def test_cuts(self):
     print("\ttest_cuts...")
     cuts_kpp = KPPExtension(self.G, k, k2, verbosity=0)
@@ -123,6 +242,16 @@ class TestKPPExtension(unittest.TestCase):
     obj_val = sym_kpp.model.objVal
     self.assertAlmostEqual(self.obj_val, obj_val)
 
+  def test_representative_symmetry(self):
+    print("\ttest_representative_symmetry...")
+    sym_kpp = KPPExtension(self.G, k, k2, verbosity=0)
+    sym_kpp.break_symmetry('representative')
+    sym_kpp.solve()
+    self.assertAlmostEqual(self.obj_val, sym_kpp.model.objVal)
+    self.assertTrue(sym_kpp.verify_solution())
+    with self.assertRaises(ValueError):
+      sym_kpp.break_symmetry('orbitope')
+
   def test_cuts_and_break_symmetry(self):
     print("\ttest_cuts_and_break_symmetry...")
     kpp = KPPExtension(self.G, k, k2, verbosity=0)
@@ -144,4 +273,11 @@ class TestKPPExtension(unittest.TestCase):
     obj_val = kpp.model.objVal
     self.assertAlmostEqual(self.obj_val, obj_val)
 
+  def test_verify_solution(self):
+    print("\ttest_verify_solution...")
+    kpp = KPPExtension(self.G, k, k2, verbosity=0)
+    kpp.solve()
+    self.assertTrue(kpp.verify_solution())
+    self.assertAlmostEqual(kpp.colouring_objective(kpp.get_labels()), self.obj_val)
+
 # unittest.main()
@@ -4,10 +4,12 @@ import igraph as ig
 import yaml
 from math import isclose
 import pytest
+import numpy as np
 import igraph as ig
 from random import seed, random
 from itertools import combinations
-from kpp import KPP, KPPExtension, KPPBasicAlgorithm, KPPAlgorithm
+from kpp import KPP, KPPExtension, KPPBasicAlgorithm, KPPAlgorithm, local_search_colouring
+from kpp.graph import disk_graph
 
 
 seed(1)
@@ -89,3 +91,197 @@ def test_KPPAlgorithm(n, k, k2):
 
 # results = kpp.run()
 # print(yaml.dump(results, indent=1))
+
+
+def test_gurobi_params():
+  graph = ig.Graph.Full(6)
+  kpp_alg = KPPBasicAlgorithm(graph, 3, **{'y-cut': [4], 'verbosity': 0,
+                                           'verify solution': True,
+                                           'MIPFocus': 1, 'Threads': 1})
+  assert kpp_alg.gurobi_params == {'MIPFocus': 1, 'Threads': 1}
+  kpp_alg = KPPAlgorithm(graph, 2, 2, **{'yz-cut': [5], 'verbosity': 0,
+                                         'verify solution': True, 'Threads': 1})
+  assert kpp_alg.gurobi_params == {'Threads': 1}
+
+
+def test_incomplete_solve():
+  graph = ig.Graph.Full(8)
+  kpp_alg = KPPBasicAlgorithm(graph, 3, **{'verbosity': 0, 'TimeLimit': 0.0})
+  res = kpp_alg.run()['solution']
+  assert res['status'] != 2
+  assert np.isnan(res['optimal value'])
+  res = KPPBasicAlgorithm(graph, 3, **{'verbosity': 0, 'time limit': 0.0}).run()['solution']
+  assert res['status'] != 2
+  with pytest.raises(ValueError):
+    KPPBasicAlgorithm(graph, 3, x_coefs={(0, 0): 1.0}, preprocess=True)
+
+
+@pytest.mark.parametrize("preprocess", [False, True])
+def test_verify_solution(preprocess):
+  graph = ig.Graph.Full(7)
+  for e in graph.es():
+    e["weight"] = random()
+  kpp_alg = KPPBasicAlgorithm(graph, 3, **{'y-cut': [4, 5], 'verbosity': 0,
+                                           'preprocess': preprocess,
+                                           'verify solution': True})
+  res = kpp_alg.run()['solution']
+  assert np.all(res['solution verified'])
+  kpp_alg = KPPAlgorithm(graph, 2, 2, **{'y-cut': [3], 'verbosity': 0,
+                                         'preprocess': preprocess,
+                                         'verify solution': True})
+  res = kpp_alg.run()['solution']
+  assert np.all(res['solution verified'])
+
+
+def test_triangle_cut():
+  graph = ig.Graph.Full(7)
+  for e in graph.es():
+    e["weight"] = random()
+  kpp = KPPExtension(graph, 2, 2, verbosity=0)
+  kpp.solve()
+  kpp_alg = KPPAlgorithm(graph, 2, 2, **{'y-cut': [3], 'triangle cut': True,
+                                         'verbosity': 0})
+  res = kpp_alg.run()['solution']
+  assert res['z-cut rounds'] > 0
+  assert res['z-cut lb'] <= kpp.model.objVal + 1e-6
+  assert isclose(res['optimal value'], kpp.model.objVal, abs_tol=1e-6)
+
+
+@pytest.mark.parametrize("n", [6, 8])
+@pytest.mark.parametrize("k", [2, 3])
+def test_edge_formulation(n, k):
+  graph = ig.Graph.Full(n)
+  for e in graph.es():
+    e["weight"] = random()
+  node_alg = KPPBasicAlgorithm(graph, k, **{'y-cut': [k + 1], 'verbosity': 0})
+  edge_alg = KPPBasicAlgorithm(graph, k, **{'y-cut': [k + 1], 'verbosity': 0,
+                                            'formulation': 'edge',
+                                            'verify solution': True})
+  node_res = node_alg.run()['solution']
+  edge_res = edge_alg.run()['solution']
+  assert isclose(node_res['optimal value'], edge_res['optimal value'])
+  assert set(node_res) | {'solution verified'} == set(edge_res)
+  assert edge_res['solution verified']
+  with pytest.raises(ValueError):
+    KPPBasicAlgorithm(graph, k, **{'x-cut': [k + 1], 'formulation': 'edge'})
+
+
+@pytest.mark.parametrize("method", [True, 'basic', 'representative'])
+def test_symmetry_breaking(method):
+  graph = ig.Graph.Full(7)
+  graph.es["weight"] = np.random.default_rng(7).random(graph.ecount()).tolist()
+  res = KPPBasicAlgorithm(graph, 3, **{'verbosity': 0}).run()['solution']
+  sym_res = KPPBasicAlgorithm(graph, 3, **{'verbosity': 0, 'symmetry breaking': method,
+                                           'verify solution': True}).run()['solution']
+  assert isclose(res['optimal value'], sym_res['optimal value'])
+  assert sym_res['solution verified']
+  sym_res = KPPAlgorithm(graph, 2, 2, **{'verbosity': 0, 'symmetry breaking': method,
+                                         'verify solution': True}).run()['solution']
+  assert sym_res['solution verified']
+  # Colours with different x coefficients are not interchangeable
+  x_coefs = {(i, c): 0.0 if c == 2 else 5.0 for i in range(4) for c in range(3)}
+  with pytest.raises(ValueError):
+    KPPBasicAlgorithm(ig.Graph.Full(4), 3, x_coefs=x_coefs, **{'symmetry breaking': method})
+  kpp = KPP(ig.Graph.Full(4), 3, x_coefs=x_coefs, verbosity=0)
+  with pytest.raises(ValueError):
+    kpp.break_symmetry('basic' if method is True else method)
+
+
+def test_bound_only():
+  graph = ig.Graph.GRG(40, 0.3)
+  graph.es["weight"] = np.random.default_rng(3).integers(1, 4, graph.ecount()).tolist()
+  bound_params = {'y-cut': [4], 'fractional y-cut': True, 'preprocess': True,
+                  'bound only': True, 'verbosity': 0}
+  exact = KPPBasicAlgorithm(graph, 3, **{'y-cut': [4], 'preprocess': True,
+                                         'verbosity': 0}).run()
+  opt = exact.branch_and_bound_stats()['optimal value']
+  alg = KPPBasicAlgorithm(graph, 3, **bound_params)
+  streamed = list(alg.iter_components())
+  assert len(streamed) == alg.output['preprocess components']
+  res = KPPBasicAlgorithm(graph, 3, **bound_params).run()
+  assert res['bound']['lb'] <= opt + 1e-6
+  assert opt <= res['bound']['ub'] + 1e-6
+  assert isclose(res['bound']['lb'], sum(r['lb'] for r in streamed))
+  assert all(nodes == 0 for nodes in res['solution']['branch and bound nodes'])
+  res = KPPAlgorithm(graph.subgraph(range(14)), 2, 2, **{'y-cut': [3], 'bound only': True,
+                                                          'verbosity': 0}).run()
+  assert res['bound']['lb'] <= res['bound']['ub']
+  x_coefs = {(i, c): -1.0 for i in range(5) for c in range(3)}
+  res = KPPBasicAlgorithm(ig.Graph.Full(5), 3, x_coefs=x_coefs,
+                          **{'y-cut': [4], 'bound only': True, 'verbosity': 0}).run()
+  assert res['bound']['lb'] <= res['bound']['ub'] == -3.0
+
+
+def test_early_termination():
+  rng = np.random.default_rng(0)
+  points = rng.random((40, 2))
+  graph = ig.Graph([(i, j) for i, j in combinations(range(40), 2)
+                    if np.linalg.norm(points[i] - points[j]) < 0.2])
+  graph.es["weight"] = rng.integers(1, 4, graph.ecount()).tolist()
+  params = {'y-cut': [4], 'preprocess': True, 'verbosity': 0}
+  exact = KPPBasicAlgorithm(graph, 3, **params).run()
+  alg = KPPBasicAlgorithm(graph, 3, **dict(params, **{'early termination': True}))
+  res = alg.run()
+  assert isclose(res.branch_and_bound_stats()['optimal value'],
+                 exact.branch_and_bound_stats()['optimal value'])
+  stopped = [phase for phase in res['solution']['early termination'] if isinstance(phase, str)]
+  assert stopped and all(phase == 'y-cut' for phase in stopped)
+  assert all(status == 2 for status in res['solution']['status'])
+  # The y-cut bound ignores the x coefficients, which favour colour 0
+  x_coefs = {(i, c): -10.0 if c == 0 else 0.0 for i in range(5) for c in range(3)}
+  for params in [{'y-cut': [4]}, {'y-cut': [4], 'x-cut': [4]}]:
+    res = KPPBasicAlgorithm(ig.Graph.Full(5), 3, x_coefs=x_coefs,
+                            **dict(params, **{'early termination': True,
+                                              'verbosity': 0})).run()['solution']
+    assert res['optimal value'] == -40.0
+
+
+def test_z_peeling():
+  graph = disk_graph(np.random.default_rng(0).random((50, 2)), 0.18)
+  params = {'preprocess': True, 'verbosity': 0}
+  plain = KPPAlgorithm(graph, 2, 4, **params).run()
+  res = KPPAlgorithm(graph, 2, 4, **dict(params, **{'z peeling': True})).run()
+  assert isclose(res.branch_and_bound_stats()['optimal value'],
+                 plain.branch_and_bound_stats()['optimal value'])
+  reduction = res.preprocess_stats()['reduction']
+  assert reduction['components'] == res['preprocess components']
+  assert reduction['z fixed edges'] == res['solution'].sum('z fixed edges') > 0
+  assert reduction['z-free components'] > 0
+  labels = res['colouring']
+  assert len(labels) == graph.vcount()
+  cost = KPPExtension(graph, 2, 4, verbosity=0).colouring_objective(labels)
+  assert isclose(cost, res.branch_and_bound_stats()['optimal value'])
+
+
+def test_adaptive_separation():
+  rng = np.random.default_rng(1)
+  points = rng.random((30, 2))
+  graph = ig.Graph([(i, j) for i, j in combinations(range(30), 2)
+                    if np.linalg.norm(points[i] - points[j]) < 0.35])
+  params = {'y-cut': [3, 4, 5, 6], 'verbosity': 0}
+  plain = KPPBasicAlgorithm(graph, 3, **params).run()
+  res = KPPBasicAlgorithm(graph, 3, **dict(params, **{'adaptive separation': True})).run()
+  assert res['solution']['y-cut lb'] == pytest.approx(plain['solution']['y-cut lb'], rel=1e-2)
+  assert res['solution']['optimal value'] == pytest.approx(plain['solution']['optimal value'])
+  schedule = res['solution']['y-cut schedule']
+  assert len(schedule) == res['solution']['y-cut rounds']
+  assert any(entry['skipped'] for entry in schedule)
+  stats = res['solution']['y-cut separators']
+  assert set(stats) == {'YCliqueSeparator(p=%d)' % p for p in params['y-cut']}
+  assert sum(s['cuts'] for s in stats.values()) == res['solution']['y-cut constraints added']
+
+
+@pytest.mark.parametrize("k2", [None, 2])
+def test_local_search_colouring(k2):
+  graph = ig.Graph.Full(7)
+  graph.es["weight"] = np.random.default_rng(5).random(graph.ecount()).tolist()
+  if k2 is None:
+    kpp = KPP(graph, 3, verbosity=0)
+  else:
+    kpp = KPPExtension(graph, 2, k2, verbosity=0)
+  kpp.solve()
+  labels = local_search_colouring(graph, kpp.k, k2)
+  assert labels.min() >= 0 and labels.max() < kpp.num_colours()
+  assert kpp.colouring_objective(labels) >= kpp.model.objVal - 1e-6
+  # A locally optimal colouring is not changed by further passes
+  assert np.all(local_search_colouring(graph, kpp.k, k2, labels=labels) == labels)
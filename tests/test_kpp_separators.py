@@ -1,10 +1,14 @@
 from math import isclose
 from itertools import product
 import pytest
+import numpy as np
 import igraph as ig
 from random import seed, random
 from itertools import combinations
-from kpp import KPP, YCliqueSeparator, ProjectedCliqueSeparator
+from kpp import KPP, KPPExtension, YCliqueSeparator, ProjectedCliqueSeparator
+from kpp import YTriangleSeparator, YZTriangleSeparator, ZTriangleSeparator
+from kpp import MultiProjectedCliqueSeparator
+from kpp.separation import Solution, clique_rhs
 
 seed(1)
 
@@ -53,3 +57,104 @@ def test_ProjectedCliqueSeparator(n, k):
   kpp_sep.solve()
   new_opt_val = kpp_sep.model.objVal
   assert isclose(opt_val, new_opt_val)
+
+
+@pytest.mark.parametrize("n", [5, 6, 7])
+@pytest.mark.parametrize("k", [2, 3])
+def test_TriangleSeparators(n, k):
+  graph = ig.Graph.Full(n)
+  for e in graph.es():
+    e["weight"] = random()
+  kpp = KPPExtension(graph, k, 2, verbosity=0)
+  kpp.solve()
+  opt_val = kpp.model.objVal
+  max_cliques = graph.maximal_cliques()
+  kpp_sep = KPPExtension(graph, k, 2, verbosity=0)
+  kpp_sep.add_separator(YCliqueSeparator(max_cliques, k + 1, k))
+  kpp_sep.add_separator(YTriangleSeparator(max_cliques, k))
+  kpp_sep.cut()
+  kpp_sep.add_z_variables()
+  kpp_sep.add_separator(YZTriangleSeparator(max_cliques, k))
+  kpp_sep.add_separator(ZTriangleSeparator(max_cliques, k))
+  kpp_sep.cut()
+  assert kpp_sep.model.objVal <= opt_val + 1e-6
+  kpp_sep.add_node_variables()
+  kpp_sep.solve()
+  assert isclose(opt_val, kpp_sep.model.objVal, abs_tol=1e-6)
+
+
+def test_triangle_rotations():
+  sep = YTriangleSeparator([[0, 1, 2, 3]], 2)
+  assert len(sep.cliques) == 12
+  assert (0, 1, 2) in sep.cliques and (1, 2, 0) in sep.cliques
+  sep = YZTriangleSeparator([[0, 1, 2]], 2)
+  assert len(sep.cliques) == 6
+
+
+@pytest.mark.parametrize("colour_sets", ['auto', [(0,), (1,), (0, 1)]])
+def test_MultiProjectedCliqueSeparator(colour_sets):
+  n, k = 7, 3
+  graph = ig.Graph.Full(n)
+  rng = np.random.default_rng(2)
+  graph.es["weight"] = rng.random(graph.ecount()).tolist()
+  x_coefs = {(i, c): rng.random() for (i, c) in product(range(n), range(k))}
+  kpp = KPP(graph, k, x_coefs=x_coefs, verbosity=0)
+  kpp.solve()
+  kpp_sep = KPP(graph, k, x_coefs=x_coefs, verbosity=0)
+  kpp_sep.add_node_variables()
+  sep = MultiProjectedCliqueSeparator(graph.maximal_cliques(), 4, k, colour_sets)
+  kpp_sep.add_separator(sep)
+  kpp_sep.model.optimize()
+  lp_bound = kpp_sep.model.objVal
+  assert kpp_sep.cut() > 0
+  assert kpp_sep.model.objVal > lp_bound
+  for cut in kpp_sep.constraints.cuts:
+    colours = {c for (_, c) in cut.x_coefs}
+    if colour_sets != 'auto':
+      assert tuple(sorted(colours)) in colour_sets
+    assert cut.rhs == clique_rhs(4 + len(colours), k)
+  kpp_sep.solve()
+  assert isclose(kpp.model.objVal, kpp_sep.model.objVal)
+
+
+def test_multi_projected_scoring():
+  '''Scores agree with one ProjectedCliqueSeparator per colour subset'''
+  n, k, p = 8, 3, 3
+  graph = ig.Graph.Full(n)
+  rng = np.random.default_rng(3)
+  x = rng.random((n, k))
+  x /= x.sum(axis=1, keepdims=True)
+  kpp = KPP(graph, k, verbosity=0)
+  sol = Solution(x, rng.random(graph.ecount()), None, kpp.edge_index)
+  sets = [c for r in range(1, k) for c in combinations(range(k), r)]
+  cliques = graph.maximal_cliques()
+  best = []
+  for c in sets:
+    sep = ProjectedCliqueSeparator(cliques, p, k, c)
+    sep.index_edges(kpp.edge_index)
+    best.append(sep.calculate_violations(sol))
+  best = np.max(best, axis=0)
+  for colour_sets in ['auto', sets]:
+    multi = MultiProjectedCliqueSeparator(cliques, p, k, colour_sets)
+    multi.index_edges(kpp.edge_index)
+    assert np.allclose(multi.calculate_violations(sol), best)
+
+
+def test_weighted_separation():
+  '''Weighted mode ranks the cliques on heavy edges first'''
+  n, k = 6, 2
+  graph = ig.Graph.Full(n)
+  heavy = {(3, 4), (3, 5), (4, 5)}
+  graph.es["weight"] = [10.0 if e.tuple in heavy else 1.0 for e in graph.es]
+  kpp = KPP(graph, k, verbosity=0)
+  sol = Solution(None, np.zeros(graph.ecount()), None, kpp.edge_index)
+  sep = YCliqueSeparator(graph.maximal_cliques(), 3, k)
+  viols = [viol for _, _, viol in sep.find_violated_cliques(sol)]
+  assert np.allclose(viols, clique_rhs(3, k))
+  sep.weighted = True
+  weighted = {tuple(sorted(nodes)): viol for nodes, _, viol in sep.find_violated_cliques(sol)}
+  assert isclose(weighted[(3, 4, 5)], 10.0 * clique_rhs(3, k))
+  assert isclose(weighted[(0, 1, 2)], clique_rhs(3, k))
+  cut, = sep.find_violated_constraints(sol, verbosity=0, max_constraints=1)
+  assert set(cut.y_coefs) == heavy
+  assert cut.rhs == clique_rhs(3, k)
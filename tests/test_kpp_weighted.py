@@ -45,6 +45,26 @@ class TestKPPWeighted(unittest.TestCase):
     obj_val = cuts_kpp.model.objVal
     self.assertAlmostEqual(self.obj_val, obj_val)
 
+  def test_fractional_ycut_weights(self):
+    print("\ttest_fractional_ycut_weights...")
+    # The LP solution uses more clashes than the (cheaper) optimal colouring
+    G = ig.Graph.Full(7)
+    G.es['weight'] = [2, 2, 5, 2, 1, 2, 1, 5, 1, 2, 2, 2, 5, 1, 1, 1, 2, 1, 1, 2, 1]
+    max_cliques = G.maximal_cliques()
+    cuts_kpp = KPP(G, k, verbosity=0)
+    for p in range(k + 1, 8):
+      cuts_kpp.add_separator(YCliqueSeparator(max_cliques, p, k))
+    cuts_kpp.cut()
+    cuts_kpp.add_fractional_cut()
+    cuts_kpp.solve()
+    self.assertAlmostEqual(cuts_kpp.model.objVal, 6.0)
+
+    G.es['weight'] = [w + 0.5 for w in G.es['weight']]
+    cuts_kpp = KPP(G, k, verbosity=0)
+    cuts_kpp.add_separator(YCliqueSeparator(max_cliques, k + 1, k))
+    cuts_kpp.cut()
+    self.assertFalse(cuts_kpp.add_fractional_cut())
+
   def test_break_symmetry(self):
     print("\ttest_break_symmetry...")
     sym_kpp = KPP(self.G, k, verbosity=0)
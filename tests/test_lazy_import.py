@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+
+def run(code):
+  return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                        check=True).stdout.split()
+
+
+def test_import_is_lazy():
+  loaded = run('import sys, kpp; print(*[m in sys.modules for m in '
+               '("gurobipy", "igraph", "numpy", "kpp.kpp_algorithm")])')
+  assert loaded == ['False'] * 4
+  loaded = run('import sys, kpp; kpp.KPP; print("gurobipy" in sys.modules)')
+  assert loaded == ['False']
+
+
+def test_shared_env():
+  out = run('import igraph as ig; from kpp import KPP; from kpp.gurobi import shared_env\n'
+            'a, b = KPP(ig.Graph.Full(4), 2, verbosity=0), KPP(ig.Graph.Full(5), 2, verbosity=0)\n'
+            'a.solve(); b.solve()\n'
+            'print(shared_env() is shared_env(), a.model.objVal, b.model.objVal)')
+  assert out == ['True', '2.0', '4.0']  # No licence banner from further environments
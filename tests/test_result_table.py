@@ -0,0 +1,56 @@
+from random import seed
+import pytest
+import numpy as np
+import igraph as ig
+from kpp import KPPBasicAlgorithm
+from kpp.result_table import ResultTable
+
+records = [{'nodes': 5, 'lb': 1.5, 'status': 2, 'y-cut time': 0.5, 'verified': True,
+            'history': [{'round': 1}]},
+           {'nodes': 7, 'lb': 2.0, 'status': None, 'y-cut time': 0.25,
+            'history': []}]
+
+
+def test_columns():
+  table = ResultTable.from_records(records)
+  assert len(table) == 2
+  assert table['nodes'].dtype == np.int64
+  assert table['lb'].dtype == float and table.sum('lb') == 3.5
+  assert np.isnan(table['status'][1])
+  assert table['verified'].dtype == object
+  assert table['history'][0] == [{'round': 1}]
+  assert table.optimal().tolist() == [True, False]
+  assert table.phase_times() == {'y-cut': 0.75}
+  assert table.row(1)['nodes'] == 7
+
+  both = ResultTable.concat([table, ResultTable.from_records([{'nodes': 3, 'ub': 4.0}])])
+  assert both['nodes'].tolist() == [5, 7, 3]
+  assert np.isnan(both['ub'][:2]).all() and both['ub'][2] == 4.0
+  assert both['history'][2] is None
+
+
+def test_export(tmp_path):
+  table = ResultTable.from_records(records)
+  table.to_npz(str(tmp_path / 'results.npz'))
+  loaded = ResultTable.from_npz(str(tmp_path / 'results.npz'))
+  assert loaded['nodes'].tolist() == [5, 7]
+  assert loaded['history'][0] == [{'round': 1}]
+  table.to_csv(str(tmp_path / 'results.csv'))
+  with open(str(tmp_path / 'results.csv')) as f:
+    lines = f.read().splitlines()
+  assert lines[0].split(',')[:2] == ['nodes', 'lb']
+  assert len(lines) == 3
+
+
+def test_algorithm_results():
+  seed(3)
+  G = ig.Graph.GRG(50, 0.2)
+  res = KPPBasicAlgorithm(G, 3, **{'y-cut': [4], 'preprocess': True, 'verbosity': 0}).run()
+  table = res['solution']
+  assert len(table) == res['preprocess components']
+  stats = res.branch_and_bound_stats()
+  assert stats['ub'] == pytest.approx(sum(table['ub'].tolist()))
+  assert stats['optimality']
+  assert res.phase_stats()['y-cut']['constraints added'] == table['y-cut constraints added'].sum()
+  single = KPPBasicAlgorithm(G, 3, **{'verbosity': 0}).run()
+  assert single.branch_and_bound_stats()['optimal value'] == pytest.approx(stats['optimal value'])
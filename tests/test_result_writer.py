@@ -0,0 +1,68 @@
+from math import isclose
+from random import seed
+import pytest
+import numpy as np
+import igraph as ig
+from kpp import KPP, KPPBasicAlgorithm
+from kpp.result_writer import ResultWriter, read_results
+
+params = {'y-cut': [4], 'preprocess': True, 'verbosity': 0}
+
+
+def component_graph():
+  '''Graph which preprocessing splits into three components'''
+  seed(3)
+  return ig.Graph.GRG(50, 0.2)
+
+
+def test_iter_components():
+  G = component_graph()
+  alg = KPPBasicAlgorithm(G, 3, **params)
+  records = list(alg.iter_components())
+  assert [r['component'] for r in records] == list(range(len(records)))
+  for record in records:
+    g = G.subgraph(record['vertices'])
+    assert g.vcount() == record['nodes'] and g.ecount() == record['edges']
+    labels = np.array(record['colouring'])
+    assert isclose(KPP(g, 3, verbosity=0).colouring_objective(labels), record['ub'],
+                   abs_tol=1e-6)
+  res = KPPBasicAlgorithm(G, 3, **params).run()
+  assert res['solution']['ub'].tolist() == [r['ub'] for r in records]
+  assert 'vertices' not in res['solution']
+
+
+def test_write_and_resume(tmp_path):
+  G = component_graph()
+  path = str(tmp_path / 'results.jsonl')
+  num = KPPBasicAlgorithm(G, 3, **params).write_results(path)
+  header, records = read_results(path)
+  assert len(records) == num > 1
+
+  # Simulate a crash while the last record was being written
+  with open(path, 'rb') as f:
+    lines = f.readlines()
+  with open(path, 'wb') as f:
+    f.writelines(lines[:-1])
+    f.write(lines[-1][:10])
+  assert KPPBasicAlgorithm(G, 3, **params).write_results(path) == 1
+  new_header, new_records = read_results(path)
+  assert new_header == header
+  assert [(r['component'], r['ub']) for r in new_records] == \
+      [(r['component'], r['ub']) for r in records]
+  assert KPPBasicAlgorithm(G, 3, **params).write_results(path) == 0
+
+  with pytest.raises(ValueError):
+    KPPBasicAlgorithm(G, 2, **params).write_results(path)
+  assert KPPBasicAlgorithm(G, 3, **params).write_results(path, resume=False) == num
+
+
+def test_result_writer(tmp_path):
+  path = str(tmp_path / 'results.jsonl')
+  with ResultWriter(path, {'run': 1}) as writer:
+    writer.write({'component': 0, 'lb': np.float64(1.5), 'nodes': np.int64(3),
+                  'optimal value': np.nan})
+  with ResultWriter(path, {'run': 1}) as writer:
+    assert writer.recorded == {0}
+  header, records = read_results(path)
+  assert header == {'run': 1}
+  assert records[0]['nodes'] == 3 and np.isnan(records[0]['optimal value'])